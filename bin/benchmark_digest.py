@@ -0,0 +1,92 @@
+"""
+Time building an instructor email digest from a large synthetic input.
+
+By default this is an instructor of 100 courses with 20 assignments each and
+100k learner annotations spread evenly across the assignments. It doesn't
+need a database: the course and assignment info that DigestContext would
+query for is made up as well.
+
+Usage:
+
+    tox -qe dev --run-command 'python bin/benchmark_digest.py --annotations 100000'
+"""
+
+import time
+from argparse import ArgumentParser
+from collections import defaultdict
+
+from lms.services.digest import Annotation, AssignmentInfo, CourseInfo, DigestContext
+
+INSTRUCTOR = "acct:instructor@lms.hypothes.is"
+
+parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+parser.add_argument("--annotations", type=int, default=100_000)
+parser.add_argument("--courses", type=int, default=100)
+parser.add_argument("--assignments", type=int, default=20, help="Per course")
+parser.add_argument("--learners", type=int, default=500)
+
+
+def make_annotations(args):
+    for i in range(args.annotations):
+        course, assignment = divmod(
+            i % (args.courses * args.assignments), args.assignments
+        )
+        yield Annotation(
+            userid=f"acct:learner_{i % args.learners}@lms.hypothes.is",
+            authority_provided_id=f"course_{course}",
+            guid="guid",
+            resource_link_id=f"rlid_{course}_{assignment}",
+        )
+
+
+def make_context(args):
+    context = DigestContext(None, INSTRUCTOR, make_annotations(args))
+
+    course_annotations = defaultdict(list)
+    for annotation in context.annotations:
+        course_annotations[annotation.authority_provided_id].append(annotation)
+
+    # Stand in for the results of DigestContext's queries.
+    # pylint:disable=protected-access
+    context._assignment_infos = [
+        AssignmentInfo(
+            id=course * args.assignments + assignment,
+            guid="guid",
+            resource_link_id=f"rlid_{course}_{assignment}",
+            title=f"Assignment {assignment}",
+            authority_provided_id=f"course_{course}",
+        )
+        for course in range(args.courses)
+        for assignment in range(args.assignments)
+    ]
+    context._course_infos = [
+        CourseInfo(
+            authority_provided_id=authority_provided_id,
+            title=authority_provided_id,
+            instructor_h_userids=(INSTRUCTOR,),
+            learner_annotations=tuple(annotations),
+        )
+        for authority_provided_id, annotations in course_annotations.items()
+    ]
+
+    return context
+
+
+def main():
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    context = make_context(args)
+    made_context = time.perf_counter()
+    digest = context.instructor_digest(INSTRUCTOR)
+    end = time.perf_counter()
+
+    print(f"Annotations: {digest['total_annotations']}")
+    print(f"Courses: {len(digest['courses'])}")
+    print(f"Annotators: {len(digest['annotators'])}")
+    print(f"Counting the annotations: {(made_context - start) * 1000:.1f}ms")
+    print(f"Building the digest: {(end - made_context) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
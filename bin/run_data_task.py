@@ -8,12 +8,11 @@ reporting.
 
 from argparse import ArgumentParser
 
-import data_tasks
 import importlib_resources
-from data_tasks.python_script import PythonScript
 from psycopg2.extensions import parse_dsn
 from pyramid.paster import bootstrap
 
+from lms.data_tasks.runner import Runner, load_steps
 from lms.services import RegionService
 
 TASK_ROOT = importlib_resources.files("lms.data_tasks")
@@ -37,6 +36,45 @@ parser.add_argument(
     const=True,
     help="Skip Python executables",
 )
+parser.add_argument(
+    "--full-refresh",
+    action="store_const",
+    default=False,
+    const=True,
+    help="Recompute incrementally refreshed tables completely",
+)
+parser.add_argument(
+    "--commit-steps",
+    action="store_const",
+    default=False,
+    const=True,
+    help="Commit each script on its own instead of running the task in one transaction. Only for tasks that are safe to leave half done",
+)
+parser.add_argument(
+    "-j",
+    "--jobs",
+    type=int,
+    default=1,
+    help="How many independent scripts to run at the same time, needs --commit-steps",
+)
+parser.add_argument(
+    "--resume",
+    action="store_const",
+    default=False,
+    const=True,
+    help="Skip the scripts which finished in the last run of the task, needs --commit-steps",
+)
+parser.add_argument(
+    "--stats-file",
+    help="Append the time and rows of each query to this file as a JSON line",
+)
+parser.add_argument(
+    "--explain",
+    action="store_const",
+    default=False,
+    const=True,
+    help="Run queries with EXPLAIN (ANALYZE, BUFFERS) and save their plans in the stats file",
+)
 parser.add_argument(
     "--dry-run",
     action="store_const",
@@ -53,29 +91,29 @@ def main():
         request = env["request"]
         settings = env["registry"].settings
 
-        scripts = data_tasks.from_dir(
+        steps = load_steps(
             task_dir=TASK_ROOT / args.task,
             template_vars={
                 "db_user": parse_dsn(settings["database_url"].strip())["user"],
                 "region": request.find_service(RegionService).get(),
                 "h_fdw": parse_dsn(settings["h_fdw_database_url"]),
                 "fdw_users": settings["fdw_users"],
+                "full_refresh": args.full_refresh,
             },
         )
 
-        # Run the update in a transaction, so we roll back if it goes wrong
-        with request.db.bind.connect() as connection:
-            with connection.begin():
-                for script in scripts:
-                    if args.no_python and isinstance(script, PythonScript):
-                        print(f"Skipping: {script}")
-                        continue
-
-                    for step in script.execute(connection, dry_run=args.dry_run):
-                        if args.dry_run:
-                            print("Dry run!")
-
-                        print(step.dump(indent="    ") + "\n")
+        # The whole task runs in one transaction unless `--commit-steps` is
+        # given. Then a failed run can be continued with `--resume`.
+        Runner(
+            engine=request.db.bind,
+            task=args.task,
+            jobs=args.jobs,
+            dry_run=args.dry_run,
+            no_python=args.no_python,
+            stats_file=args.stats_file,
+            explain=args.explain,
+            commit_steps=args.commit_steps,
+        ).run(steps, resume=args.resume)
 
 
 if __name__ == "__main__":
@@ -107,6 +107,7 @@ def create_app(global_config, **settings):  # pylint: disable=unused-argument
     config.include("lms.assets")
     config.include("lms.views")
     config.include("lms.services")
+    config.include("lms.services.http")
     config.include("lms.services.jwt")
     config.include("lms.validation")
     config.include("lms.tweens")
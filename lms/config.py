@@ -112,6 +112,19 @@ SETTINGS = (
     _Setting("jstor_api_secret"),
     _Setting("youtube_api_key"),
     _Setting("disable_key_rotation", value_mapper=asbool),
+    # Sizes of the HTTP connection pools shared by all outgoing requests of
+    # each process: the number of hosts to keep pools for and the number of
+    # connections to keep alive for each host.
+    _Setting("http_pool_connections"),
+    _Setting("http_pool_maxsize"),
+    # Number of times to retry outgoing HTTP requests that fail to connect.
+    _Setting("http_max_retries"),
+    # Send the h users, groups and memberships upserts of LTI launches in a
+    # Celery task instead of blocking the launch on h's bulk API.
+    _Setting("async_h_sync", value_mapper=asbool),
+    # Fetch the stats of the instructor dashboard in the background when
+    # instructors launch assignments, so they are cached when they open it.
+    _Setting("dashboard_stats_prewarm", value_mapper=asbool),
     _Setting("mailchimp_api_key"),
     _Setting("mailchimp_digests_subaccount"),
     _Setting("mailchimp_digests_email"),
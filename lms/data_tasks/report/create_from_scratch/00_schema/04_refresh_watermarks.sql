@@ -0,0 +1,6 @@
+-- How far the incremental refresh has got with each of the tables it
+-- maintains. See `refresh/README.md`.
+CREATE TABLE report.refresh_watermarks (
+    name TEXT PRIMARY KEY,
+    watermark BIGINT NOT NULL
+);
@@ -10,29 +10,46 @@ CREATE TYPE report.event_type AS ENUM (
     'error_code'
 );
 
-DROP MATERIALIZED VIEW IF EXISTS report.events CASCADE;
-
--- A compressed version of the event table aggregated by week
-
-CREATE MATERIALIZED VIEW report.events AS (
+-- The weekly event counts for the weeks from `since` onwards. This is used to
+-- fill `report.events` and to refresh it incrementally.
+CREATE OR REPLACE FUNCTION report.event_counts_since(since TIMESTAMP)
+RETURNS TABLE (
+    timestamp_week DATE,
+    organization_id INTEGER,
+    event_type report.event_type,
+    user_id INTEGER,
+    event_count BIGINT
+)
+STABLE
+AS $$
     WITH
+        -- Filtering on the timestamp itself (and not the week) only touches
+        -- the event table's partitions from `since` onwards
+        recent_events AS (
+            SELECT id, timestamp, type_id
+            FROM event
+            WHERE timestamp >= DATE_TRUNC('week', since)
+        ),
+
         -- Unique event user relations without considering role
         unique_event_users AS (
-            SELECT DISTINCT event_id, user_id FROM event_user
+            SELECT DISTINCT event_id, user_id
+            FROM event_user
+            WHERE timestamp >= DATE_TRUNC('week', since)
         ),
 
         translated_events AS (
             SELECT
-                DATE_TRUNC('week', timestamp)::date AS timestamp_week,
+                DATE_TRUNC('week', recent_events.timestamp)::date AS timestamp_week,
                 user_map.organization_id,
                 event_type.type::report.event_type AS event_type,
                 user_map.user_id
-            FROM event
+            FROM recent_events
             JOIN event_type ON
-                event.type_id = event_type.id
+                recent_events.type_id = event_type.id
             -- Lots of events don't have users
             LEFT OUTER JOIN unique_event_users ON
-                unique_event_users.event_id = event.id
+                unique_event_users.event_id = recent_events.id
             LEFT OUTER JOIN report.user_map ON
                 unique_event_users.user_id = user_map.lms_user_id
         )
@@ -43,6 +60,11 @@ CREATE MATERIALIZED VIEW report.events AS (
     FROM translated_events
     GROUP BY timestamp_week, organization_id, event_type, user_id
     ORDER BY timestamp_week, organization_id, event_type, user_id
-) WITH NO DATA;
+$$ LANGUAGE SQL;
 
+DROP TABLE IF EXISTS report.events CASCADE;
 
+-- A compressed version of the event table aggregated by week
+CREATE TABLE report.events AS (
+    SELECT * FROM report.event_counts_since('-infinity')
+) WITH NO DATA;
@@ -1,8 +1,13 @@
 DROP INDEX IF EXISTS report.events_timestamp_week_organization_id_event_type_user_id_idx;
 
-REFRESH MATERIALIZED VIEW report.events;
+-- Take the watermark first so that events added while filling the table are
+-- picked up by the next refresh
+INSERT INTO report.refresh_watermarks (name, watermark)
+SELECT 'events', COALESCE(MAX(id), 0) FROM event;
+
+INSERT INTO report.events SELECT * FROM report.event_counts_since('-infinity');
 
 ANALYSE report.events;
 
--- A unique index is mandatory for concurrent updates used in the refresh
+-- Starting with the week so refreshes can quickly replace recent weeks
 CREATE UNIQUE INDEX events_timestamp_week_organization_id_event_type_user_id_idx ON report.events (timestamp_week, organization_id, event_type, user_id);
@@ -1,7 +1,9 @@
-DROP MATERIALIZED VIEW IF EXISTS report.user_annotation_counts CASCADE;
+DROP VIEW IF EXISTS report.h_user_annotation_counts CASCADE;
 
--- Annotations split by most different facets including user and group
-CREATE MATERIALIZED VIEW report.user_annotation_counts AS (
+-- Annotations split by most different facets including user and group, read
+-- straight from h. This is used to fill `report.user_annotation_counts` and
+-- to refresh it incrementally.
+CREATE VIEW report.h_user_annotation_counts AS (
     SELECT
         user_id,
         group_id,
@@ -14,5 +16,11 @@ CREATE MATERIALIZED VIEW report.user_annotation_counts AS (
         annotation_counts.authority_id = authorities.id
         AND authorities.authority = '{{ region.authority }}'
         -- AND authorities.authority = 'lms.hypothes.is'
-    ORDER BY created_week, user_id, group_id, count DESC
+);
+
+DROP TABLE IF EXISTS report.user_annotation_counts CASCADE;
+
+-- Annotations split by most different facets including user and group
+CREATE TABLE report.user_annotation_counts AS (
+    SELECT * FROM report.h_user_annotation_counts
 ) WITH NO DATA;
@@ -1,9 +1,14 @@
 DROP INDEX IF EXISTS report.user_annotation_counts_user_id_group_id_created_week_idx;
 
-REFRESH MATERIALIZED VIEW report.user_annotation_counts;
+INSERT INTO report.user_annotation_counts
+SELECT * FROM report.h_user_annotation_counts
+ORDER BY created_week, user_id, group_id, count DESC;
 
 ANALYSE report.user_annotation_counts;
 
--- A unique index is mandatory for concurrent updates used in the refresh
 CREATE UNIQUE INDEX user_annotation_counts_user_id_group_id_created_week_idx
     ON report.user_annotation_counts (user_id, group_id, created_week, sub_type, shared);
+
+-- Refreshes replace the most recent weeks
+CREATE INDEX user_annotation_counts_created_week_idx
+    ON report.user_annotation_counts (created_week);
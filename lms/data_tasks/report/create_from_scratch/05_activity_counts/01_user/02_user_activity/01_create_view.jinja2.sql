@@ -1,7 +1,8 @@
-DROP MATERIALIZED VIEW IF EXISTS report.user_activity CASCADE;
+DROP VIEW IF EXISTS report.h_user_activity CASCADE;
 
--- Annotation activity by users in a given period
-CREATE MATERIALIZED VIEW report.user_activity AS (
+-- Annotation activity by users in a given period, read straight from h. This
+-- is used to fill `report.user_activity` and to refresh it incrementally.
+CREATE VIEW report.h_user_activity AS (
     SELECT
         created_week,
         user_id,
@@ -12,5 +13,11 @@ CREATE MATERIALIZED VIEW report.user_activity AS (
         AND authorities.authority = '{{ region.authority }}'
         -- AND authorities.authority = 'lms.hypothes.is'
     GROUP BY created_week, user_id
-    ORDER BY created_week, user_id
+);
+
+DROP TABLE IF EXISTS report.user_activity CASCADE;
+
+-- Annotation activity by users in a given period
+CREATE TABLE report.user_activity AS (
+    SELECT * FROM report.h_user_activity
 ) WITH NO DATA;
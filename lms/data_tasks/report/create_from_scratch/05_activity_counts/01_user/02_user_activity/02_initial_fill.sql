@@ -1,8 +1,10 @@
 DROP INDEX IF EXISTS report.user_activity_created_week_user_id_idx;
 
-REFRESH MATERIALIZED VIEW report.user_activity;
+INSERT INTO report.user_activity
+SELECT * FROM report.h_user_activity
+ORDER BY created_week, user_id;
 
 ANALYSE report.user_activity;
 
--- A unique index is mandatory for concurrent updates used in the refresh
+-- Starting with the week so refreshes can quickly replace recent weeks
 CREATE UNIQUE INDEX user_activity_created_week_user_id_idx ON report.user_activity (created_week, user_id);
@@ -0,0 +1,74 @@
+{% if not full_refresh %}
+-- Keep the current user map to find out which LMS users it maps differently
+-- after the refresh. Their events might be counted against the wrong user or
+-- organization in report.events.
+CREATE TEMPORARY TABLE previous_user_map ON COMMIT DROP AS (
+    SELECT * FROM report.user_map
+);
+{% endif %}
+
+REFRESH MATERIALIZED VIEW CONCURRENTLY report.raw_users;
+ANALYSE report.raw_users;
+
+REFRESH MATERIALIZED VIEW CONCURRENTLY report.user_map;
+ANALYSE report.user_map;
+
+REFRESH MATERIALIZED VIEW CONCURRENTLY report.group_map;
+ANALYSE report.group_map;
+
+REFRESH MATERIALIZED VIEW CONCURRENTLY report.groups;
+ANALYSE report.groups;
+
+-- report.events is a table refreshed incrementally. The weeks recomputed are
+-- the weeks from the earliest of:
+--
+--  * The events added since the last refresh
+--  * The events of the LMS users whose user or organization in the user map
+--    changed with this refresh, including the ones new to the map
+--  * The last week, in case any events were committed out of order
+CREATE TEMPORARY TABLE events_refresh ON COMMIT DROP AS (
+    {% if not full_refresh %}
+    WITH
+        remapped_users AS (
+            (SELECT * FROM report.user_map EXCEPT SELECT * FROM previous_user_map)
+            UNION
+            (SELECT * FROM previous_user_map EXCEPT SELECT * FROM report.user_map)
+        )
+    {% endif %}
+
+    SELECT
+        (SELECT COALESCE(MAX(id), 0) FROM event) AS watermark,
+        {% if full_refresh %}
+        '-infinity'::TIMESTAMP AS since
+        {% else %}
+        LEAST(
+            (
+                SELECT MIN(timestamp) FROM event
+                WHERE id > (
+                    SELECT watermark FROM report.refresh_watermarks
+                    WHERE name = 'events'
+                )
+            ),
+            (
+                SELECT MIN(timestamp) FROM event_user
+                WHERE user_id IN (SELECT lms_user_id FROM remapped_users)
+            ),
+            (NOW() - INTERVAL '1 week')::TIMESTAMP
+        ) AS since
+        {% endif %}
+);
+
+DELETE FROM report.events
+WHERE timestamp_week >= (SELECT DATE_TRUNC('week', since) FROM events_refresh);
+
+INSERT INTO report.events
+SELECT * FROM report.event_counts_since((SELECT since FROM events_refresh));
+
+UPDATE report.refresh_watermarks
+SET watermark = (SELECT watermark FROM events_refresh)
+WHERE name = 'events';
+
+ANALYSE report.events;
+
+REFRESH MATERIALIZED VIEW CONCURRENTLY report.assignments;
+ANALYSE report.assignments;
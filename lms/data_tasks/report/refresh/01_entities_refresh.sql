@@ -1,17 +0,0 @@
-REFRESH MATERIALIZED VIEW CONCURRENTLY report.raw_users;
-ANALYSE report.raw_users;
-
-REFRESH MATERIALIZED VIEW CONCURRENTLY report.user_map;
-ANALYSE report.user_map;
-
-REFRESH MATERIALIZED VIEW CONCURRENTLY report.group_map;
-ANALYSE report.group_map;
-
-REFRESH MATERIALIZED VIEW CONCURRENTLY report.groups;
-ANALYSE report.groups;
-
-REFRESH MATERIALIZED VIEW CONCURRENTLY report.events;
-ANALYSE report.events;
-
-REFRESH MATERIALIZED VIEW CONCURRENTLY report.assignments;
-ANALYSE report.assignments;
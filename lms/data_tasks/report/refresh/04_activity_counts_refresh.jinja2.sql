@@ -0,0 +1,53 @@
+-- report.user_annotation_counts and report.user_activity are tables
+-- refreshed incrementally. h keeps updating the counts of the latest weeks so
+-- only the weeks from the week before the latest one we have are recomputed.
+CREATE TEMPORARY TABLE annotation_counts_refresh ON COMMIT DROP AS (
+    SELECT
+        {% if full_refresh %}
+        '-infinity'::DATE AS since
+        {% else %}
+        COALESCE(
+            (SELECT MAX(created_week) FROM report.user_annotation_counts) - 7,
+            '-infinity'
+        ) AS since
+        {% endif %}
+);
+
+DELETE FROM report.user_annotation_counts
+WHERE created_week >= (SELECT since FROM annotation_counts_refresh);
+
+INSERT INTO report.user_annotation_counts
+SELECT * FROM report.h_user_annotation_counts
+WHERE created_week >= (SELECT since FROM annotation_counts_refresh);
+
+ANALYSE report.user_annotation_counts;
+
+DELETE FROM report.user_activity
+WHERE created_week >= (SELECT since FROM annotation_counts_refresh);
+
+INSERT INTO report.user_activity
+SELECT * FROM report.h_user_activity
+WHERE created_week >= (SELECT since FROM annotation_counts_refresh);
+
+ANALYSE report.user_activity;
+
+REFRESH MATERIALIZED VIEW CONCURRENTLY report.group_annotation_counts;
+ANALYSE report.group_annotation_counts;
+
+REFRESH MATERIALIZED VIEW CONCURRENTLY report.group_bubbled_annotation_counts;
+ANALYSE report.group_bubbled_annotation_counts;
+
+REFRESH MATERIALIZED VIEW CONCURRENTLY report.group_activity;
+ANALYSE report.group_activity;
+
+REFRESH MATERIALIZED VIEW CONCURRENTLY report.group_bubbled_activity;
+ANALYSE report.group_bubbled_activity;
+
+REFRESH MATERIALIZED VIEW CONCURRENTLY report.group_bubbled_counts;
+ANALYSE report.group_bubbled_counts;
+
+REFRESH MATERIALIZED VIEW CONCURRENTLY report.organization_annotation_counts;
+ANALYSE report.organization_annotation_counts;
+
+REFRESH MATERIALIZED VIEW CONCURRENTLY report.organization_activity;
+ANALYSE report.organization_activity;
@@ -1,26 +0,0 @@
-REFRESH MATERIALIZED VIEW CONCURRENTLY report.user_annotation_counts;
-ANALYSE report.user_annotation_counts;
-
-REFRESH MATERIALIZED VIEW CONCURRENTLY report.user_activity;
-ANALYSE report.user_activity;
-
-REFRESH MATERIALIZED VIEW CONCURRENTLY report.group_annotation_counts;
-ANALYSE report.group_annotation_counts;
-
-REFRESH MATERIALIZED VIEW CONCURRENTLY report.group_bubbled_annotation_counts;
-ANALYSE report.group_bubbled_annotation_counts;
-
-REFRESH MATERIALIZED VIEW CONCURRENTLY report.group_activity;
-ANALYSE report.group_activity;
-
-REFRESH MATERIALIZED VIEW CONCURRENTLY report.group_bubbled_activity;
-ANALYSE report.group_bubbled_activity;
-
-REFRESH MATERIALIZED VIEW CONCURRENTLY report.group_bubbled_counts;
-ANALYSE report.group_bubbled_counts;
-
-REFRESH MATERIALIZED VIEW CONCURRENTLY report.organization_annotation_counts;
-ANALYSE report.organization_annotation_counts;
-
-REFRESH MATERIALIZED VIEW CONCURRENTLY report.organization_activity;
-ANALYSE report.organization_activity;
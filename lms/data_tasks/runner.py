@@ -0,0 +1,457 @@
+"""
+Run data tasks, running their independent parts in parallel.
+
+The scripts of a task run in the order of their paths, like with
+`data_tasks.from_dir()`, unless a directory declares which of its children
+depend on which in a `dependencies.json` file:
+
+    {
+        "01_users": [],
+        "02_groups": [],
+        "03_events": ["01_users"]
+    }
+
+Every child of the directory has to be listed, with the earlier siblings it
+needs.
+
+By default the whole task runs in one transaction, so a failed run doesn't
+leave anything half done. Tasks that are safe to leave half done can opt into
+`commit_steps` instead: each script then runs and commits in its own
+transaction, children without dependencies between them can run at the same
+time on different connections, and the scripts that finished are recorded so a
+failed run can be resumed from where it failed.
+
+The time and rows of each query can be saved to a stats file, one JSON line per
+run, to compare runs. With `explain` the queries that support it are run with
+`EXPLAIN (ANALYZE, BUFFERS)` to also save their plans and buffer usage.
+"""
+
+import json
+import os
+import re
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+
+import sqlalchemy as sa
+from data_tasks.python_script import PythonScript
+from data_tasks.sql_query import SQLQuery
+from data_tasks.sql_script import SQLScript
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from lms.models import TaskDone
+
+DEPENDENCIES_FILE = "dependencies.json"
+
+_EXPLAINABLE = re.compile(
+    r"""
+    ^\s*(--[^\n]*\n\s*)*  # Leading comments
+    (
+        (SELECT|INSERT|UPDATE|DELETE|WITH|VALUES)\b
+        | CREATE\s+((TEMP|TEMPORARY|UNLOGGED)\s+)?(TABLE|MATERIALIZED\s+VIEW)\s[^(]*?\sAS\s
+    )
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+"""Statements which can be run with `EXPLAIN ANALYZE`."""
+
+
+@dataclass(frozen=True)
+class Step:
+    """A script of a data task and the steps it has to run after."""
+
+    name: str
+    """Path of the script relative to the task directory."""
+
+    script: SQLScript | PythonScript
+
+    dependencies: frozenset[str]
+    """Names of the steps that have to finish before this one starts."""
+
+
+def load_steps(task_dir, template_vars: dict) -> list[Step]:
+    """
+    Read the steps of the task in `task_dir`.
+
+    :param task_dir: The directory to read from
+    :param template_vars: Variables to include in Jinja2 SQL files
+
+    :raises NotADirectoryError: if `task_dir` is not a directory
+    :raises ValueError: if a `dependencies.json` file is not valid
+    """
+    if not os.path.isdir(task_dir):
+        raise NotADirectoryError(f"Cannot find the task directory: '{task_dir}'")
+
+    return _load_steps(str(task_dir), "", frozenset(), template_vars)
+
+
+def _load_steps(directory, prefix, after, template_vars):
+    children = [
+        item
+        for item in sorted(os.listdir(directory))
+        if os.path.isdir(os.path.join(directory, item))
+        or item.endswith((".sql", ".py"))
+    ]
+    dependencies = _load_dependencies(directory, children)
+
+    steps: list[Step] = []
+    # The names of the last steps of each child, the ones anything depending
+    # on the child has to wait for.
+    ends: dict[str, frozenset[str]] = {}
+    for child in children:
+        path = os.path.join(directory, child)
+        name = prefix + child
+        # Children with dependencies wait for `after` through them.
+        child_after = (
+            frozenset().union(*(ends[dependency] for dependency in dependencies[child]))
+            if dependencies[child]
+            else after
+        )
+
+        if os.path.isdir(path):
+            child_steps = _load_steps(path, name + "/", child_after, template_vars)
+        elif child.endswith(".sql"):
+            child_steps = [
+                Step(name, SQLScript(path, template_vars=template_vars), child_after)
+            ]
+        else:
+            child_steps = [Step(name, PythonScript(path), child_after)]
+
+        names = {step.name for step in child_steps}
+        names.difference_update(*(step.dependencies for step in child_steps))
+        # An empty directory doesn't hold anything up.
+        ends[child] = frozenset(names) or child_after
+        steps.extend(child_steps)
+
+    return steps
+
+
+def _load_dependencies(directory, children) -> dict[str, list[str]]:
+    path = os.path.join(directory, DEPENDENCIES_FILE)
+    if not os.path.exists(path):
+        # Without a declaration every child runs after the one before it.
+        return {
+            child: children[index - 1 : index] for index, child in enumerate(children)
+        }
+
+    with open(path, encoding="utf-8") as handle:
+        dependencies = json.load(handle)
+
+    if sorted(dependencies) != children:
+        raise ValueError(f"{path} must list exactly: {', '.join(children)}")
+
+    for index, child in enumerate(children):
+        for dependency in dependencies[child]:
+            if dependency not in children[:index]:
+                raise ValueError(
+                    f"{path}: {child} can only depend on the children before it, not {dependency}"
+                )
+
+    return dependencies
+
+
+class Runner:  # pylint:disable=too-many-instance-attributes
+    """
+    Run the steps of a data task, up to `jobs` of them at the same time.
+
+    Unless `commit_steps` is on the whole task runs in one transaction, one
+    step at a time, and can't be resumed.
+    """
+
+    def __init__(  # pylint:disable=too-many-arguments
+        self,
+        engine: Engine,
+        task: str,
+        jobs: int = 1,
+        dry_run: bool = False,
+        no_python: bool = False,
+        stats_file: str | None = None,
+        explain: bool = False,
+        commit_steps: bool = False,
+    ):
+        if jobs > 1 and not commit_steps:
+            raise ValueError("Steps can only run at the same time with commit_steps")
+
+        self._engine = engine
+        self._task = task
+        self._jobs = jobs
+        self._commit_steps = commit_steps
+        self._connection = None
+        self._dry_run = dry_run
+        self._no_python = no_python
+        self._stats_file = stats_file
+        self._explain = explain
+        self._output_lock = threading.Lock()
+        self._query_stats: dict[str, list[dict]] = {}
+
+    def run(self, steps: list[Step], resume: bool = False) -> None:
+        """
+        Run `steps`, each one as soon as the steps it depends on are done.
+
+        When a step fails no more steps are started and, once the running ones
+        finish, the error is raised.
+
+        :param steps: The steps of the task, from `load_steps()`
+        :param resume: Skip the steps which finished in the last run
+
+        :raises ValueError: if `resume` is used without `commit_steps`
+        """
+        if resume and not self._commit_steps:
+            raise ValueError("Only tasks run with commit_steps can be resumed")
+
+        with self._task_connection():
+            self._run(steps, resume)
+
+    def _run(self, steps: list[Step], resume: bool) -> None:
+        started_at = datetime.utcnow()
+        done = self._start(resume)
+        pending = [step for step in steps if step.name not in done]
+        running = {}
+        error = None
+
+        with ThreadPoolExecutor(max_workers=self._jobs) as executor:
+            while pending or running:
+                if not error:
+                    ready = [step for step in pending if step.dependencies <= done]
+                    # Only submit what can start now, so nothing is left
+                    # queued in the executor if a step fails.
+                    for step in ready[: self._jobs - len(running)]:
+                        pending.remove(step)
+                        running[executor.submit(self._run_step, step)] = step
+
+                if not running:
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    step = running.pop(future)
+                    if future.exception():
+                        self._output(f"Failed: {step.name}\n")
+                        error = error or future.exception()
+                    else:
+                        done.add(step.name)
+
+        self._output_timings(steps)
+        if self._stats_file:
+            self._write_stats(steps, started_at, resume, failed=bool(error))
+
+        if error:
+            if self._commit_steps:
+                self._output("Run the task again with `--resume` to continue.")
+            raise error
+
+        self._clear_done()
+
+    def _run_step(self, step: Step) -> None:
+        if self._no_python and isinstance(step.script, PythonScript):
+            self._output(f"Skipping: {step.script}")
+            return
+
+        query_stats = self._query_stats[step.name] = []
+
+        with self._step_connection() as connection:
+            queries = step.script.queries if isinstance(step.script, SQLScript) else []
+            with self._watch_statements(connection, queries) as statements:
+                for item in step.script.execute(connection, dry_run=self._dry_run):
+                    if self._dry_run:
+                        self._output("Dry run!")
+
+                    if isinstance(item, SQLQuery) and (
+                        statement := statements.pop(item.text, None)
+                    ):
+                        query_stats.append(_get_query_stats(item, statement))
+
+                    self._output(item.dump(indent="    ") + "\n")
+
+            if self._commit_steps and not self._dry_run:
+                # Record the step in the same transaction, so it's only
+                # recorded if its changes are committed.
+                connection.execute(
+                    sa.insert(TaskDone).values(
+                        key=self._done_key(step.name),
+                        data={"type": "data_task_step", "task": self._task},
+                    )
+                )
+
+    @contextmanager
+    def _task_connection(self):
+        """Hold the connection of the task's transaction unless steps commit."""
+        if self._commit_steps:
+            yield
+            return
+
+        with self._engine.begin() as connection:
+            self._connection = connection
+            try:
+                yield
+            finally:
+                self._connection = None
+
+    @contextmanager
+    def _step_connection(self):
+        """Return the task's connection or a new transaction for the step."""
+        if self._connection is not None:
+            yield self._connection
+            return
+
+        with self._engine.begin() as connection:
+            yield connection
+
+    @contextmanager
+    def _watch_statements(self, connection, queries: list[SQLQuery]):
+        """
+        Record the rows of each of `queries` run on `connection`, by its text.
+
+        Explainable queries are replaced by their `EXPLAIN ANALYZE` if
+        `explain` is on, which runs them too. Any other statements run on the
+        connection are left alone.
+        """
+        query_texts = {query.text for query in queries}
+        statements: dict[str, dict] = {}
+
+        def before_cursor_execute(
+            _conn, _cursor, statement, parameters, context, _executemany
+        ):
+            if (query_text := _query_text(context)) not in query_texts:
+                return statement, parameters
+
+            explained = self._explain and bool(_EXPLAINABLE.match(statement))
+            statements[query_text] = {"explained": explained, "rows": None}
+            if explained:
+                statement = f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}"
+
+            return statement, parameters
+
+        def after_cursor_execute(
+            _conn, cursor, _statement, _parameters, context, _executemany
+        ):
+            query_text = _query_text(context)
+            if query_text in statements and cursor.rowcount >= 0:
+                statements[query_text]["rows"] = cursor.rowcount
+
+        event.listen(
+            connection, "before_cursor_execute", before_cursor_execute, retval=True
+        )
+        event.listen(connection, "after_cursor_execute", after_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(connection, "before_cursor_execute", before_cursor_execute)
+            event.remove(connection, "after_cursor_execute", after_cursor_execute)
+
+    def _start(self, resume: bool) -> set[str]:
+        """Return the names of the steps that finished in the last run."""
+        if not self._commit_steps:
+            return set()
+
+        if not resume:
+            self._clear_done()
+            return set()
+
+        prefix = self._done_key("")
+        with self._engine.begin() as connection:
+            keys = connection.scalars(
+                sa.select(TaskDone.key).where(TaskDone.key.startswith(prefix))
+            )
+            return {key.removeprefix(prefix) for key in keys}
+
+    def _clear_done(self) -> None:
+        if self._dry_run or not self._commit_steps:
+            return
+
+        with self._engine.begin() as connection:
+            connection.execute(
+                sa.delete(TaskDone).where(TaskDone.key.startswith(self._done_key("")))
+            )
+
+    def _done_key(self, name: str) -> str:
+        return f"data_task::{self._task}::{name}"
+
+    def _write_stats(self, steps, started_at, resume, failed) -> None:
+        run = {
+            "task": self._task,
+            "started_at": started_at.isoformat(),
+            "jobs": self._jobs,
+            "resume": resume,
+            "explain": self._explain,
+            "failed": failed,
+            "steps": [
+                {
+                    "name": step.name,
+                    "started_at": step.script.timing.start_time.isoformat(),
+                    "duration": _seconds(step.script.timing.duration),
+                    "queries": self._query_stats.get(step.name, []),
+                }
+                for step in steps
+                if step.script.timing.start_time is not None
+            ],
+        }
+
+        with open(self._stats_file, "a", encoding="utf-8") as handle:
+            handle.write(json.dumps(run) + "\n")
+
+    def _output_timings(self, steps: list[Step]) -> None:
+        lines = []
+        for step in steps:
+            if step.script.timing.duration is None:
+                continue
+
+            rows = [
+                query["rows"]
+                for query in self._query_stats.get(step.name, [])
+                if query["rows"] is not None
+            ]
+            rows_text = f"{sum(rows):>10} rows" if rows else " " * 15
+            lines.append(f"    {step.script.timing.duration}  {rows_text}  {step.name}")
+
+        self._output("\n".join(["Step timings:", *lines]) + "\n")
+
+    def _output(self, text: str) -> None:
+        # Print whole blocks at once so steps running at the same time don't
+        # interleave their output.
+        with self._output_lock:
+            print(text, flush=True)
+
+
+def _query_text(context) -> str | None:
+    """Return the text of the `SQLQuery` being run in `context`, if it's one."""
+    # SQLQuery runs its text as a `sa.text()` clause.
+    if context.compiled and isinstance(context.compiled.statement, sa.TextClause):
+        return context.compiled.statement.text
+
+    return None
+
+
+def _get_query_stats(query: SQLQuery, statement: dict) -> dict:
+    stats = {
+        "index": query.index,
+        "duration": _seconds(query.timing.duration),
+        "rows": statement["rows"],
+    }
+
+    if statement["explained"]:
+        plan = query.rows[0][0][0]
+        node = plan["Plan"]
+        if node["Node Type"] == "ModifyTable":
+            # Without RETURNING these don't return any rows, count the rows
+            # they got from their input instead.
+            node = [
+                child
+                for child in node["Plans"]
+                if child["Parent Relationship"] == "Outer"
+            ][0]
+
+        stats["rows"] = node["Actual Rows"] * node["Actual Loops"]
+        stats["buffers"] = {
+            key: value for key, value in plan["Plan"].items() if key.endswith(" Blocks")
+        }
+        stats["plan"] = plan
+
+    return stats
+
+
+def _seconds(duration):
+    return duration.total_seconds() if duration is not None else None
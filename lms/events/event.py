@@ -1,4 +1,5 @@
 from dataclasses import asdict, dataclass, field, fields
+from datetime import datetime
 
 from pyramid.request import Request
 from sqlalchemy import inspect
@@ -31,6 +32,9 @@ class BaseEvent:  # pylint:disable=too-many-instance-attributes
     data: dict | None = None
     """Extra data to associate with this event"""
 
+    timestamp: datetime = field(default_factory=datetime.utcnow, compare=False)
+    """When the event happened, it might be recorded some time later"""
+
     Type = EventType.Type
     """Expose the type here for the callers convenience"""
 
@@ -3,9 +3,29 @@ from pyramid.events import subscriber
 from lms.events.event import BaseEvent
 from lms.services import EventService
 
+RELIABLE_EVENT_TYPES = {
+    BaseEvent.Type.AUDIT_TRAIL,
+    BaseEvent.Type.GRADE,
+    BaseEvent.Type.SUBMISSION,
+}
+"""Types of events recorded in the request's own transaction instead of queued."""
+
 
 @subscriber(BaseEvent)
 def handle_event(event: BaseEvent):
     """Record the event in the Event model's table."""
     assert event.request
-    event.request.find_service(EventService).insert_event(event)
+
+    if event.type in RELIABLE_EVENT_TYPES:
+        # These are recorded along with the changes they refer to, or not at
+        # all, and don't depend on the in-memory queue.
+        event.request.find_service(EventService).insert_event(event)
+        return
+
+    def queue_event(success):
+        # The event might refer to rows created in this transaction so only
+        # record it once they are committed.
+        if success:
+            EventService.queue_event(event)
+
+    event.request.tm.get().addAfterCommitHook(queue_event)
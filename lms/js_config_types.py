@@ -37,6 +37,28 @@ class APIAssignment(TypedDict):
     stats: NotRequired[AssignmentStats]
 
 
+class CourseStats(TypedDict):
+    assignments: int
+    annotations: int
+    replies: int
+    last_activity: str | None
+
+
+class APICourseStats(APICourse):
+    stats: CourseStats
+
+
+class OrganizationStats(CourseStats):
+    courses: int
+
+
+class APIOrganizationStats(TypedDict):
+    id: str
+    name: str
+    stats: OrganizationStats
+    courses: list[APICourseStats]
+
+
 class DashboardRoutes(TypedDict):
     assignment: str
     assignment_stats: str
@@ -0,0 +1,355 @@
+"""
+Partition the event tables by month.
+
+event_user and event_data get a copy of the event's timestamp so they can be
+partitioned in the same way as event.
+
+The tables are re-created and the existing rows copied over in the
+migration's transaction. The event tables are locked until it commits, so run
+it in a maintenance window: requests and workers recording events will wait
+for it.
+
+lti_launches is re-created here. Any other views on the event tables, like the
+ones in the report schema, stop the migration: drop them before running it
+(for example with `DROP SCHEMA report CASCADE`) and re-create the report
+schema with the `report/create_from_scratch` data task after it.
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision = "b5e1d2a4c7f3"
+down_revision = "7ef5569fca11"
+
+
+PARTITIONS_AHEAD = 3
+"""How many months of empty partitions to create after the current one."""
+
+
+def upgrade() -> None:
+    _move_old_tables_out_of_the_way()
+    _create_tables(partitioned=True)
+
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+            month date;
+            next_month date;
+            partition_table text;
+        BEGIN
+            FOR month IN
+                SELECT generate_series(
+                    COALESCE(
+                        DATE_TRUNC('month', (SELECT MIN(timestamp) FROM event_old)),
+                        DATE_TRUNC('month', NOW())
+                    ),
+                    DATE_TRUNC('month', NOW()) + INTERVAL '{PARTITIONS_AHEAD} months',
+                    INTERVAL '1 month'
+                )
+            LOOP
+                next_month := month + INTERVAL '1 month';
+                FOREACH partition_table IN ARRAY ARRAY['event', 'event_user', 'event_data']
+                LOOP
+                    EXECUTE format(
+                        'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                        partition_table || TO_CHAR(month, '_"y"YYYY"m"MM'),
+                        partition_table,
+                        month,
+                        next_month
+                    );
+                END LOOP;
+            END LOOP;
+        END
+        $$;
+        """
+    )
+    for table in ["event", "event_user", "event_data"]:
+        op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+    _copy_old_rows(partitioned=True)
+    _drop_old_tables()
+
+
+def downgrade() -> None:
+    _move_old_tables_out_of_the_way()
+    _create_tables(partitioned=False)
+    _copy_old_rows(partitioned=False)
+    _drop_old_tables()
+
+
+def _move_old_tables_out_of_the_way():
+    op.execute("DROP VIEW IF EXISTS lti_launches")
+
+    if dependent_views := (
+        op.get_bind()
+        .scalars(
+            sa.text(
+                """
+                SELECT DISTINCT view.oid::regclass::text
+                FROM pg_depend
+                JOIN pg_rewrite ON pg_rewrite.oid = pg_depend.objid
+                JOIN pg_class view ON view.oid = pg_rewrite.ev_class
+                WHERE
+                    pg_depend.refobjid IN (
+                        'event'::regclass, 'event_user'::regclass, 'event_data'::regclass
+                    )
+                    AND view.oid != pg_depend.refobjid
+                """
+            )
+        )
+        .all()
+    ):
+        raise RuntimeError(
+            "Drop the views on the event tables before running this migration: "
+            + ", ".join(dependent_views)
+        )
+
+    for table in ["event", "event_user", "event_data"]:
+        op.rename_table(table, f"{table}_old")
+
+    # Free the names of the indexes for the new tables.
+    for index in [
+        "pk__event",
+        "pk__event_user",
+        "uq__event_user__event_id",
+        "pk__event_data",
+    ]:
+        op.execute(f"ALTER INDEX {index} RENAME TO {index}_old")
+
+    for index, table in [
+        ("ix__event_timestamp", "event_old"),
+        ("ix__event_application_instance_id", "event_old"),
+        ("ix__event_assignment_id", "event_old"),
+        ("ix__event_course_id", "event_old"),
+        ("ix__event_type_id", "event_old"),
+        ("ix__event_user_lti_role_id", "event_user_old"),
+        ("ix__event_user_user_id", "event_user_old"),
+    ]:
+        op.drop_index(index, table_name=table)
+
+
+def _create_tables(partitioned: bool):
+    # Only the partitioned tables need the timestamp in their keys.
+    key = ["timestamp"] if partitioned else []
+    table_kwargs = (
+        {"postgresql_partition_by": "RANGE (timestamp)"} if partitioned else {}
+    )
+
+    op.create_table(
+        "event",
+        sa.Column(
+            "id",
+            sa.Integer(),
+            server_default=sa.text("nextval('event_id_seq'::regclass)"),
+            nullable=False,
+        ),
+        sa.Column(
+            "timestamp",
+            sa.DateTime(),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("type_id", sa.Integer(), nullable=True),
+        sa.Column("application_instance_id", sa.Integer(), nullable=True),
+        sa.Column("course_id", sa.Integer(), nullable=True),
+        sa.Column("assignment_id", sa.Integer(), nullable=True),
+        sa.Column("grouping_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["application_instance_id"],
+            ["application_instances.id"],
+            name=op.f("fk__event__application_instance_id__application_instances"),
+            ondelete="cascade",
+        ),
+        sa.ForeignKeyConstraint(
+            ["assignment_id"],
+            ["assignment.id"],
+            name=op.f("fk__event__assignment_id__assignment"),
+            ondelete="cascade",
+        ),
+        sa.ForeignKeyConstraint(
+            ["course_id"],
+            ["grouping.id"],
+            name=op.f("fk__event__course_id__grouping"),
+            ondelete="cascade",
+        ),
+        sa.ForeignKeyConstraint(
+            ["grouping_id"],
+            ["grouping.id"],
+            name=op.f("fk__event__grouping_id__grouping"),
+            ondelete="cascade",
+        ),
+        sa.ForeignKeyConstraint(
+            ["type_id"],
+            ["event_type.id"],
+            name=op.f("fk__event__type_id__event_type"),
+            ondelete="cascade",
+        ),
+        sa.PrimaryKeyConstraint("id", *key, name=op.f("pk__event")),
+        **table_kwargs,
+    )
+    op.create_index(op.f("ix__event_timestamp"), "event", ["timestamp"], unique=False)
+    op.create_index(
+        op.f("ix__event_application_instance_id"),
+        "event",
+        ["application_instance_id"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix__event_assignment_id"), "event", ["assignment_id"], unique=False
+    )
+    op.create_index(op.f("ix__event_course_id"), "event", ["course_id"], unique=False)
+    op.create_index(op.f("ix__event_type_id"), "event", ["type_id"], unique=False)
+
+    op.create_table(
+        "event_user",
+        sa.Column(
+            "id",
+            sa.Integer(),
+            server_default=sa.text("nextval('event_user_id_seq'::regclass)"),
+            nullable=False,
+        ),
+        sa.Column("event_id", sa.Integer(), nullable=False),
+        *(
+            [sa.Column("timestamp", sa.DateTime(), nullable=False)]
+            if partitioned
+            else []
+        ),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("lti_role_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["event_id", *key],
+            ["event.id", *(f"event.{column}" for column in key)],
+            name=op.f("fk__event_user__event_id__event"),
+            ondelete="cascade",
+        ),
+        sa.ForeignKeyConstraint(
+            ["lti_role_id"],
+            ["lti_role.id"],
+            name=op.f("fk__event_user__lti_role_id__lti_role"),
+            ondelete="cascade",
+        ),
+        sa.ForeignKeyConstraint(
+            ["user_id"],
+            ["user.id"],
+            name=op.f("fk__event_user__user_id__user"),
+            ondelete="cascade",
+        ),
+        sa.PrimaryKeyConstraint("id", "event_id", *key, name=op.f("pk__event_user")),
+        sa.UniqueConstraint(
+            "event_id",
+            "user_id",
+            "lti_role_id",
+            *key,
+            name=op.f("uq__event_user__event_id"),
+        ),
+        **table_kwargs,
+    )
+    op.create_index(
+        op.f("ix__event_user_lti_role_id"), "event_user", ["lti_role_id"], unique=False
+    )
+    op.create_index(
+        op.f("ix__event_user_user_id"), "event_user", ["user_id"], unique=False
+    )
+
+    op.create_table(
+        "event_data",
+        sa.Column("event_id", sa.Integer(), nullable=False),
+        *(
+            [sa.Column("timestamp", sa.DateTime(), nullable=False)]
+            if partitioned
+            else []
+        ),
+        sa.Column(
+            "extra",
+            postgresql.JSONB(astext_type=sa.Text()),
+            server_default=sa.text("'{}'::jsonb"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(
+            ["event_id", *key],
+            ["event.id", *(f"event.{column}" for column in key)],
+            name=op.f("fk__event_data__event_id__event"),
+            ondelete="cascade",
+        ),
+        sa.PrimaryKeyConstraint("event_id", *key, name=op.f("pk__event_data")),
+        **table_kwargs,
+    )
+
+    # Keep the sequences when the old tables are dropped.
+    op.execute("ALTER SEQUENCE event_id_seq OWNED BY event.id")
+    op.execute("ALTER SEQUENCE event_user_id_seq OWNED BY event_user.id")
+
+
+def _copy_old_rows(partitioned: bool):
+    op.execute(
+        """
+        INSERT INTO event (
+            id,
+            timestamp,
+            type_id,
+            application_instance_id,
+            course_id,
+            assignment_id,
+            grouping_id
+        )
+        SELECT
+            id,
+            timestamp,
+            type_id,
+            application_instance_id,
+            course_id,
+            assignment_id,
+            grouping_id
+        FROM event_old
+        """
+    )
+
+    # The partitioned tables get a copy of the event's timestamp.
+    timestamp = ", timestamp" if partitioned else ""
+    op.execute(
+        f"""
+        INSERT INTO event_user (id, event_id, user_id, lti_role_id{timestamp})
+        SELECT
+            event_user_old.id,
+            event_user_old.event_id,
+            event_user_old.user_id,
+            event_user_old.lti_role_id{timestamp and ", event_old.timestamp"}
+        FROM event_user_old
+        JOIN event_old ON event_old.id = event_user_old.event_id
+        """
+    )
+    op.execute(
+        f"""
+        INSERT INTO event_data (event_id, extra{timestamp})
+        SELECT
+            event_data_old.event_id,
+            event_data_old.extra{timestamp and ", event_old.timestamp"}
+        FROM event_data_old
+        JOIN event_old ON event_old.id = event_data_old.event_id
+        """
+    )
+
+
+def _drop_old_tables():
+    op.execute("DROP TABLE event_data_old, event_user_old, event_old")
+
+    op.execute(
+        """
+        CREATE VIEW lti_launches AS (
+            SELECT
+                event.id,
+                event.timestamp AS created,
+                grouping.lms_id AS context_id,
+                application_instances.consumer_key AS lti_key
+            FROM event
+            JOIN event_type ON event.type_id = event_type.id
+            JOIN application_instances
+                ON event.application_instance_id = application_instances.id
+            JOIN grouping
+                ON event.course_id = grouping.id
+            WHERE event_type.type = 'configured_launch'
+        )
+        """
+    )
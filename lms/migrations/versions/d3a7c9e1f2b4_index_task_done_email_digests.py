@@ -0,0 +1,23 @@
+"""Add an index for finding each user's latest email digest in task_done."""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "d3a7c9e1f2b4"
+down_revision = "b5e1d2a4c7f3"
+
+
+def upgrade() -> None:
+    op.create_index(
+        op.f("ix__task_done_instructor_email_digest"),
+        "task_done",
+        [
+            sa.text("(data ->> 'h_userid')"),
+            sa.text("(data ->> 'created_before') DESC"),
+        ],
+        postgresql_where=sa.text("(data ->> 'type') = 'instructor_email_digest'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix__task_done_instructor_email_digest"), table_name="task_done")
@@ -28,6 +28,7 @@ class Event(Base):
     """Model to store any relevant events that occur within the application."""
 
     __tablename__ = "event"
+    __table_args__ = ({"postgresql_partition_by": "RANGE (timestamp)"},)
 
     id = mapped_column(sa.Integer, autoincrement=True, primary_key=True)
 
@@ -36,6 +37,8 @@ class Event(Base):
         server_default=sa.func.now(),  # pylint:disable=not-callable
         nullable=False,
         index=True,
+        # The table is partitioned by timestamp so it has to be part of the PK
+        primary_key=True,
     )
     """Time the event occurred, defaults to now() if not specified"""
 
@@ -84,16 +87,22 @@ class EventUser(Base):
 
     __tablename__ = "event_user"
 
-    __table_args__ = (sa.UniqueConstraint("event_id", "user_id", "lti_role_id"),)
+    __table_args__ = (
+        sa.UniqueConstraint("event_id", "user_id", "lti_role_id", "timestamp"),
+        sa.ForeignKeyConstraint(
+            ["event_id", "timestamp"],
+            ["event.id", "event.timestamp"],
+            ondelete="cascade",
+        ),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
 
     id = sa.Column(sa.Integer, autoincrement=True, primary_key=True)
 
-    event_id = sa.Column(
-        sa.Integer(),
-        sa.ForeignKey("event.id", ondelete="cascade"),
-        nullable=False,
-        primary_key=True,
-    )
+    event_id = sa.Column(sa.Integer(), nullable=False, primary_key=True)
+    timestamp = sa.Column(sa.DateTime(), nullable=False, primary_key=True)
+    """A copy of the event's timestamp to partition this table in the same way"""
+
     event = sa.orm.relationship("Event")
 
     user_id = sa.Column(
@@ -119,13 +128,19 @@ class EventData(Base):
     """Keep potentially large blobs of data about an event in a separate table."""
 
     __tablename__ = "event_data"
-
-    event_id = sa.Column(
-        sa.Integer(),
-        sa.ForeignKey("event.id", ondelete="cascade"),
-        nullable=False,
-        primary_key=True,
+    __table_args__ = (
+        sa.ForeignKeyConstraint(
+            ["event_id", "timestamp"],
+            ["event.id", "event.timestamp"],
+            ondelete="cascade",
+        ),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
     )
+
+    event_id = sa.Column(sa.Integer(), nullable=False, primary_key=True)
+    timestamp = sa.Column(sa.DateTime(), nullable=False, primary_key=True)
+    """A copy of the event's timestamp to partition this table in the same way"""
+
     event = sa.orm.relationship("Event")
 
     data: Mapped[MutableDict] = mapped_column(
@@ -134,3 +149,19 @@ class EventData(Base):
         server_default=sa.text("'{}'::jsonb"),
         nullable=False,
     )
+
+
+PARTITIONED_TABLES = [Event.__table__, EventUser.__table__, EventData.__table__]
+"""
+Tables partitioned by month of the events' timestamp.
+
+Besides the monthly partitions each of them has a default partition for any
+rows outside of them.
+"""
+
+for _table in PARTITIONED_TABLES:
+    sa.event.listen(
+        _table,
+        "after_create",
+        sa.DDL("CREATE TABLE %(table)s_default PARTITION OF %(table)s DEFAULT"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, Integer, UnicodeText, text
+from sqlalchemy import Column, DateTime, Index, Integer, UnicodeText, text
 from sqlalchemy.dialects.postgresql import JSONB
 
 from lms.db import Base
@@ -7,6 +7,15 @@ from lms.models._mixins import CreatedUpdatedMixin
 
 class TaskDone(CreatedUpdatedMixin, Base):
     __tablename__ = "task_done"
+    __table_args__ = (
+        # For finding the latest email digest sent to each user.
+        Index(
+            "ix__task_done_instructor_email_digest",
+            text("(data ->> 'h_userid')"),
+            text("(data ->> 'created_before') DESC"),
+            postgresql_where=text("(data ->> 'type') = 'instructor_email_digest'"),
+        ),
+    )
 
     id = Column(Integer, autoincrement=True, primary_key=True)
     key = Column(UnicodeText, nullable=False, unique=True)
@@ -257,3 +257,7 @@ def includeme(config):  # pylint:disable=too-many-statements
         "dashboard.api.course.assignments.stats",
         "/dashboard/api/course/{course_id}/assignments/stats",
     )
+    config.add_route(
+        "dashboard.api.organization.stats",
+        "/dashboard/api/organization/{public_id}/stats",
+    )
@@ -192,14 +192,26 @@ class LTIUserSecurityPolicy:
 
         return identity.userid
 
-    def identity(self, request) -> Identity | None:
+    @lru_cache(maxsize=1)
+    def _resolve_lti_user(self, request) -> tuple[LTIUser | None, Exception | None]:
+        """
+        Return the result of get_lti_user() for `request` and any exception it raised.
+
+        Pyramid calls identity(), permits() and authenticated_userid() several
+        times per request, this makes sure we only decode and deserialize the
+        LTIUser once. Exceptions are returned rather than raised so that
+        failures are cached too.
+        """
         try:
-            lti_user = self.get_lti_user(request)
-        except Exception:  # pylint:disable=broad-exception-caught
-            # If anything went wrong, no identity
-            return None
+            return self.get_lti_user(request), None
+        except Exception as err:  # pylint:disable=broad-exception-caught
+            return None, err
+
+    def identity(self, request) -> Identity | None:
+        lti_user, _ = self._resolve_lti_user(request)
 
         if lti_user is None:
+            # If anything went wrong, no identity
             return None
 
         permissions = []
@@ -219,11 +231,8 @@ class LTIUserSecurityPolicy:
         return Identity(self._get_userid(lti_user), permissions, lti_user)
 
     def permits(self, request, _context, permission):
-        try:
-            # Getting lti_use here again for the potential exception
-            # side effect and allow us to return DeniedWithException accordingly
-            self.get_lti_user(request)
-        except Exception as err:  # pylint:disable=broad-exception-caught
+        _, err = self._resolve_lti_user(request)
+        if err:
             return DeniedWithException(err)
 
         return _permits(self.identity(request), permission)
@@ -3,6 +3,7 @@ from lms.services.application_instance import ApplicationInstanceNotFound
 from lms.services.canvas import CanvasService
 from lms.services.canvas_studio import CanvasStudioService
 from lms.services.d2l_api.client import D2LAPIClient
+from lms.services.dashboard_stats import DashboardStatsService
 from lms.services.digest import DigestService
 from lms.services.email_preferences import EmailPreferencesService, EmailPrefs
 from lms.services.event import EventService
@@ -137,6 +138,9 @@ def includeme(config):
     config.register_service_factory(
         "lms.services.email_preferences.factory", iface=EmailPreferencesService
     )
+    config.register_service_factory(
+        "lms.services.dashboard_stats.factory", iface=DashboardStatsService
+    )
     config.register_service_factory(
         "lms.services.youtube.factory", iface=YouTubeService
     )
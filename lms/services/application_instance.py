@@ -1,13 +1,24 @@
 import secrets
+from copy import deepcopy
+from dataclasses import dataclass
 from datetime import datetime
-from functools import lru_cache
+from itertools import chain
 from logging import getLogger
 
 import sqlalchemy as sa
+from cachetools import TTLCache
 from sqlalchemy.exc import NoResultFound
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
 
 from lms.db import full_text_match
-from lms.models import ApplicationInstance, JSONSettings, LTIParams, LTIRegistration
+from lms.models import (
+    ApplicationInstance,
+    JSONSettings,
+    LTIParams,
+    LTIRegistration,
+    Organization,
+)
 from lms.services.aes import AESService
 from lms.services.exceptions import SerializableError
 from lms.services.organization import OrganizationService
@@ -15,6 +26,22 @@ from lms.validation import ValidationError
 
 LOG = getLogger(__name__)
 
+_CACHE = TTLCache(maxsize=4096, ttl=300)
+"""
+Recently looked up application instances, keyed by how they were looked up.
+
+Keys are ("id", id_), ("consumer_key", consumer_key) or
+("deployment_id", issuer, client_id, deployment_id) and values are
+_CachedApplicationInstance's.
+
+The whole cache is cleared whenever a change to an application instance, its
+organization or its LTI registration is flushed in this process. Other
+processes will see the change once the TTL expires.
+"""
+
+_IGNORED_CHANGES = {"last_launched"}
+"""Attributes that can change without invalidating the cache."""
+
 
 class ApplicationInstanceNotFound(Exception):
     """The requested ApplicationInstance wasn't found in the database."""
@@ -69,6 +96,104 @@ def _email_or_domain_match(columns, email):
     )
 
 
+@dataclass(frozen=True)
+class _CachedApplicationInstance:
+    """The column values of an application instance and its related rows."""
+
+    application_instance: dict
+    organization: dict | None
+    lti_registration: dict | None
+
+    @classmethod
+    def from_model(cls, application_instance: ApplicationInstance):
+        return cls(
+            application_instance=_columns(application_instance),
+            organization=_columns(application_instance.organization),
+            lti_registration=_columns(application_instance.lti_registration),
+        )
+
+    def restore(self, db) -> ApplicationInstance:
+        """Attach the cached rows to the `db` session without querying the DB."""
+        application_instance = _merge(
+            db, ApplicationInstance, self.application_instance
+        )
+
+        for relationship, model_class, columns in (
+            ("organization", Organization, self.organization),
+            ("lti_registration", LTIRegistration, self.lti_registration),
+        ):
+            if relationship not in application_instance.__dict__:
+                # Populate the relationship as if it had been loaded, this also
+                # keeps the related object alive in the session.
+                set_committed_value(
+                    application_instance,
+                    relationship,
+                    _merge(db, model_class, columns),
+                )
+
+        return application_instance
+
+
+def _columns(model) -> dict | None:
+    if model is None:
+        return None
+
+    return deepcopy(
+        {
+            attr.key: getattr(model, attr.key)
+            for attr in sa.inspect(model).mapper.column_attrs
+        }
+    )
+
+
+def _merge(db, model_class, columns: dict | None):
+    if columns is None:
+        return None
+
+    mapper = sa.inspect(model_class)
+    if existing := db.identity_map.get(
+        mapper.identity_key_from_primary_key((columns["id"],))
+    ):
+        # Don't overwrite any changes made to it in this session.
+        return existing
+
+    # Create the object through the constructor (rather than setting committed
+    # values directly) so that mutable JSON columns track changes as usual.
+    model = model_class(**deepcopy(columns))
+    make_transient_to_detached(model)
+    return db.merge(model, load=False)
+
+
+def _has_changes(model) -> bool:
+    state = sa.inspect(model)
+    return state.deleted or any(
+        state.attrs[prop.key].history.has_changes()
+        for prop in state.mapper.iterate_properties
+        # Collections (like ApplicationInstance.courses) aren't cached
+        if not getattr(prop, "uselist", False) and prop.key not in _IGNORED_CHANGES
+    )
+
+
+@sa.event.listens_for(Session, "before_flush")
+def _invalidate_cache(session, _flush_context, _instances):
+    if any(
+        isinstance(model, (ApplicationInstance, Organization, LTIRegistration))
+        and _has_changes(model)
+        for model in chain(session.dirty, session.deleted)
+    ):
+        _CACHE.clear()
+        # Clear it again at the end of the transaction in case the new values
+        # get rolled back or a concurrent request caches the old values.
+        session.info["application_instance_cache_stale"] = True
+
+
+@sa.event.listens_for(Session, "after_commit")
+@sa.event.listens_for(Session, "after_rollback")
+def _invalidate_cache_after_transaction(session):
+    if session.info.pop("application_instance_cache_stale", False):
+        _CACHE.clear()
+
+
 class ApplicationInstanceService:
     def __init__(
         self,
@@ -80,7 +205,6 @@ class ApplicationInstanceService:
         self._aes_service = aes_service
         self._organization_service = organization_service
 
-    @lru_cache(maxsize=1)
     def get_for_launch(self, id_) -> ApplicationInstance:
         """
         Return the current request's `ApplicationInstance`.
@@ -119,14 +243,9 @@ class ApplicationInstanceService:
 
         raise ApplicationInstanceNotFound()
 
-    @lru_cache(maxsize=1)
     def get_by_id(self, id_) -> ApplicationInstance:
-        try:
-            return self._ai_search_query(id_=id_).one()
-        except NoResultFound as err:
-            raise ApplicationInstanceNotFound() from err
+        return self._get_cached(("id", id_), id_=id_)
 
-    @lru_cache(maxsize=128)
     def get_by_consumer_key(self, consumer_key) -> ApplicationInstance:
         """
         Return the `ApplicationInstance` with the given `consumer_key`.
@@ -138,26 +257,44 @@ class ApplicationInstanceService:
         if not consumer_key:
             raise ApplicationInstanceNotFound()
 
-        try:
-            return self._ai_search_query(consumer_key=consumer_key).one()
-        except NoResultFound as err:
-            raise ApplicationInstanceNotFound() from err
+        return self._get_cached(
+            ("consumer_key", consumer_key), consumer_key=consumer_key
+        )
 
-    @lru_cache(maxsize=128)
     def get_by_deployment_id(
         self, issuer: str, client_id: str, deployment_id: str
     ) -> ApplicationInstance:
         if not all([issuer, client_id, deployment_id]):
             raise ApplicationInstanceNotFound()
 
-        try:
-            return self._ai_search_query(
-                issuer=issuer, client_id=client_id, deployment_id=deployment_id
-            ).one()
+        return self._get_cached(
+            ("deployment_id", issuer, client_id, deployment_id),
+            issuer=issuer,
+            client_id=client_id,
+            deployment_id=deployment_id,
+        )
+
+    def _get_cached(self, key, **filters) -> ApplicationInstance:
+        """Return the application instance for `key` from _CACHE or the DB."""
+        if cached := _CACHE.get(key):
+            return cached.restore(self._db)
 
+        try:
+            application_instance = self._ai_search_query(**filters).one()
         except NoResultFound as err:
             raise ApplicationInstanceNotFound() from err
 
+        related = [
+            application_instance,
+            application_instance.organization,
+            application_instance.lti_registration,
+        ]
+        if not any(model and _has_changes(model) for model in related):
+            # Only cache what's actually in the DB.
+            _CACHE[key] = _CachedApplicationInstance.from_model(application_instance)
+
+        return application_instance
+
     def search(  # pylint:disable=too-many-arguments
         self,
         *,
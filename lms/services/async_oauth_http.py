@@ -1,10 +1,22 @@
 import asyncio
 import json
+import os
+import threading
+from collections import defaultdict
+from concurrent.futures import Future
+from functools import lru_cache, partial
 
 import aiohttp
+from yarl import URL
 
 from lms.services import ExternalAsyncRequestError
 
+CONNECTION_LIMIT = 100
+"""Maximum number of simultaneous connections for each process."""
+
+CONNECTION_LIMIT_PER_HOST = 10
+"""Maximum number of simultaneous connections to the same host."""
+
 
 class AsyncOAuthHTTPService:
     def __init__(self, oauth2_token_service):
@@ -18,8 +30,9 @@ class AsyncOAuthHTTPService:
 
         :param method: The HTTP method to use.
         :param urls:  All URLs to request
-        :param timeout: How long (in seconds) to wait before raising an error
-            for each of the requests.
+        :param timeout: How long (in seconds) each request can take, from
+            when it gets a connection, before raising an error. Waiting for a
+            free connection doesn't count.
         :param headers:  Headers to attach to all requests
         :param \**kwargs: Any other keyword arguments will be passed directly to
             aiohttp.ClientSession().request():
@@ -29,16 +42,121 @@ class AsyncOAuthHTTPService:
         :raise ExternalAsyncRequestError: if something goes wrong with the HTTP
             request
         """
+        event_loop = _get_event_loop(os.getpid())
+        try:
+            return event_loop.run(
+                _prepare_requests(
+                    event_loop,
+                    method,
+                    urls,
+                    **self._request_kwargs(timeout, headers, **kwargs),
+                ),
+                # Even if every request waits for the one before it
+                timeout=timeout * len(urls),
+            )
+        except TimeoutError as err:
+            raise ExternalAsyncRequestError() from err
+
+    def submit(
+        self, method, url: str, timeout=10, headers=None, **kwargs
+    ) -> Future[aiohttp.ClientResponse]:
+        """
+        Start an access token-authenticated async request without waiting for it.
+
+        Takes the same arguments as `request()`, but for a single URL.
+
+        :raise OAuth2TokenError: if we don't have an access token for the user
+        :return: A future of the response, which raises
+            ExternalAsyncRequestError if something goes wrong with the request
+        """
+        event_loop = _get_event_loop(os.getpid())
+        return event_loop.submit(
+            _submitted_request(
+                event_loop,
+                method,
+                url,
+                **self._request_kwargs(timeout, headers, **kwargs),
+            )
+        )
+
+    def _request_kwargs(self, timeout, headers, **kwargs) -> dict:
         headers = headers or {}
 
         access_token = self._oauth2_token_service.get().access_token
         headers["Authorization"] = f"Bearer {access_token}"
-        return asyncio.run(
-            _prepare_requests(method, urls, timeout=timeout, headers=headers, **kwargs)
+
+        return {"timeout": timeout, "headers": headers, **kwargs}
+
+
+class _EventLoop:
+    """
+    An asyncio event loop running forever in a background thread.
+
+    Running all requests in the same loop lets them share one aiohttp session,
+    and so one connection pool, instead of paying for a new loop, session and
+    TLS handshakes every time.
+
+    Requests take one of the session's connections to their host from
+    `host_slots` before they start, so they never wait for one in the
+    session's pool once their timeout is running.
+    """
+
+    def __init__(self):
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(
+            target=self._loop.run_forever, name="async_oauth_http", daemon=True
+        ).start()
+
+        self.session = self.run(_create_session(), timeout=10)
+        self.host_slots: dict[str, asyncio.Semaphore] = defaultdict(
+            partial(asyncio.Semaphore, CONNECTION_LIMIT_PER_HOST)
         )
 
+    def run(self, coroutine, timeout: float | None = None):
+        """
+        Run `coroutine` in the loop and block until it's done.
+
+        :raise TimeoutError: if it's not done after `timeout` seconds, it's
+            cancelled then
+        """
+        future = self.submit(coroutine)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def submit(self, coroutine) -> Future:
+        """Start running `coroutine` in the loop."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+
+@lru_cache(maxsize=1)
+def _get_event_loop(_pid) -> _EventLoop:
+    # Threads don't survive forking so cache the loop per process ID.
+    return _EventLoop()
+
+
+async def _create_session():
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(
+            limit=CONNECTION_LIMIT, limit_per_host=CONNECTION_LIMIT_PER_HOST
+        )
+    )
 
-async def _async_request(aio_session, method, url, **kwargs):
+
+async def _async_request(event_loop, method, url, timeout, **kwargs):
+    # Waiting for a connection to the host doesn't count towards the timeout
+    # but everything after that, including reading the body, does.
+    async with event_loop.host_slots[URL(url).origin().human_repr()]:
+        return await asyncio.wait_for(
+            _send_request(event_loop.session, method, url, **kwargs), timeout
+        )
+
+
+async def _send_request(aio_session, method, url, **kwargs):
+    # The timeout is applied by _async_request(), disable aiohttp's one
+    kwargs["timeout"] = aiohttp.ClientTimeout(total=None)
     async with aio_session.request(method, url, **kwargs) as response:
         # Calling `.text()` here caches the result in `response` but is still behind a coroutine.
         # We assign it to another response attribute for it to be
@@ -49,26 +167,32 @@ async def _async_request(aio_session, method, url, **kwargs):
         return response
 
 
-async def _prepare_requests(method, urls, **kwargs):
-    async with aiohttp.ClientSession() as session:
-        tasks = []
-        for url in urls:
-            task = asyncio.create_task(
-                _async_request(
-                    session,
-                    method,
-                    url,
-                    **kwargs,
-                )
+async def _submitted_request(event_loop, method, url, **kwargs):
+    try:
+        return await _async_request(event_loop, method, url, **kwargs)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+        raise ExternalAsyncRequestError() from err
+
+
+async def _prepare_requests(event_loop, method, urls, **kwargs):
+    tasks = []
+    for url in urls:
+        task = asyncio.create_task(
+            _async_request(
+                event_loop,
+                method,
+                url,
+                **kwargs,
             )
-            tasks.append(task)
-        try:
-            return await asyncio.gather(*tasks, return_exceptions=False)
-        except aiohttp.ClientError as err:
-            for task in tasks:
-                task.cancel()
+        )
+        tasks.append(task)
+    try:
+        return await asyncio.gather(*tasks, return_exceptions=False)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+        for task in tasks:
+            task.cancel()
 
-            raise ExternalAsyncRequestError() from err
+        raise ExternalAsyncRequestError() from err
 
 
 def factory(_context, request):
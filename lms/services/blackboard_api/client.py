@@ -1,3 +1,6 @@
+import logging
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
 from urllib.parse import urlencode
 
 from lms.services.blackboard_api._schemas import (
@@ -12,6 +15,8 @@ from lms.services.exceptions import (
     FileNotFoundInCourse,
 )
 
+LOG = logging.getLogger(__name__)
+
 # The maximum number of paginated requests we'll make before returning.
 PAGINATION_MAX_REQUESTS = 25
 
@@ -19,6 +24,18 @@ PAGINATION_MAX_REQUESTS = 25
 # 200 is the highest number that Blackboard will accept here.
 PAGINATION_LIMIT = 200
 
+# The maximum number of folder pages we'll request at the same time while
+# listing all the files in a course.
+CRAWL_CONCURRENCY = 10
+
+# The default maximum folder depth we'll descend into while listing all the
+# files in a course.
+CRAWL_MAX_DEPTH = 20
+
+# The default number of files and folders after which we'll stop listing all
+# the files in a course.
+CRAWL_MAX_ITEMS = 20000
+
 
 class BlackboardAPIClient:
     """A high-level Blackboard API client."""
@@ -55,17 +72,27 @@ class BlackboardAPIClient:
         self._store_files(course_id, files)
         return files
 
-    def list_all_files(self, course_id):
-        """Return all files and folders in a course."""
+    def list_all_files(
+        self, course_id, max_depth=CRAWL_MAX_DEPTH, max_items=CRAWL_MAX_ITEMS
+    ):
+        """
+        Return all files and folders in a course.
+
+        :param course_id: ID of the course
+        :param max_depth: Don't list the contents of folders nested deeper
+            than this
+        :param max_items: Stop listing the contents of folders once we've
+            found this many files and folders
+        """
         # Get this level all pages
         response = self._api.request("GET", self._list_files_url(course_id))
         files = self._get_all_following_pages(response, BlackboardListFilesSchema)
+        self._store_files(course_id, files)
 
         # Get all the subfolder files, recursively
-        results = self._get_all_folders_files(course_id, files)
-
-        self._store_files(course_id, results)
-        return results
+        return files + self._get_all_folders_files(
+            course_id, files, max_depth, max_items - len(files)
+        )
 
     def public_url(self, course_id, file_id):
         """Return a public URL for the given file."""
@@ -219,28 +246,93 @@ class BlackboardAPIClient:
 
         return results
 
-    def _get_all_folders_files(self, course_id, results: list[dict]) -> list[dict]:
-        """Get all the files in the folders included in `results` recursively."""
-        # Get all the folder URLs from `results`
-        folder_urls = [
-            self._api._api_url(  # pylint: disable=protected-access
-                self._list_files_url(course_id, result["id"])
+    def _get_all_folders_files(
+        self, course_id, files: list[dict], max_depth, max_items
+    ) -> list[dict]:
+        """
+        Get all the files in the folders included in `files` recursively.
+
+        Folders and their following pages are fetched breadth first from a
+        queue, keeping up to `CRAWL_CONCURRENCY` requests in flight, and the
+        files found are stored in the DB as we go.
+        """
+        async_oauth_http = self._request.find_service(name="async_oauth_http")
+        results: list[dict] = []
+        # Pending requests as (URL, folder depth, page number) tuples
+        queue = deque(self._folder_requests(course_id, files, depth=1))
+        # The queue items of the requests in flight
+        running: dict[Future, tuple[str, int, int]] = {}
+
+        try:
+            while queue or running:
+                # Don't start any more requests once we've got enough items
+                while (
+                    queue
+                    and len(running) < CRAWL_CONCURRENCY
+                    and len(results) < max_items
+                ):
+                    request = queue.popleft()
+                    running[async_oauth_http.submit("GET", request[0])] = request
+
+                if not running:
+                    break
+
+                finished = wait(running, return_when=FIRST_COMPLETED).done
+                # In the order they were requested, to keep results stable
+                for future in [future for future in running if future in finished]:
+                    page_files, requests = self._crawl_folder_page(
+                        course_id, running.pop(future), future.result(), max_depth
+                    )
+                    results.extend(page_files)
+                    queue.extend(requests)
+        finally:
+            # Don't leave anything running if a request failed
+            for future in running:
+                future.cancel()
+
+        if queue or len(results) > max_items:
+            LOG.warning(
+                "Listing the files of course %s stopped after %d items",
+                course_id,
+                max_items,
             )
-            for result in results
-            if result["type"] == "Folder"
-        ]
 
-        # Query all folders at once
-        responses = self._request.find_service(name="async_oauth_http").request(
-            "GET", folder_urls
-        )
+        return results[:max_items]
+
+    def _crawl_folder_page(self, course_id, request, response, max_depth):
+        """Store the files in a page of a folder and get the requests it leads to."""
+        _, depth, page = request
+        page_files = BlackboardListFilesSchema(response).parse()
+        self._store_files(course_id, page_files)
+
+        next_requests = []
+        next_page = response.json().get("paging", {}).get("nextPage")
+        if next_page and page < PAGINATION_MAX_REQUESTS:
+            next_requests.append(
+                (
+                    self._api._api_url(next_page),  # pylint: disable=protected-access
+                    depth,
+                    page + 1,
+                )
+            )
 
-        for response in responses:
-            # Get all the pages for this folder
-            folder_files = self._get_all_following_pages(
-                response, BlackboardListFilesSchema
+        if depth < max_depth:
+            next_requests.extend(
+                self._folder_requests(course_id, page_files, depth + 1)
             )
-            # For each folder, get it children too
-            results.extend(self._get_all_folders_files(course_id, folder_files))
 
-        return results
+        return page_files, next_requests
+
+    def _folder_requests(self, course_id, files: list[dict], depth):
+        """Get the queue items to list the contents of the folders in `files`."""
+        return [
+            (
+                self._api._api_url(  # pylint: disable=protected-access
+                    self._list_files_url(course_id, file["id"])
+                ),
+                depth,
+                1,
+            )
+            for file in files
+            if file["type"] == "Folder"
+        ]
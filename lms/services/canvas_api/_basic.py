@@ -1,13 +1,18 @@
 """Low level access to the Canvas API."""
 
-from copy import deepcopy
-from urllib.parse import urlencode
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from urllib.parse import parse_qs, urlencode, urlparse
 
 import requests
 from requests import RequestException, Session
 
 from lms.services import CanvasAPIError, ExternalRequestError
 
+LOG = logging.getLogger(__name__)
+
 
 class BasicClient:
     """
@@ -28,6 +33,11 @@ class BasicClient:
     PAGINATION_MAXIMUM_REQUESTS = 25
     """The maximum number of calls to make before giving up."""
 
+    PAGINATION_CONCURRENCY = 4
+    """The maximum number of pages to fetch at the same time.
+
+    Only used when Canvas gives us numbered pages, see `_numbered_page_urls`."""
+
     def __init__(self, canvas_host, session=None):
         """
         Create a new BasicClient for making calls to the Canvas API.
@@ -98,11 +108,112 @@ class BasicClient:
             "?" + urlencode(params) if params else ""
         )
 
-    def _send_prepared(self, request, schema, timeout, request_depth=1):
+    def _send_prepared(self, request, schema, timeout):
+        result, response = self._send_page(request, schema, timeout)
+
+        # Handle pagination links. See:
+        # https://canvas.instructure.com/doc/api/file.pagination.html
+        if not response.links.get("next"):
+            return result
+
+        # We can only append results if the response is expecting multiple
+        # items from the Canvas API
+        if not schema.many:
+            CanvasAPIError.raise_from(
+                TypeError(
+                    "Canvas returned paginated results but we expected a single value"
+                ),
+                request,
+                response,
+            )
+
+        for page in self._following_pages(request, response, schema, timeout):
+            result.extend(page)
+
+        return result
+
+    def _following_pages(self, request, response, schema, timeout):
+        """Yield the parsed results of the pages after `response`, in order."""
+        if page_urls := self._numbered_page_urls(response):
+            # We know the URLs of all the pages upfront, fetch them in parallel.
+            # Sessions aren't thread safe so each worker gets its own.
+            worker = threading.local()
+
+            def init_worker():
+                worker.session = self._worker_session()
+
+            with ThreadPoolExecutor(
+                max_workers=self.PAGINATION_CONCURRENCY, initializer=init_worker
+            ) as executor:
+                yield from executor.map(
+                    lambda url: self._send_page(
+                        self._copy_request(request, url),
+                        schema,
+                        timeout,
+                        worker.session,
+                    )[0],
+                    page_urls,
+                )
+            return
+
+        # Otherwise follow the `next` links one at a time.
+        # Don't make requests forever
+        for _ in range(self.PAGINATION_MAXIMUM_REQUESTS - 1):
+            if not (next_url := response.links.get("next")):
+                return
+
+            page, response = self._send_page(
+                self._copy_request(request, next_url["url"]), schema, timeout
+            )
+            yield page
+
+    def _worker_session(self):
+        """Return a new Session that shares our session's connection pools."""
+        session = Session()
+        # The connection pools live in the adapters, which are thread safe
+        for prefix in ("https://", "http://"):
+            session.mount(prefix, self._session.get_adapter(prefix))
+        return session
+
+    def _numbered_page_urls(self, response):
+        """
+        Get the URLs of all the following pages if we can work them out.
+
+        Canvas only includes a `last` link for some endpoints and page numbers
+        might be opaque bookmarks instead of integers. If we have both we can
+        generate the URLs of every page without following the `next` links.
+        """
+        if not (last_url := response.links.get("last")):
+            return None
+
+        next_page = parse_qs(urlparse(response.links["next"]["url"]).query).get(
+            "page", [""]
+        )[0]
+        last_url = urlparse(last_url["url"])
+        query = parse_qs(last_url.query)
+        last_page = query.get("page", [""])[0]
+        if not (next_page.isdigit() and last_page.isdigit()):
+            return None
+
+        page_urls = []
+        # Don't make requests forever
+        for page in range(
+            int(next_page),
+            min(int(last_page), self.PAGINATION_MAXIMUM_REQUESTS) + 1,
+        ):
+            query["page"] = [str(page)]
+            page_urls.append(
+                last_url._replace(query=urlencode(query, doseq=True)).geturl()
+            )
+
+        return page_urls
+
+    def _send_page(self, request, schema, timeout, session=None):
+        start = perf_counter()
         response = None
 
         try:
-            response = self._session.send(request, timeout=timeout)
+            response = (session or self._session).send(request, timeout=timeout)
             response.raise_for_status()
         except RequestException as err:
             CanvasAPIError.raise_from(err, request, response)
@@ -113,29 +224,13 @@ class BasicClient:
         except ExternalRequestError as err:
             CanvasAPIError.raise_from(err, request, response, err.validation_errors)
 
-        # Handle pagination links. See:
-        # https://canvas.instructure.com/doc/api/file.pagination.html
-        next_url = response.links.get("next")
-        if next_url:
-            # We can only append results if the response is expecting multiple
-            # items from the Canvas API
-            if not schema.many:
-                CanvasAPIError.raise_from(
-                    TypeError(
-                        "Canvas returned paginated results but we expected a single value"
-                    ),
-                    request,
-                    response,
-                )
-
-            # Don't make requests forever
-            if request_depth < self.PAGINATION_MAXIMUM_REQUESTS:
-                new_request = deepcopy(request)
-                new_request.url = next_url["url"]
-                result.extend(
-                    self._send_prepared(
-                        new_request, schema, timeout, request_depth=request_depth + 1
-                    )
-                )
+        LOG.debug(
+            "Canvas API request to %s took %.3fs", request.url, perf_counter() - start
+        )
+        return result, response
 
-        return result
+    @staticmethod
+    def _copy_request(request, url):
+        new_request = request.copy()
+        new_request.url = url
+        return new_request
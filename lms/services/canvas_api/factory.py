@@ -18,7 +18,10 @@ def canvas_api_client_factory(_context, request):
         request.find_service(AESService)
     )
 
-    basic_client = BasicClient(application_instance.lms_host())
+    basic_client = BasicClient(
+        application_instance.lms_host(),
+        session=request.find_service(name="http").session,
+    )
 
     authenticated_api = AuthenticatedClient(
         basic_client=basic_client,
@@ -0,0 +1,445 @@
+"""
+Annotation stats from h for the instructor dashboards, cached in process.
+
+Stats are fetched from h the first time they are needed and then served from
+the cache. Once they are older than `FRESH_FOR` they are still served, but
+refreshed from h in a background thread, so instructors reloading a dashboard
+don't wait for h unless the stats are older than `STALE_FOR`.
+
+The stats are joined with the students or assignments they belong to in a
+single query, which also sorts and pages them.
+
+Organization stats are fetched for many courses at once, with one h request
+per chunk of up to `MAX_GROUPS_PER_REQUEST` groups, each cached like the
+stats of a single course.
+
+The background threads outlive the request that started them, so they don't
+use its services: they make their own h API client from the app's settings.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import lru_cache, partial
+from logging import getLogger
+from typing import Callable
+
+import sqlalchemy as sa
+from cachetools import TTLCache
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session, aliased
+
+from lms.models import (
+    ApplicationInstance,
+    Assignment,
+    AssignmentGrouping,
+    AssignmentMembership,
+    Course,
+    Grouping,
+    LTIRole,
+    RoleScope,
+    RoleType,
+    User,
+)
+from lms.services.h_api import HAPI
+from lms.services.http import HTTPService
+
+LOG = getLogger(__name__)
+
+FRESH_FOR = timedelta(seconds=30)
+"""How long stats are served without refreshing them."""
+
+STALE_FOR = timedelta(minutes=10)
+"""How long stats are served, while refreshing them, before they expire."""
+
+MAX_GROUPS_PER_REQUEST = 1000
+"""Maximum number of groups in each h request for organization stats."""
+
+_STATS = TTLCache(maxsize=4096, ttl=STALE_FOR.total_seconds())
+"""
+Stats by how they were requested.
+
+Keys are ("assignment", authority_provided_ids, resource_link_id) or
+("course", authority_provided_ids) and values are _CachedStats's.
+"""
+
+_REFRESHING: set[tuple] = set()
+"""Keys of the stats being fetched in the background."""
+
+_LOCK = threading.Lock()
+"""Lock for `_STATS` and `_REFRESHING`, used from the background threads."""
+
+
+@dataclass(frozen=True)
+class _CachedStats:
+    stats: list[dict]
+    fetched_at: datetime
+
+
+@dataclass(frozen=True)
+class Page:
+    """Which rows of a stats query to get, and in which order."""
+
+    order_by: str
+    """Name of the column to sort by."""
+
+    descending: bool = False
+
+    after: tuple | None = None
+    """The (sort_key, id) of the row to start after."""
+
+    limit: int | None = None
+
+
+class DashboardStatsService:
+    def __init__(
+        self,
+        db: Session,
+        h_api: HAPI,
+        make_background_h_api: Callable[[], HAPI],
+        prewarm: bool,
+    ):
+        """
+        Initialize the service.
+
+        :param h_api: h API client used to fetch stats during the request
+        :param make_background_h_api: Make an h API client that doesn't depend
+            on the request, to refresh stats in a background thread
+        """
+        self._db = db
+        self._h_api = h_api
+        self._make_background_h_api = make_background_h_api
+        self._prewarm = prewarm
+
+    def get_student_stats(self, assignment: Assignment, page: Page) -> list[Row]:
+        """
+        Get a page of the students of an assignment with their stats.
+
+        Rows have the `id` and `sort_key` of the student and the
+        `display_name`, `annotations`, `replies` and `last_activity` columns
+        which can also be used in `page.order_by`.
+        """
+        stats = _stats_table(
+            self.get_assignment_stats(assignment),
+            userid=sa.UnicodeText,
+            display_name=sa.UnicodeText,
+            annotations=sa.Integer,
+            replies=sa.Integer,
+            last_activity=sa.UnicodeText,
+        )
+        query = (
+            select(
+                User.id,
+                func.coalesce(
+                    stats.c.display_name,
+                    User.display_name,
+                    "Student " + func.left(User.user_id, 10),
+                ).label("display_name"),
+                func.coalesce(stats.c.annotations, 0).label("annotations"),
+                func.coalesce(stats.c.replies, 0).label("replies"),
+                stats.c.last_activity,
+            )
+            .select_from(AssignmentMembership)
+            .join(User)
+            .join(LTIRole)
+            .outerjoin(stats, stats.c.userid == User.h_userid)
+            .where(
+                AssignmentMembership.assignment_id == assignment.id,
+                LTIRole.scope == RoleScope.COURSE,
+                LTIRole.type == RoleType.LEARNER,
+            )
+            # Students can have more than one learner role
+            .distinct()
+        )
+        return self._get_page(query, page)
+
+    def get_course_assignment_stats(self, course: Course, page: Page) -> list[Row]:
+        """
+        Get a page of the assignments of a course with their stats.
+
+        Rows have the `id` and `sort_key` of the assignment and the `title`,
+        `annotations`, `replies` and `last_activity` columns which can also be
+        used in `page.order_by`.
+        """
+        stats = _stats_table(
+            self.get_course_stats(course),
+            assignment_id=sa.UnicodeText,
+            annotations=sa.Integer,
+            replies=sa.Integer,
+            last_activity=sa.UnicodeText,
+        )
+        query = (
+            select(
+                Assignment.id,
+                func.coalesce(Assignment.title, "").label("title"),
+                func.coalesce(stats.c.annotations, 0).label("annotations"),
+                func.coalesce(stats.c.replies, 0).label("replies"),
+                stats.c.last_activity,
+            )
+            .join(AssignmentGrouping)
+            .outerjoin(stats, stats.c.assignment_id == Assignment.resource_link_id)
+            .where(AssignmentGrouping.grouping_id == course.id)
+        )
+        return self._get_page(query, page)
+
+    def get_organization_course_stats(self, organization_ids: list[int]) -> list[dict]:
+        """
+        Get the stats of every course of some organizations.
+
+        :param organization_ids: IDs of the organizations, usually from
+            `OrganizationService.get_hierarchy_ids()`
+        :return: A dict for each course, ordered by ID, with its `id`,
+            `title` and `assignments`, `annotations`, `replies` and
+            `last_activity` stats
+        """
+        child = aliased(Grouping)
+        courses = self._db.execute(
+            select(
+                Course.id,
+                Course.lms_name,
+                Course.authority_provided_id,
+                # pylint:disable=not-callable
+                select(func.array_agg(child.authority_provided_id))
+                .where(
+                    child.parent_id == Course.id,
+                    child.application_instance_id == Course.application_instance_id,
+                )
+                .scalar_subquery()
+                .label("children"),
+                # pylint:disable=not-callable
+                select(func.array_agg(Assignment.resource_link_id))
+                .join(AssignmentGrouping)
+                .where(AssignmentGrouping.grouping_id == Course.id)
+                .scalar_subquery()
+                .label("resource_link_ids"),
+            )
+            .join(ApplicationInstance)
+            .where(ApplicationInstance.organization_id.in_(organization_ids))
+            .order_by(Course.id)
+        ).all()
+
+        course_stats = {
+            course.id: {
+                "id": course.id,
+                "title": course.lms_name,
+                "assignments": len(course.resource_link_ids or []),
+                "annotations": 0,
+                "replies": 0,
+                "last_activity": None,
+            }
+            for course in courses
+        }
+        for chunk in _chunk_courses(courses):
+            # Each assignment is in only one course of the chunk
+            course_ids = {
+                resource_link_id: course.id
+                for course in chunk
+                for resource_link_id in course.resource_link_ids
+            }
+            groups = [
+                group
+                for course in chunk
+                for group in [course.authority_provided_id, *(course.children or [])]
+            ]
+            for row in self._get(
+                ("course", tuple(sorted(groups))), ("get_course_stats", groups)
+            ):
+                if row["assignment_id"] not in course_ids:
+                    continue
+
+                stats = course_stats[course_ids[row["assignment_id"]]]
+                stats["annotations"] += row.get("annotations", 0)
+                stats["replies"] += row.get("replies", 0)
+                stats["last_activity"] = max(
+                    (
+                        last_activity
+                        for last_activity in [
+                            stats["last_activity"],
+                            row.get("last_activity"),
+                        ]
+                        if last_activity
+                    ),
+                    default=None,
+                )
+
+        return list(course_stats.values())
+
+    def get_assignment_stats(self, assignment: Assignment) -> list[dict]:
+        """Get the stats of the students of an assignment."""
+        return self._get(*self._assignment_stats_request(assignment))
+
+    def get_course_stats(self, course: Course) -> list[dict]:
+        """Get the stats of the assignments of a course."""
+        # Annotations in the course group and any children
+        groups = [course.authority_provided_id] + [
+            child.authority_provided_id for child in course.children
+        ]
+        return self._get(
+            ("course", tuple(sorted(groups))), ("get_course_stats", groups)
+        )
+
+    def prewarm_assignment_stats(self, assignment: Assignment) -> None:
+        """
+        Fetch the stats of an assignment in the background, if not cached.
+
+        This does nothing unless the `dashboard_stats_prewarm` setting is on.
+        """
+        if not self._prewarm:
+            return
+
+        key, h_api_call = self._assignment_stats_request(assignment)
+        with _LOCK:
+            cached = _STATS.get(key)
+
+        if not cached or _is_stale(cached):
+            _refresh_in_background(key, self._make_background_h_api, h_api_call)
+
+    def _assignment_stats_request(self, assignment):
+        groups = [grouping.authority_provided_id for grouping in assignment.groupings]
+        return (
+            ("assignment", tuple(sorted(groups)), assignment.resource_link_id),
+            ("get_assignment_stats", groups, assignment.resource_link_id),
+        )
+
+    def _get_page(self, query, page: Page) -> list[Row]:
+        rows = query.subquery()
+        sort_key = rows.c[page.order_by]
+        if page.order_by == "last_activity":
+            # Sort the rows without activity as the oldest ones
+            sort_key = func.coalesce(sort_key, "")
+
+        query = select(rows, sort_key.label("sort_key")).order_by(
+            *(
+                column.desc() if page.descending else column.asc()
+                for column in (sort_key, rows.c.id)
+            )
+        )
+        if page.after:
+            key, after = sa.tuple_(sort_key, rows.c.id), sa.tuple_(*page.after)
+            query = query.where(key < after if page.descending else key > after)
+
+        return self._db.execute(query.limit(page.limit)).all()
+
+    def _get(self, key, h_api_call) -> list[dict]:
+        """
+        Get the stats for `key`, from the cache or from h.
+
+        :param key: Key of the stats in the cache
+        :param h_api_call: The HAPI method name and arguments to fetch them
+        """
+        with _LOCK:
+            cached = _STATS.get(key)
+
+        if not cached:
+            return _fetch(key, self._h_api, h_api_call)
+
+        if _is_stale(cached):
+            _refresh_in_background(key, self._make_background_h_api, h_api_call)
+
+        return cached.stats
+
+
+def _chunk_courses(courses):
+    """
+    Split the courses with assignments into chunks to request together.
+
+    Chunks have up to `MAX_GROUPS_PER_REQUEST` groups, unless a single course
+    has more, and no assignment in more than one of their courses, as h only
+    reports the stats of each assignment across all the groups requested.
+    """
+    chunk: list = []
+    groups = 0
+    resource_link_ids: set[str] = set()
+    for course in courses:
+        if not course.resource_link_ids:
+            continue
+
+        course_groups = 1 + len(course.children or [])
+        if chunk and (
+            groups + course_groups > MAX_GROUPS_PER_REQUEST
+            or not resource_link_ids.isdisjoint(course.resource_link_ids)
+        ):
+            yield chunk
+            chunk, groups, resource_link_ids = [], 0, set()
+
+        chunk.append(course)
+        groups += course_groups
+        resource_link_ids.update(course.resource_link_ids)
+
+    if chunk:
+        yield chunk
+
+
+def _stats_table(stats: list[dict], **columns):
+    """Get a table of `stats` with the given columns, to use in queries."""
+    return (
+        func.jsonb_to_recordset(sa.literal(stats, JSONB))
+        .table_valued(*(sa.column(name, type_) for name, type_ in columns.items()))
+        .render_derived(name="stats", with_types=True)
+    )
+
+
+def _is_stale(cached: _CachedStats) -> bool:
+    return datetime.utcnow() - cached.fetched_at > FRESH_FOR
+
+
+def _fetch(key, h_api: HAPI, h_api_call: tuple) -> list[dict]:
+    method, *args = h_api_call
+    stats = getattr(h_api, method)(*args)
+    with _LOCK:
+        _STATS[key] = _CachedStats(stats=stats, fetched_at=datetime.utcnow())
+
+    return stats
+
+
+def _refresh_in_background(key, make_h_api, h_api_call) -> None:
+    with _LOCK:
+        if key in _REFRESHING:
+            return
+
+        _REFRESHING.add(key)
+
+    _get_executor(os.getpid()).submit(_refresh, key, make_h_api, h_api_call)
+
+
+def _refresh(key, make_h_api, h_api_call) -> None:
+    try:
+        _fetch(key, make_h_api(), h_api_call)
+    except Exception:  # pylint:disable=broad-exception-caught
+        # Keep serving what we have, the next request will try again.
+        LOG.exception("Refreshing dashboard stats failed")
+    finally:
+        with _LOCK:
+            _REFRESHING.discard(key)
+
+
+@lru_cache(maxsize=1)
+def _get_executor(_pid) -> ThreadPoolExecutor:
+    # Threads don't survive forking so cache the executor per process ID.
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="dashboard_stats")
+
+
+def _make_background_h_api(registry) -> HAPI:
+    """Make an h API client from the app's settings, with its own HTTP session."""
+    settings = registry.settings
+
+    return HAPI(
+        authority=settings["h_authority"],
+        client_id=settings["h_client_id"],
+        client_secret=settings["h_client_secret"],
+        h_private_url=settings["h_api_url_private"],
+        http_service=HTTPService(adapter=registry["http.adapter"]),
+    )
+
+
+def factory(_context, request) -> DashboardStatsService:
+    return DashboardStatsService(
+        db=request.db,
+        h_api=request.find_service(HAPI),
+        make_background_h_api=partial(_make_background_h_api, request.registry),
+        prewarm=request.registry.settings["dashboard_stats_prewarm"],
+    )
@@ -1,4 +1,5 @@
 import logging
+from collections import Counter, defaultdict
 from dataclasses import asdict, dataclass
 from datetime import datetime, timezone
 
@@ -47,11 +48,7 @@ class DigestService:
             h_userid, created_after, created_before
         )
 
-        annotations = [
-            Annotation.make(annotation_dict) for annotation_dict in annotation_dicts
-        ]
-
-        context = DigestContext(self._db, h_userid, annotations)
+        context = DigestContext(self._db, h_userid, _make_annotations(annotation_dicts))
 
         digest = context.instructor_digest(context.user_info.h_userid)
 
@@ -96,6 +93,10 @@ class DigestService:
         )
 
 
+def _make_annotations(annotation_dicts):
+    return (Annotation.make(annotation_dict) for annotation_dict in annotation_dicts)
+
+
 @dataclass(frozen=True, order=True)
 class AssignmentInfo:
     """Information about an assignment."""
@@ -116,7 +117,7 @@ class AssignmentInfo:
     """The authority_provided_id of the assignment's course (Course.authority_provided_id)."""
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Annotation:
     """Info about an annotation from the h API."""
 
@@ -178,7 +179,8 @@ class CourseInfo:
     authority_provided_id: str
     title: str | None
     instructor_h_userids: tuple[str]
-    learner_annotations: tuple[dict]
+    learner_annotations: tuple[Annotation, ...]
+    """The distinct learner annotations, see DigestContext.annotations for how many of each."""
 
 
 class DigestContext:
@@ -187,10 +189,15 @@ class DigestContext:
     def __init__(self, db, h_userid, annotations):
         self._db = db
         self.h_userid = h_userid
-        self.annotations = annotations
+        # Fold the (possibly streamed) annotations into a count of each
+        # distinct Annotation. Annotations by the same user in the same group
+        # and assignment are equal so memory grows with the number of
+        # annotators and assignments, not with the number of annotations.
+        self.annotations = Counter(annotations)
         self._assignment_infos = None
         self._user_info = None
         self._course_infos = None
+        self._course_digests = None
 
     def instructor_digest(self, h_userid):
         """
@@ -201,75 +208,98 @@ class DigestContext:
         1. The user is an instructor
         2. There are annotations by learners
         """
-        course_digests = []
+        course_digests = [
+            course_digest
+            for course_info, course_digest in self.course_digests
+            if h_userid in course_info.instructor_h_userids
+        ]
 
-        for course_info in self.course_infos:
-            num_annotations = len(course_info.learner_annotations)
+        annotators = set()
+        for course_digest in course_digests:
+            annotators.update(course_digest["annotators"])
+
+        return {
+            "total_annotations": sum(
+                course_digest["num_annotations"] for course_digest in course_digests
+            ),
+            "annotators": list(annotators),
+            "courses": course_digests,
+        }
+
+    @property
+    def course_digests(self):
+        """
+        Return a (CourseInfo, course digest dict) pair for each course with learner activity.
+
+        Course digests don't depend on the instructor so they're computed once
+        and cached.
+        """
+        if self._course_digests is not None:
+            return self._course_digests
+
+        assignment_infos_by_authority_provided_id = defaultdict(list)
+        for assignment_info in self.assignment_infos:
+            assignment_infos_by_authority_provided_id[
+                assignment_info.authority_provided_id
+            ].append(assignment_info)
+
+        self._course_digests = []
 
-            if not num_annotations:
+        for course_info in self.course_infos:
+            if not course_info.learner_annotations:
                 # There was no activity in this course.
                 continue
 
-            if h_userid not in course_info.instructor_h_userids:
-                # The user isn't an instructor in this course.
-                continue
+            annotations_by_assignment = defaultdict(list)
+            for annotation in course_info.learner_annotations:
+                annotations_by_assignment[
+                    (annotation.guid, annotation.resource_link_id)
+                ].append(annotation)
 
             course_assignments = []
 
-            for assignment_info in self.assignment_infos:
-                if (
-                    assignment_info.authority_provided_id
-                    != course_info.authority_provided_id
-                ):
-                    continue
-
-                assignment_learner_annotations = [
-                    annotation
-                    for annotation in course_info.learner_annotations
-                    if annotation.guid == assignment_info.guid
-                    and annotation.resource_link_id == assignment_info.resource_link_id
-                ]
+            for assignment_info in assignment_infos_by_authority_provided_id[
+                course_info.authority_provided_id
+            ]:
+                assignment_learner_annotations = annotations_by_assignment.get(
+                    (assignment_info.guid, assignment_info.resource_link_id), []
+                )
 
                 course_assignments.append(
                     {
                         "title": assignment_info.title,
-                        "num_annotations": len(assignment_learner_annotations),
+                        "num_annotations": self._count(assignment_learner_annotations),
                         "annotators": list(
-                            set(
+                            {
                                 annotation.userid
                                 for annotation in assignment_learner_annotations
-                            )
+                            }
                         ),
                     }
                 )
 
-            course_digests.append(
-                {
-                    "title": course_info.title,
-                    "num_annotations": num_annotations,
-                    "annotators": list(
-                        set(
-                            annotation.userid
-                            for annotation in course_info.learner_annotations
-                        )
-                    ),
-                    "assignments": course_assignments,
-                }
+            self._course_digests.append(
+                (
+                    course_info,
+                    {
+                        "title": course_info.title,
+                        "num_annotations": self._count(course_info.learner_annotations),
+                        "annotators": list(
+                            {
+                                annotation.userid
+                                for annotation in course_info.learner_annotations
+                            }
+                        ),
+                        "assignments": course_assignments,
+                    },
+                )
             )
 
-        return {
-            "total_annotations": sum(
-                course_digest["num_annotations"] for course_digest in course_digests
-            ),
-            "annotators": list(
-                set(
-                    annotator
-                    for course_digest in course_digests
-                    for annotator in course_digest["annotators"]
-                )
-            ),
-            "courses": course_digests,
-        }
+        return self._course_digests
+
+    def _count(self, annotations):
+        """Return the total number of times `annotations` were seen."""
+        return sum(self.annotations[annotation] for annotation in annotations)
 
     @property
     def assignment_infos(self):
@@ -295,12 +325,12 @@ class DigestContext:
                             Assignment.tool_consumer_instance_guid,
                             Assignment.resource_link_id,
                         ).in_(
-                            [
+                            {
                                 (annotation.guid, annotation.resource_link_id)
                                 for annotation in self.annotations
                                 if annotation.guid is not None
                                 and annotation.resource_link_id is not None
-                            ]
+                            }
                         ),
                         AssignmentGrouping.assignment_id == Assignment.id,
                         AssignmentGrouping.grouping_id == Course.id,
@@ -398,12 +428,19 @@ class DigestContext:
             .group_by(Course.authority_provided_id)
         )
 
+        annotations_by_authority_provided_id = defaultdict(list)
+        for annotation in self.annotations:
+            annotations_by_authority_provided_id[
+                annotation.authority_provided_id
+            ].append(annotation)
+
         self._course_infos = []
 
         for row in self._db.execute(query):
             # SQLAlchemy returns None instead of [].
-            authority_provided_ids = row.authority_provided_ids or []
+            authority_provided_ids = set(row.authority_provided_ids or [])
             instructor_h_userids = row.instructor_h_userids or []
+            instructor_h_userids_set = set(instructor_h_userids)
 
             self._course_infos.append(
                 CourseInfo(
@@ -412,9 +449,11 @@ class DigestContext:
                     instructor_h_userids=tuple(instructor_h_userids),
                     learner_annotations=tuple(
                         annotation
-                        for annotation in self.annotations
-                        if annotation.authority_provided_id in authority_provided_ids
-                        and annotation.userid not in instructor_h_userids
+                        for authority_provided_id in authority_provided_ids
+                        for annotation in annotations_by_authority_provided_id[
+                            authority_provided_id
+                        ]
+                        if annotation.userid not in instructor_h_userids_set
                     ),
                 )
             )
@@ -1,15 +1,30 @@
+import atexit
 import logging
+import re
+import threading
+from datetime import date
 from functools import lru_cache
 
+import sqlalchemy as sa
 from celery.exceptions import OperationalError
 from sqlalchemy.orm import Session
 
 from lms.events.event import BaseEvent
 from lms.models import Event, EventData, EventType, EventUser
-from lms.tasks.event import insert_event
+from lms.models.event import PARTITIONED_TABLES
+from lms.tasks.event import insert_events
 
 log = logging.getLogger(__name__)
 
+EVENT_BATCH_SIZE = 100
+"""Send queued events to the worker once there are this many of them."""
+
+EVENT_BATCH_MAX_AGE = 5
+"""Send queued events to the worker at most this many seconds after queuing."""
+
+ARCHIVE_SCHEMA = "event_archive"
+"""Schema old partitions of the event tables are moved to."""
+
 
 class EventService:
     def __init__(self, db: Session):
@@ -21,40 +36,209 @@ class EventService:
 
         Takes a `BaseEvent` and inserts a new row in the `events` table.
         """
-        db_event = Event(
-            type_id=self._get_type_pk(event.type),
-            application_instance_id=event.application_instance_id,
-            course_id=event.course_id,
-            assignment_id=event.assignment_id,
-            grouping_id=event.grouping_id,
-        )
-        self._db.add(db_event)
-
-        if event.user_id:
-            for role_id in event.role_ids or [None]:  # type: ignore
-                self._db.add(
-                    EventUser(
-                        event=db_event, user_id=event.user_id, lti_role_id=role_id
-                    )
-                )
-
-        if event.data:
-            self._db.add(EventData(event=db_event, data=event.data))
+        self._insert_events([event])
 
         return event
 
+    def insert_events(self, events: list[BaseEvent]) -> None:
+        """
+        Insert `events` into the DB with one multi-row INSERT per table.
+
+        If the batch as a whole can't be inserted (for example because one of
+        the events refers to a row that was never committed) the events are
+        inserted one by one instead, skipping and logging the ones that fail.
+        """
+        if not events:
+            return
+
+        # Look up the event types outside of the savepoints below: a type
+        # inserted in a savepoint that's rolled back would stay in the cache.
+        for type_ in {event.type for event in events}:
+            self._get_type_pk(type_)
+
+        try:
+            with self._db.begin_nested():
+                self._insert_events(events)
+        except (sa.exc.IntegrityError, sa.exc.DataError):
+            for event in events:
+                try:
+                    with self._db.begin_nested():
+                        self._insert_events([event])
+                except (sa.exc.IntegrityError, sa.exc.DataError):
+                    log.exception("Error while inserting event %s", event.serialize())
+
+    def _insert_events(self, events: list[BaseEvent]) -> None:
+        event_ids = self._db.scalars(
+            sa.insert(Event).returning(Event.id, sort_by_parameter_order=True),
+            [
+                {
+                    "timestamp": event.timestamp,
+                    "type_id": self._get_type_pk(event.type),
+                    "application_instance_id": event.application_instance_id,
+                    "course_id": event.course_id,
+                    "assignment_id": event.assignment_id,
+                    "grouping_id": event.grouping_id,
+                }
+                for event in events
+            ],
+        ).all()
+
+        event_users = [
+            {
+                "event_id": event_id,
+                "timestamp": event.timestamp,
+                "user_id": event.user_id,
+                "lti_role_id": role_id,
+            }
+            for event_id, event in zip(event_ids, events)
+            if event.user_id
+            for role_id in event.role_ids or [None]  # type: ignore
+        ]
+        if event_users:
+            self._db.execute(sa.insert(EventUser), event_users)
+
+        event_data = [
+            {"event_id": event_id, "timestamp": event.timestamp, "data": event.data}
+            for event_id, event in zip(event_ids, events)
+            if event.data
+        ]
+        if event_data:
+            self._db.execute(sa.insert(EventData), event_data)
+
     @staticmethod
     def queue_event(event: BaseEvent) -> None:
         """
         Queue an event for insertion into the DB asynchronously.
 
-        This method hides errors while queuing the task and disables retries.
+        Queued events are kept in memory and sent to a worker in batches of
+        up to `EVENT_BATCH_SIZE`, at most `EVENT_BATCH_MAX_AGE` seconds later.
+        Events still in memory when the process is killed are lost.
+
+        This method hides errors while queuing the task.
         If more guarantees are need about the event recording, call `insert_event` directly.
         """
-        try:
-            insert_event.apply_async((event.serialize(),), retry=False)
-        except OperationalError:
-            log.exception("Error while queueing event")
+        _BUFFER.add(event.serialize())
+
+    def create_partitions(self, months_ahead: int) -> None:
+        """
+        Create the monthly partitions of the event tables for the coming months.
+
+        If a month's partitions are missing and its rows went to the default
+        partitions in the meantime those rows are moved to the new partitions.
+        A month that fails is logged and skipped so it doesn't stop the rest.
+        """
+        this_month = _first_of_month(date.today())
+
+        for months in range(months_ahead + 1):
+            start = _first_of_month(this_month, months)
+            end = _first_of_month(this_month, months + 1)
+
+            try:
+                with self._db.begin_nested():
+                    self._create_partitions(start, end)
+            except sa.exc.DBAPIError:
+                log.exception("Error while creating the partitions for %s", start)
+
+    def _create_partitions(self, start: date, end: date) -> None:
+        tables = [
+            table
+            for table in PARTITIONED_TABLES
+            if self._db.scalar(
+                sa.select(sa.func.to_regclass(_partition_name(table.name, start)))
+            )
+            is None
+        ]
+        in_range = f"timestamp >= '{start}' AND timestamp < '{end}'"
+
+        # Postgres won't create a partition for rows that are in the default
+        # partition. Create each one as a standalone table with those rows,
+        # take the rows out of the default partition and then attach it.
+        for table in tables:
+            partition = _partition_name(table.name, start)
+            self._db.execute(
+                sa.text(
+                    f"CREATE TABLE {partition} "
+                    f"(LIKE {table.name} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+                )
+            )
+            self._db.execute(
+                sa.text(
+                    f"INSERT INTO {partition} "
+                    f"SELECT * FROM {table.name}_default WHERE {in_range}"
+                )
+            )
+        for table in reversed(tables):
+            self._db.execute(
+                sa.text(f"DELETE FROM {table.name}_default WHERE {in_range}")
+            )
+        for table in tables:
+            self._db.execute(
+                sa.text(
+                    f"ALTER TABLE {table.name} "
+                    f"ATTACH PARTITION {_partition_name(table.name, start)} "
+                    f"FOR VALUES FROM ('{start}') TO ('{end}')"
+                )
+            )
+
+    def archive_partitions(self, retention_months: int) -> list[str]:
+        """
+        Move the partitions older than `retention_months` out of the event tables.
+
+        The archived partitions keep their rows, as standalone tables in the
+        `ARCHIVE_SCHEMA` schema.
+
+        :return: the names of the archived partitions
+        """
+        cutoff = _first_of_month(date.today(), -retention_months)
+        self._db.execute(sa.text(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}"))
+
+        archived = []
+        # Detach the referencing tables' partitions first, the rows in event
+        # can't be detached while anything references them.
+        for table in reversed(PARTITIONED_TABLES):
+            for partition, month in self._get_partitions(table.name):
+                if _first_of_month(month, 1) > cutoff:
+                    continue
+
+                self._db.execute(
+                    sa.text(f"ALTER TABLE {table.name} DETACH PARTITION {partition}")
+                )
+                for foreign_key in table.foreign_key_constraints:
+                    if foreign_key.referred_table is Event.__table__:
+                        self._db.execute(
+                            sa.text(
+                                f"ALTER TABLE {partition} DROP CONSTRAINT {foreign_key.name}"
+                            )
+                        )
+                self._db.execute(
+                    sa.text(f"ALTER TABLE {partition} SET SCHEMA {ARCHIVE_SCHEMA}")
+                )
+                archived.append(partition)
+
+        return archived
+
+    def _get_partitions(self, table_name: str) -> list[tuple[str, date]]:
+        """Return the name and month of each of `table_name`'s monthly partitions."""
+        names = self._db.scalars(
+            sa.text(
+                """
+                SELECT child.relname FROM pg_inherits
+                JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+                JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                WHERE parent.relname = :table_name
+                ORDER BY child.relname
+                """
+            ),
+            {"table_name": table_name},
+        )
+
+        partitions = []
+        for name in names:
+            if match := re.fullmatch(rf"{table_name}_y(\d{{4}})m(\d{{2}})", name):
+                year, month = match.groups()
+                partitions.append((name, date(int(year), int(month), 1)))
+
+        return partitions
 
     @lru_cache(maxsize=10)
     def _get_type_pk(self, type_: EventType.Type) -> int:
@@ -68,5 +252,69 @@ class EventService:
         return event_type.id
 
 
+def _first_of_month(day: date, months: int = 0) -> date:
+    """Return the first day of the month `months` months after `day`'s."""
+    year, month = divmod(day.year * 12 + day.month - 1 + months, 12)
+    return date(year, month + 1, 1)
+
+
+def _partition_name(table_name: str, month: date) -> str:
+    return f"{table_name}_y{month.year}m{month.month:02}"
+
+
+class _EventBuffer:
+    """Serialized events waiting to be sent to the worker."""
+
+    def __init__(self, max_size: int, max_age: float):
+        self._max_size = max_size
+        self._max_age = max_age
+        self._events: list[dict] = []
+        self._lock = threading.Lock()
+        self._timer: threading.Timer | None = None
+
+    def add(self, event: dict) -> None:
+        with self._lock:
+            self._events.append(event)
+
+            if len(self._events) < self._max_size:
+                if not self._timer:
+                    self._timer = threading.Timer(self._max_age, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+
+            events = self._take()
+
+        _send_events(events)
+
+    def flush(self) -> None:
+        """Send all the buffered events to the worker now."""
+        with self._lock:
+            events = self._take()
+
+        if events:
+            _send_events(events)
+
+    def _take(self) -> list[dict]:
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+        events, self._events = self._events, []
+        return events
+
+
+def _send_events(events: list[dict]) -> None:
+    try:
+        insert_events.apply_async((events,))
+    except OperationalError:
+        log.exception("Error while queueing events")
+
+
+_BUFFER = _EventBuffer(max_size=EVENT_BATCH_SIZE, max_age=EVENT_BATCH_MAX_AGE)
+# Don't lose the events queued since the last batch when the process exits.
+atexit.register(_BUFFER.flush)
+
+
 def factory(_context, request):
     return EventService(db=request.db)
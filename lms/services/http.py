@@ -1,4 +1,6 @@
 from requests import RequestException, Response, Session
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 
 from lms.services.exceptions import ExternalRequestError
 
@@ -10,7 +12,14 @@ class HTTPService:
     session: Session = None  # type: ignore
     """The underlying requests Session."""
 
-    def __init__(self):
+    def __init__(self, adapter: HTTPAdapter | None = None):
+        """
+        Initialize the service.
+
+        :param adapter: transport adapter to use for all requests. Pass the
+            process-wide adapter (see `includeme`) to re-use its connections
+            across Pyramid requests.
+        """
         # A session is used so that cookies are persisted across
         # requests and urllib3 connection pooling is used (which means that
         # underlying TCP connections are re-used when making multiple requests
@@ -19,6 +28,13 @@ class HTTPService:
         # See https://docs.python-requests.org/en/latest/user/advanced/#session-objects
         self.session = Session()
 
+        if adapter:
+            # The connection pools live in the adapter, not in the session.
+            # Sharing an adapter between sessions shares kept-alive connections
+            # (and so TLS handshakes) without sharing cookies or headers.
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
+
     def request(self, method, url, timeout=(10, 10), **kwargs) -> Response:
         """
         Send a request with `requests` and return the response object.
@@ -57,5 +73,35 @@ class HTTPService:
         return self.request("DELETE", *args, **kwargs)
 
 
-def factory(_context, _request):
-    return HTTPService()
+def create_adapter(
+    pool_connections: int, pool_maxsize: int, max_retries: int
+) -> HTTPAdapter:
+    """
+    Create a transport adapter that can be shared by many `HTTPService`s.
+
+    :param pool_connections: number of hosts to keep connection pools for
+    :param pool_maxsize: number of kept-alive connections per host
+    :param max_retries: times to retry requests that fail to connect. We
+        never retry requests that reached the server as they might not be
+        idempotent.
+    """
+    return HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=Retry(total=max_retries, read=False, backoff_factor=0.2),
+    )
+
+
+def factory(_context, request):
+    return HTTPService(adapter=request.registry["http.adapter"])
+
+
+def includeme(config):
+    # Create the adapter shared by all HTTP requests of this process and save
+    # a reference in the app registry.
+    settings = config.registry.settings
+    config.registry["http.adapter"] = create_adapter(
+        pool_connections=int(settings["http_pool_connections"] or 100),
+        pool_maxsize=int(settings["http_pool_maxsize"] or 10),
+        max_retries=int(settings["http_max_retries"] or 0),
+    )
@@ -17,4 +17,5 @@ def service_factory(_context, request):
             "Tracking-User-ID": request.lti_user.h_user.username,
             "Tracking-User-Agent": request.headers.get("User-Agent", None),
         },
+        adapter=request.registry["http.adapter"],
     )
@@ -22,7 +22,7 @@ class JSTORService:
     """Used when no DOI prefix can be found."""
 
     # pylint: disable=too-many-arguments
-    def __init__(self, api_url, secret, enabled, site_code, headers=None):
+    def __init__(self, api_url, secret, enabled, site_code, headers=None, adapter=None):
         """
         Initialise the JSTOR service.
 
@@ -32,13 +32,14 @@ class JSTORService:
         :param site_code: The site code to use to identify the organization
         :param headers: Additional headers to pass onto JSTOR when making
             requests
+        :param adapter: Transport adapter to send requests with
         """
         self._api_url = api_url
         self._secret = secret
         self._enabled = enabled
         self._site_code = site_code
 
-        self._http = HTTPService()
+        self._http = HTTPService(adapter=adapter)
         self._http.session.headers = headers
 
     @property
@@ -1,11 +1,33 @@
+"""
+Encoding and decoding of JWTs.
+
+The public keys LTI 1.3 platforms sign their launches with are kept in a
+process-wide cache by key set URL. Cached key sets are refreshed in a
+background thread once they are older than `JWKS_REFRESH_AFTER`, and the key
+sets of every registration are fetched in the background when a process
+decodes its first launch, so launches only wait for a platform's key set the
+first time it's needed or when it's signed with a key we haven't seen.
+"""
+
 import copy
 import datetime
 import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from functools import lru_cache
 
 import jwt
 import requests
-from jwt.exceptions import ExpiredSignatureError, InvalidTokenError, PyJWTError
+from cachetools import TTLCache
+from jwt import PyJWK
+from jwt.exceptions import (
+    ExpiredSignatureError,
+    InvalidTokenError,
+    PyJWKClientError,
+    PyJWTError,
+)
 
 from lms.services.exceptions import ExpiredJWTError, InvalidJWTError
 from lms.services.lti_registration import LTIRegistrationService
@@ -14,6 +36,29 @@ from lms.validation import ValidationError
 
 LOG = logging.getLogger(__name__)
 
+JWKS_REFRESH_AFTER = datetime.timedelta(minutes=5)
+"""How long key sets are used before refreshing them in the background."""
+
+JWKS_REFETCH_AFTER = datetime.timedelta(seconds=30)
+"""How long to wait before fetching a key set again for an unknown key."""
+
+_JWKS = TTLCache(maxsize=1024, ttl=datetime.timedelta(days=1).total_seconds())
+"""_KeySet's by their key set URL."""
+
+_REFRESHING: set[str] = set()
+"""URLs of the key sets being fetched in the background."""
+
+_LOCK = threading.Lock()
+"""Lock for `_JWKS` and `_REFRESHING`, used from the background threads."""
+
+
+@dataclass(frozen=True)
+class _KeySet:
+    keys: dict[str, PyJWK]
+    """Signing keys by their key ID."""
+
+    fetched_at: datetime.datetime
+
 
 class JWTService:
     LEEWAY = datetime.timedelta(seconds=10)
@@ -112,10 +157,12 @@ class JWTService:
                 }
             )
 
+        self._prefetch_key_sets(registration.key_set_url)
+
         try:
-            signing_key = self._get_jwk_client(
-                registration.key_set_url
-            ).get_signing_key_from_jwt(id_token)
+            signing_key = _get_signing_key(
+                registration.key_set_url, unverified_header["kid"]
+            )
 
             return jwt.decode(
                 id_token,
@@ -130,26 +177,25 @@ class JWTService:
                 messages={"jwt": [f"Invalid JWT for: {iss}, {aud}. {err}"]}
             ) from err
 
+    def _prefetch_key_sets(self, key_set_url):
+        """Fetch all the key sets but `key_set_url` on the first launch."""
+        with _LOCK:
+            if _JWKS or _REFRESHING:
+                return
+
+        for other_key_set_url in self._registration_service.get_key_set_urls():
+            if other_key_set_url != key_set_url:
+                _refresh_in_background(other_key_set_url)
+
     def encode_with_private_key(self, payload: dict):
-        key = self._rsa_key_service.get_random_key()
+        key = self._rsa_key_service.get_signing_key()
         return jwt.encode(
             payload,
-            self._rsa_key_service.private_key(key),
+            key.private_key,
             algorithm="RS256",
             headers={"kid": key.kid},
         )
 
-    @staticmethod
-    @lru_cache(maxsize=256)
-    def _get_jwk_client(jwk_url: str):
-        """
-        Get a PyJWKClient for the given key set URL.
-
-        PyJWKClient maintains a cache of keys it has seen.
-        We want to keep the clients around with `lru_cache` to reuse that internal cache.
-        """
-        return _RequestsPyJWKClient(jwk_url, cache_keys=True)
-
 
 class _RequestsPyJWKClient(jwt.PyJWKClient):
     """
@@ -167,6 +213,79 @@ class _RequestsPyJWKClient(jwt.PyJWKClient):
             return response.json()
 
 
+def _get_signing_key(key_set_url: str, kid: str) -> PyJWK:
+    """
+    Get the signing key `kid` from the key set at `key_set_url`.
+
+    :raise PyJWKClientError: if there's no signing key `kid` in the key set
+    """
+    with _LOCK:
+        key_set = _JWKS.get(key_set_url)
+
+    if key_set and kid in key_set.keys:
+        if _age(key_set) > JWKS_REFRESH_AFTER:
+            _refresh_in_background(key_set_url)
+
+        return key_set.keys[kid]
+
+    # Fetch the key set now if we don't have it or it might have a new key.
+    # Limit how often we do this for keys which don't exist.
+    if not key_set or _age(key_set) > JWKS_REFETCH_AFTER:
+        key_set = _fetch(key_set_url)
+
+    if kid not in key_set.keys:
+        raise PyJWKClientError(f'Unable to find a signing key that matches: "{kid}"')
+
+    return key_set.keys[kid]
+
+
+def _age(key_set: _KeySet) -> datetime.timedelta:
+    return datetime.datetime.utcnow() - key_set.fetched_at
+
+
+def _fetch(key_set_url: str) -> _KeySet:
+    key_set = _KeySet(
+        keys={
+            key.key_id: key
+            for key in _RequestsPyJWKClient(
+                key_set_url, cache_jwk_set=False
+            ).get_signing_keys()
+        },
+        fetched_at=datetime.datetime.utcnow(),
+    )
+    with _LOCK:
+        _JWKS[key_set_url] = key_set
+
+    return key_set
+
+
+def _refresh_in_background(key_set_url: str) -> None:
+    with _LOCK:
+        if key_set_url in _REFRESHING:
+            return
+
+        _REFRESHING.add(key_set_url)
+
+    _get_executor(os.getpid()).submit(_refresh, key_set_url)
+
+
+def _refresh(key_set_url: str) -> None:
+    try:
+        _fetch(key_set_url)
+    except Exception:  # pylint:disable=broad-exception-caught
+        # Keep using the keys we have, the next launch will try again.
+        LOG.exception("Fetching the key set %s failed", key_set_url)
+    finally:
+        with _LOCK:
+            _REFRESHING.discard(key_set_url)
+
+
+@lru_cache(maxsize=1)
+def _get_executor(_pid) -> ThreadPoolExecutor:
+    # Threads don't survive forking so cache the executor per process ID.
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="jwks")
+
+
 def factory(_context, request):
     return JWTService(
         registration_service=request.find_service(LTIRegistrationService),
@@ -1,7 +1,35 @@
+import hashlib
+import json
+import logging
+
+from cachetools import TTLCache
+from celery.exceptions import OperationalError
 from h_api.bulk_api import CommandBuilder
 
 from lms.models import Grouping
 from lms.services import HAPI
+from lms.tasks.h_api import execute_bulk
+
+LOG = logging.getLogger(__name__)
+
+_SYNCED = TTLCache(maxsize=65536, ttl=600)
+"""
+Content hashes of the h objects this process has synced recently.
+
+Keys are:
+
+- `("user", username)` for user upserts
+- `("group", username, authority_provided_id)` for a group upsert and the
+  membership of `username` in that group, as memberships can only be created
+  along with the upsert of the group they reference.
+
+Values are the hash of the upserted attributes, so any change on our side
+will cause a new sync.
+
+Hashes are only recorded once h has accepted the commands: by the request
+for in-request syncs and by the execute_bulk() Celery task, in the worker's
+process, for async ones.
+"""
 
 
 class LTIHService:
@@ -22,6 +50,7 @@ class LTIHService:
         self._application_instance = request.lti_user.application_instance
 
         self._authority = request.registry.settings["h_authority"]
+        self._async = request.registry.settings["async_h_sync"]
         self._h_api: HAPI = request.find_service(HAPI)
         self._group_info_service = request.find_service(name="group_info")
 
@@ -32,6 +61,13 @@ class LTIHService:
         This will upsert the provided list of groups, the current user and
         make that user a member of each group.
 
+        Users, groups and memberships that this process has synced in the last
+        few minutes with the same attributes are not sent to h again. If the
+        `async_h_sync` setting is enabled the commands are sent to h from a
+        Celery task instead of blocking the launch. In that case the launch
+        can render before h has the user or group, and the task retries until
+        h accepts them.
+
         :param groupings: groupings to sync to H
         :param group_info_params: params to add for each in `GroupInfo`
 
@@ -39,7 +75,20 @@ class LTIHService:
         :raise ApplicationInstanceNotFound: if
             `request.lti_user.oauth_consumer_key` isn't in the DB
         """
-        self._h_api.execute_bulk(commands=self._yield_commands(groupings))
+        hashes = {self._user_key(): _hash(self._user_attributes(self._h_user))}
+        for grouping in groupings:
+            hashes[self._group_key(grouping)] = _hash(self._group_attributes(grouping))
+        pending = {
+            key: value for key, value in hashes.items() if _SYNCED.get(key) != value
+        }
+
+        if pending:
+            pending_groupings = [
+                grouping
+                for grouping in groupings
+                if self._group_key(grouping) in pending
+            ]
+            self._execute_bulk(list(self._yield_commands(pending_groupings)), pending)
 
         # Keep a note of the groups locally for reporting purposes.
         for grouping in groupings:
@@ -47,6 +96,29 @@ class LTIHService:
                 grouping=grouping, params=group_info_params
             )
 
+    def _execute_bulk(self, commands, hashes):
+        if self._async:
+            try:
+                execute_bulk.apply_async(
+                    (),
+                    {
+                        "commands": [command.raw for command in commands],
+                        "synced": list(hashes.items()),
+                    },
+                )
+                return
+            except OperationalError:
+                LOG.exception("Error while queueing h sync, syncing in-request")
+
+        self._h_api.execute_bulk(commands=commands)
+        _SYNCED.update(hashes)
+
+    def _user_key(self):
+        return ("user", self._h_user.username)
+
+    def _group_key(self, grouping):
+        return ("group", self._h_user.username, grouping.authority_provided_id)
+
     def _yield_commands(self, groupings):
         # Note! - Syncing a user to `h` currently has an implication for
         # reporting and so billing and will as long as our billing metric is
@@ -62,27 +134,33 @@ class LTIHService:
             yield CommandBuilder.group_membership.create("user_0", f"group_{i}")
 
     def _user_upsert(self, h_user, ref="user_0"):
-        return CommandBuilder.user.upsert(
-            {
-                "authority": self._authority,
-                "username": h_user.username,
-                "display_name": h_user.display_name,
-                "identities": [
-                    {
-                        "provider": h_user.provider,
-                        "provider_unique_id": h_user.provider_unique_id,
-                    }
-                ],
-            },
-            ref,
-        )
+        return CommandBuilder.user.upsert(self._user_attributes(h_user), ref)
 
     def _group_upsert(self, grouping, ref):
-        return CommandBuilder.group.upsert(
-            {
-                "authority": self._authority,
-                "name": grouping.name,
-                "authority_provided_id": grouping.authority_provided_id,
-            },
-            ref,
-        )
+        return CommandBuilder.group.upsert(self._group_attributes(grouping), ref)
+
+    def _user_attributes(self, h_user) -> dict:
+        return {
+            "authority": self._authority,
+            "username": h_user.username,
+            "display_name": h_user.display_name,
+            "identities": [
+                {
+                    "provider": h_user.provider,
+                    "provider_unique_id": h_user.provider_unique_id,
+                }
+            ],
+        }
+
+    def _group_attributes(self, grouping) -> dict:
+        return {
+            "authority": self._authority,
+            "name": grouping.name,
+            "authority_provided_id": grouping.authority_provided_id,
+        }
+
+
+def _hash(attributes: dict) -> str:
+    return hashlib.sha256(
+        json.dumps(attributes, sort_keys=True).encode("utf-8")
+    ).hexdigest()
@@ -39,6 +39,15 @@ class LTIRegistrationService:
             .all()
         )
 
+    def get_key_set_urls(self) -> list[str]:
+        """Get the key set URLs of all the registrations, without duplicates."""
+        return [
+            key_set_url
+            for (key_set_url,) in self._db.query(LTIRegistration.key_set_url)
+            .distinct()
+            .order_by(LTIRegistration.key_set_url)
+        ]
+
     def _registration_search_query(
         self, *, id_=None, issuer=None, client_id=None
     ) -> LTIRegistration:
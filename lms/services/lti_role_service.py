@@ -1,8 +1,20 @@
-from sqlalchemy import func, or_, select
-from sqlalchemy.orm import Session
+from cachetools import TTLCache
+from sqlalchemy import select
+from sqlalchemy.orm import Session, make_transient_to_detached
 
 from lms.models import ApplicationInstance
-from lms.models.lti_role import LTIRole, LTIRoleOverride, Role
+from lms.models.lti_role import LTIRole, LTIRoleOverride, Role, RoleScope, RoleType
+
+_ROLES = TTLCache(maxsize=4096, ttl=600)
+"""LTIRole.value -> (LTIRole.id, LTIRole.type, LTIRole.scope) for known roles."""
+
+_OVERRIDES = TTLCache(maxsize=4096, ttl=600)
+"""
+ApplicationInstance.id -> {LTIRole.id: (type, scope)} of the instance's overrides.
+
+Overrides are cleared from this process's cache when they are edited through
+this service, other processes pick up the changes once the TTL expires.
+"""
 
 
 class LTIRoleService:
@@ -19,6 +31,49 @@ class LTIRoleService:
         """
         role_strings = [role.strip() for role in role_description.split(",")]
 
+        roles = []
+        uncached = set()
+        for value in set(role_strings):
+            if cached := _ROLES.get(value):
+                roles.append(self._from_cache(value, *cached))
+            else:
+                uncached.add(value)
+
+        if uncached:
+            roles.extend(self._get_uncached_roles(uncached))
+
+        return sorted(roles, key=lambda r: r.value)
+
+    def get_roles_for_application_instance(
+        self, ai: ApplicationInstance, roles: list[LTIRole]
+    ) -> list[Role]:
+        self._db.flush()  # Make sure roles have IDs
+
+        overrides = _OVERRIDES.get(ai.id)
+        if overrides is None:
+            overrides = _OVERRIDES[ai.id] = {
+                row.lti_role_id: (row.type, row.scope)
+                for row in self._db.execute(
+                    select(
+                        LTIRoleOverride.lti_role_id,
+                        LTIRoleOverride.type,
+                        LTIRoleOverride.scope,
+                    ).where(LTIRoleOverride.application_instance_id == ai.id)
+                )
+            }
+
+        effective_roles = []
+        for role in sorted(roles, key=lambda r: r.value):
+            type_, scope = overrides.get(role.id, (None, None))
+            effective_roles.append(
+                Role(
+                    scope=scope or role.scope, type=type_ or role.type, value=role.value
+                )
+            )
+
+        return effective_roles
+
+    def _get_uncached_roles(self, role_strings: set[str]) -> list[LTIRole]:
         # pylint: disable=no-member
         # Pylint is confused about the `in_` for some reason
         roles = self._db.query(LTIRole).filter(LTIRole.value.in_(role_strings)).all()
@@ -29,40 +84,25 @@ class LTIRoleService:
             # the values in the DB and also exposing the right values in the
             # rest to the application.
             role.update_from_value()
+            _ROLES[role.value] = (role.id, role.type, role.scope)
 
-        if missing := (set(role_strings) - set(role.value for role in roles)):
+        if missing := role_strings - set(role.value for role in roles):
+            # These will be cached the next time they are requested, once
+            # they've been given IDs.
             new_roles = [LTIRole(value=value) for value in missing]
             self._db.add_all(new_roles)
 
             roles.extend(new_roles)
 
-        return sorted(roles, key=lambda r: r.value)
+        return roles
 
-    def get_roles_for_application_instance(
-        self, ai: ApplicationInstance, roles: list[LTIRole]
-    ) -> list[Role]:
-        self._db.flush()  # Make sure roles have IDs
-        # pylint:disable=no-member
-        overrides = self._db.execute(
-            select(
-                LTIRole.value.label("value"),
-                func.coalesce(LTIRoleOverride.type, LTIRole.type).label("type"),
-                func.coalesce(LTIRoleOverride.scope, LTIRole.scope).label("scope"),
-            )
-            .outerjoin(LTIRoleOverride)
-            .filter(
-                LTIRole.id.in_([role.id for role in roles]),
-                or_(
-                    LTIRoleOverride.application_instance_id == ai.id,
-                    LTIRoleOverride.application_instance_id.is_(None),
-                ),
-            )
-            .order_by("value")
-        )
-        return [
-            Role(scope=role.scope, type=role.type, value=role.value)
-            for role in overrides
-        ]
+    def _from_cache(
+        self, value: str, id_: int, type_: RoleType, scope: RoleScope
+    ) -> LTIRole:
+        """Attach a cached role to the session without querying the DB."""
+        role = LTIRole(id=id_, _value=value, type=type_, scope=scope)
+        make_transient_to_detached(role)
+        return self._db.merge(role, load=False)
 
     def search(self, id_=None):
         query = self._db.query(LTIRole).order_by(LTIRole.value)
@@ -80,6 +120,7 @@ class LTIRoleService:
             scope=scope,
         )
         self._db.add(override)
+        _OVERRIDES.pop(application_instance.id, None)
         return override
 
     def search_override(self, id_=None):
@@ -95,11 +136,13 @@ class LTIRoleService:
     ) -> LTIRoleOverride:
         override.scope = scope
         override.type = type_
+        _OVERRIDES.pop(override.application_instance_id, None)
 
         return override
 
     def delete_override(self, override: LTIRoleOverride):
         self._db.delete(override)
+        _OVERRIDES.pop(override.application_instance_id, None)
 
 
 def service_factory(_context, request) -> LTIRoleService:
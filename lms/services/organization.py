@@ -1,9 +1,14 @@
+from collections import defaultdict
+from collections.abc import Iterator
 from dataclasses import dataclass
 from datetime import datetime
+from itertools import chain
 from logging import getLogger
 
 import sqlalchemy as sa
+from cachetools import TTLCache
 from sqlalchemy import Date, func, select
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Session, aliased
 
 from lms.db import full_text_match
@@ -19,6 +24,57 @@ from lms.services.h_api import HAPI
 
 LOG = getLogger(__name__)
 
+_HIERARCHY = TTLCache(maxsize=1, ttl=300)
+"""
+The parents and children of every organization, under the key "hierarchy".
+
+The cache is cleared whenever an organization is created, deleted or moved to
+a different parent in this process. Other processes will see the change once
+the TTL expires.
+"""
+
+
+@dataclass(frozen=True)
+class _Hierarchy:
+    parents: dict[int, int | None]
+    children: dict[int, list[int]]
+
+    def descendants(self, id_) -> list[int]:
+        """Get `id_` and its children, their children etc."""
+        ids = [id_]
+        for child_id in ids:
+            ids.extend(self.children.get(child_id, []))
+        return ids
+
+    def root(self, id_) -> int:
+        while (parent_id := self.parents[id_]) is not None:
+            id_ = parent_id
+        return id_
+
+
+@sa.event.listens_for(Session, "before_flush")
+def _invalidate_hierarchy(session, _flush_context, _instances):
+    if any(isinstance(model, Organization) for model in session.new) or any(
+        isinstance(model, Organization)
+        and (
+            model in session.deleted
+            or sa.inspect(model).attrs.parent.history.has_changes()
+            or sa.inspect(model).attrs.parent_id.history.has_changes()
+        )
+        for model in chain(session.dirty, session.deleted)
+    ):
+        _HIERARCHY.clear()
+        # Clear it again at the end of the transaction in case the changes
+        # get rolled back or a concurrent request caches the old hierarchy.
+        session.info["organization_hierarchy_stale"] = True
+
+
+@sa.event.listens_for(Session, "after_commit")
+@sa.event.listens_for(Session, "after_rollback")
+def _invalidate_hierarchy_after_transaction(session):
+    if session.info.pop("organization_hierarchy_stale", False):
+        _HIERARCHY.clear()
+
 
 @dataclass
 class UsageReportRow:
@@ -244,7 +300,25 @@ class OrganizationService:
         organization: Organization,
         since: datetime,
         until: datetime,
-    ):
+        batch_size: int = 1000,
+    ) -> Iterator[UsageReportRow]:
+        """
+        Get the users of the organization's courses with activity in a period.
+
+        The courses are checked with h in batches of `batch_size` and any
+        problem with them is raised straight away. The rows themselves are
+        read lazily, with a server side cursor and a session of their own, so
+        they can be streamed after the request's transaction has ended.
+
+        :param organization: Organization to report on, with its children
+        :param since: Start of the period
+        :param until: End of the period
+        :param batch_size: How many courses to check with h, and how many
+            rows to fetch, at a time
+
+        :raises ValueError: if the organization has no courses, or no courses
+            with activity in the period
+        """
         # Organizations that are children of the current one.
         # It includes the current org ID.
         organization_children = self.get_hierarchy_ids(
@@ -259,16 +333,23 @@ class OrganizationService:
                 # If a group was created after the date we are interested, exclude it
                 Grouping.created <= until,
             )
-        ).all()
+            .execution_options(yield_per=batch_size)
+        )
+
+        # Of those groups, get the ones that do have annotations in the time
+        # period, asking h about a bounded number of them at a time
+        found_groups = False
+        groups_with_annos = []
+        for batch in groups_from_org.partitions():
+            found_groups = True
+            groups_with_annos.extend(
+                group.authority_provided_id
+                for group in self._h_api.get_groups(batch, since, until)
+            )
 
-        if not groups_from_org:
+        if not found_groups:
             raise ValueError(f"No courses found for {organization.public_id}")
 
-        # Of those groups, get the ones that do have annotations in the time period
-        groups_with_annos = [
-            group.authority_provided_id
-            for group in self._h_api.get_groups(groups_from_org, since, until)
-        ]
         if not groups_with_annos:
             raise ValueError(
                 f"No courses with activity found for {organization.public_id}"
@@ -303,25 +384,33 @@ class OrganizationService:
                     )
                     .select_from(Grouping)
                     .outerjoin(parent, Grouping.parent_id == parent.id)
-                    .where(Grouping.authority_provided_id.in_(groups_with_annos))
+                    .where(
+                        # Pass the groups as one array parameter instead of
+                        # one parameter each
+                        Grouping.authority_provided_id
+                        == sa.any_(sa.literal(groups_with_annos, ARRAY(sa.UnicodeText)))
+                    )
                 ),
                 # We can't exactly know the state of membership in the past but we can
                 # know if someone was added to the group after the date we are interested
                 GroupingMembership.created <= until,
             )
+            .execution_options(yield_per=batch_size)
         )
-        return [
-            UsageReportRow(
-                # Students might have name but they never have email
-                name=row.name if row.email else "<STUDENT>",
-                email=row.email if row.email else "<STUDENT>",
-                h_userid=row.h_userid,
-                course_name=row.course_name,
-                course_created=row.course_created,
-                authority_provided_id=row.authority_provided_id,
-            )
-            for row in self._db_session.execute(query).all()
-        ]
+        return self._usage_report_rows(query)
+
+    def _usage_report_rows(self, query) -> Iterator[UsageReportRow]:
+        with Session(bind=self._db_session.get_bind()) as session:
+            for row in session.execute(query):
+                yield UsageReportRow(
+                    # Students might have name but they never have email
+                    name=row.name if row.email else "<STUDENT>",
+                    email=row.email if row.email else "<STUDENT>",
+                    h_userid=row.h_userid,
+                    course_name=row.course_name,
+                    course_created=row.course_created,
+                    authority_provided_id=row.authority_provided_id,
+                )
 
     def _move_organization_parent(self, organization: Organization, parent_public_id):
         """Change an organizations parent, without creating loops."""
@@ -358,31 +447,43 @@ class OrganizationService:
         :param id_: Organization id to look for
         :param include_parents: Include parents as well as children
         """
+        hierarchy = self._get_hierarchy()
+        if id_ not in hierarchy.parents:
+            # The organization might be newer than the cached hierarchy
+            hierarchy = self._get_hierarchy(refresh=True)
+            if id_ not in hierarchy.parents:
+                return []
 
-        # Find the relevant orgs in the hierarchy by id using a recursive CTE:
-        # https://www.postgresql.org/docs/current/queries-with.html#QUERIES-WITH-RECURSIVE
-        cols = [Organization.id, Organization.parent_id]
-        base_case = (
-            self._db_session.query(*cols)
-            .filter(Organization.id == id_)
-            # The name of the CTE is arbitrary, but must be present
-            .cte("organizations", recursive=True)
-        )
-
-        # We are going to self join onto the above with anything that is a
-        # child of the objects we've seen so far
-        join_condition = Organization.parent_id == base_case.c.id
         if include_parents:
-            # Match anything that is a parent of what we've seen
-            join_condition = sa.or_(
-                join_condition, Organization.id == base_case.c.parent_id
-            )
+            # Everything in the same tree, which is everything below the root
+            id_ = hierarchy.root(id_)
+
+        return hierarchy.descendants(id_)
+
+    def _get_hierarchy(self, refresh=False) -> _Hierarchy:
+        # Flush any pending organizations, like a query would, so they are
+        # part of the hierarchy
+        self._db_session.flush()
+
+        if not refresh and (hierarchy := _HIERARCHY.get("hierarchy")):
+            return hierarchy
+
+        parents = dict(
+            self._db_session.execute(select(Organization.id, Organization.parent_id))
+            .tuples()
+            .all()
+        )
+        children = defaultdict(list)
+        for id_, parent_id in parents.items():
+            if parent_id is not None:
+                children[parent_id].append(id_)
 
-        recursive_case = self._db_session.query(*cols).join(base_case, join_condition)
+        hierarchy = _Hierarchy(parents=parents, children=dict(children))
+        if not self._db_session.info.get("organization_hierarchy_stale"):
+            # Only cache what's actually committed
+            _HIERARCHY["hierarchy"] = hierarchy
 
-        # This will recurse until no new rows are added
-        rows = self._db_session.query(base_case.union(recursive_case)).all()  # type: ignore
-        return [row[0] for row in rows]
+        return hierarchy
 
 
 def service_factory(_context, request) -> OrganizationService:
@@ -1,16 +1,69 @@
 import base64
 import json
+import random
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from itertools import chain
 
+import sqlalchemy as sa
+from cachetools import TTLCache
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric import rsa
 from cryptography.utils import int_to_bytes
-from sqlalchemy import func
+from sqlalchemy.orm import Session
 
 from lms.models import RSAKey
 from lms.services.aes import AESService
 
+KEYS_TTL = timedelta(minutes=5)
+"""How long the keys are cached for."""
+
+_KEYS = TTLCache(maxsize=1, ttl=KEYS_TTL.total_seconds())
+"""
+The _KeySet of all the keys, under the key "keys".
+
+The cache is cleared whenever a key is created, changed or deleted in this
+process. Keys are rotated by a celery task though, so the web processes see
+the changes once the TTL expires.
+"""
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    """A decrypted active key."""
+
+    kid: str
+    private_key: rsa.RSAPrivateKey
+
+    published: bool
+    """Whether every process has been listing the key in its public keys."""
+
+
+@dataclass(frozen=True)
+class _KeySet:
+    signing_keys: list[SigningKey]
+    public_jwks: list[dict]
+
+
+@sa.event.listens_for(Session, "before_flush")
+def _invalidate_keys(session, _flush_context, _instances):
+    if any(
+        isinstance(model, RSAKey)
+        for model in chain(session.new, session.dirty, session.deleted)
+    ):
+        _KEYS.clear()
+        # Clear it again at the end of the transaction in case the changes
+        # get rolled back or a concurrent request caches the old keys.
+        session.info["rsa_keys_stale"] = True
+
+
+@sa.event.listens_for(Session, "after_commit")
+@sa.event.listens_for(Session, "after_rollback")
+def _invalidate_keys_after_transaction(session):
+    if session.info.pop("rsa_keys_stale", False):
+        _KEYS.clear()
+
 
 class RSAKeyService:
     no_encryption = serialization.NoEncryption()
@@ -91,20 +144,48 @@ class RSAKeyService:
         We don't filter out expired ones here to allow in-flight request to
         continue while keys are rotating.
         """
-        return [
-            dict(json.loads(key.public_key), use="sig", kid=key.kid)
-            for key in self._db.query(RSAKey).filter_by().all()
-        ]
-
-    def get_random_key(self) -> RSAKey:
-        """Get one random key from the valid ones to spread usage between them."""
-        return (
-            self._db.query(RSAKey)
-            .filter_by(expired=False)
-            .order_by(func.random())  # pylint:disable=not-callable
-            .first()
+        return self._get_keys().public_jwks
+
+    def get_signing_key(self) -> SigningKey:
+        """
+        Get one random key from the valid ones to spread usage between them.
+
+        Keys which other processes might not be publishing yet are only used
+        if there are no others.
+        """
+        signing_keys = self._get_keys().signing_keys
+        return random.choice(
+            [key for key in signing_keys if key.published] or signing_keys
         )
 
+    def _get_keys(self) -> _KeySet:
+        if key_set := _KEYS.get("keys"):
+            return key_set
+
+        now = datetime.now()
+        keys = self._db.query(RSAKey).order_by(RSAKey.id).all()
+        key_set = _KeySet(
+            signing_keys=[
+                SigningKey(
+                    kid=key.kid,
+                    private_key=serialization.load_pem_private_key(
+                        self.private_key(key), password=None
+                    ),
+                    published=now - key.created >= KEYS_TTL,
+                )
+                for key in keys
+                if not key.expired
+            ],
+            public_jwks=[
+                dict(json.loads(key.public_key), use="sig", kid=key.kid) for key in keys
+            ],
+        )
+        if not self._db.info.get("rsa_keys_stale"):
+            # Only cache what's actually committed
+            _KEYS["keys"] = key_set
+
+        return key_set
+
     def _as_pem_private_key(self, rsa_key: rsa.RSAPrivateKey, aes_iv) -> bytes:
         """Encode a rsa key as an AES encrypted PEM private key."""
         pem_private_key = rsa_key.private_bytes(
@@ -4,6 +4,7 @@ from functools import lru_cache
 import xmltodict
 from marshmallow import EXCLUDE, Schema, fields
 from requests import JSONDecodeError, PreparedRequest
+from requests.adapters import HTTPAdapter
 from requests.auth import AuthBase
 
 from lms.services.exceptions import ExternalRequestError, SerializableError
@@ -34,17 +35,18 @@ class VitalSourceClient:
 
     VS_API = "https://api.vitalsource.com"
 
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, adapter: HTTPAdapter | None = None):
         """
         Initialise a client object.
 
         :param api_key: Key for VitalSource API
+        :param adapter: Transport adapter to send requests with
         :raises ValueError: If `api_key` is missing
         """
         if not api_key:
             raise ValueError("VitalSource credentials are missing")
 
-        self._http_session = HTTPService()
+        self._http_session = HTTPService(adapter=adapter)
 
         # Set headers in the session which will be passed with every request
         self._http_session.session.headers = {"X-VitalSource-API-Key": api_key}
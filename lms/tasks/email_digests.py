@@ -142,55 +142,84 @@ def send_instructor_email_digest(
         included in the email, as an ISO 8601 format string
     :param kwargs: other keyword arguments to pass to DigestService.send_instructor_email_digest()
     """
-    # Caution: datetime.fromisoformat() doesn't support all ISO 8601 strings!
-    # This only works for the subset of ISO 8601 produced by datetime.isoformat().
-    created_before: datetime = datetime.fromisoformat(created_before)  # type: ignore
-
-    if created_after is None:
-        created_after = created_before - timedelta(days=7)  # type: ignore
-    else:
-        created_after: datetime = datetime.fromisoformat(created_after)  # type: ignore
+    created_before, created_after = _parse_timeframe(created_before, created_after)
 
     with app.request_context() as request:  # pylint:disable=no-member
         with request.tm:
-            task_done_data = _get_task_done_data(request.db, h_userid)
-
-            if task_done_data:
-                created_after = max(
-                    datetime.fromisoformat(task_done_data["created_before"]).replace(
-                        tzinfo=timezone.utc
-                    ),
-                    created_after.replace(tzinfo=timezone.utc),  # type:ignore
-                )
-
             digest_service = request.find_service(DigestService)
 
             digest_service.send_instructor_email_digest(
                 h_userid=h_userid,
-                created_after=created_after,
+                created_after=_get_created_afters(
+                    request.db, [h_userid], created_after
+                )[h_userid],
                 created_before=created_before,
                 **kwargs,
             )
 
 
-def _get_task_done_data(db_session, h_userid: str) -> dict | None:
-    """Return the most recent matching TaskDone.data dict for h_userid."""
-    task_dones = db_session.scalars(
-        select(TaskDone)
+def _parse_timeframe(
+    created_before: str, created_after: str | None
+) -> tuple[datetime, datetime]:
+    """Return the given ISO 8601 strings as datetimes, defaulting to one week."""
+    # Caution: datetime.fromisoformat() doesn't support all ISO 8601 strings!
+    # This only works for the subset of ISO 8601 produced by datetime.isoformat().
+    created_before_dt = datetime.fromisoformat(created_before)
+
+    if created_after is None:
+        return created_before_dt, created_before_dt - timedelta(days=7)
+
+    return created_before_dt, datetime.fromisoformat(created_after)
+
+
+def _get_created_afters(
+    db_session, h_userids: list[str], created_after: datetime
+) -> dict[str, datetime]:
+    """Return `created_after` moved past anything each user was already sent."""
+    watermarks = _get_watermarks(db_session, h_userids)
+
+    created_afters = {}
+    for h_userid in h_userids:
+        if h_userid in watermarks:
+            created_afters[h_userid] = max(
+                watermarks[h_userid].replace(tzinfo=timezone.utc),
+                created_after.replace(tzinfo=timezone.utc),
+            )
+        else:
+            created_afters[h_userid] = created_after
+
+    return created_afters
+
+
+def _get_watermarks(db_session, h_userids: list[str]) -> dict[str, datetime]:
+    """
+    Return the latest digest `created_before` of each of `h_userids`.
+
+    This is the `created_before` of the most recent matching TaskDone of each
+    user. Users with no matching TaskDones are missing from the returned dict.
+    """
+    h_userid = TaskDone.data["h_userid"].astext
+    created_before = TaskDone.data["created_before"].astext
+
+    rows = db_session.execute(
+        # This matches the ix__task_done_instructor_email_digest index.
+        select(h_userid, created_before)
         .where(
-            TaskDone.data["type"].as_string() == "instructor_email_digest",
-            TaskDone.data["h_userid"].as_string() == h_userid,
-            TaskDone.data["created_before"].isnot(None),
+            TaskDone.data["type"].astext == "instructor_email_digest",
+            h_userid.in_(h_userids),
+            created_before.isnot(None),
         )
-        .order_by(TaskDone.data["created_before"].desc())
+        .order_by(h_userid, created_before.desc())
     )
 
-    for task_done in task_dones:
+    watermarks = {}
+    for row_h_userid, row_created_before in rows:
+        if row_h_userid in watermarks:
+            continue
+
         try:
-            datetime.fromisoformat(task_done.data["created_before"])
+            watermarks[row_h_userid] = datetime.fromisoformat(row_created_before)
         except ValueError:
             continue
-        else:
-            return task_done.data
 
-    return None
+    return watermarks
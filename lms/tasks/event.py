@@ -12,3 +12,40 @@ def insert_event(event: dict) -> None:
             request.find_service(EventService).insert_event(
                 BaseEvent(request=request, **event)
             )
+
+
+@app.task
+def insert_events(events: list[dict]) -> None:
+    """Insert a batch of serialized events into the DB."""
+    with app.request_context() as request:  # pylint: disable=no-member
+        with request.tm:
+            # pylint:disable=import-outside-toplevel,cyclic-import
+            from lms.services.event import EventService
+
+            request.find_service(EventService).insert_events(
+                [BaseEvent(request=request, **event) for event in events]
+            )
+
+
+PARTITIONS_AHEAD = 3
+"""How many months of future partitions of the event tables to create."""
+
+RETENTION_MONTHS = 24
+"""How many months of events to keep in the event tables before archiving them."""
+
+
+@app.task
+def maintain_partitions() -> None:
+    """
+    Create upcoming partitions of the event tables and archive old ones.
+
+    This is intended to be called periodically.
+    """
+    with app.request_context() as request:  # pylint: disable=no-member
+        with request.tm:
+            # pylint:disable=import-outside-toplevel,cyclic-import
+            from lms.services.event import EventService
+
+            event_service = request.find_service(EventService)
+            event_service.create_partitions(months_ahead=PARTITIONS_AHEAD)
+            event_service.archive_partitions(retention_months=RETENTION_MONTHS)
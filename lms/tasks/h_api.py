@@ -0,0 +1,39 @@
+"""Celery tasks for calling h's API outside of the request/response cycle."""
+
+from h_api.bulk_api import CommandBuilder
+
+from lms.tasks.celery import app
+
+
+@app.task(
+    acks_late=True,
+    autoretry_for=(Exception,),
+    max_retries=3,
+    retry_backoff=5,
+    retry_backoff_max=60,
+)
+def execute_bulk(*, commands: list, synced: list | None = None) -> None:
+    """
+    Send a series of h_api commands to h's bulk API.
+
+    :param commands: the `raw` representation of h_api Commands
+    :param synced: `[key, hash]` pairs for the objects that `commands` sync,
+        to record once h has accepted them (see `lms.services.lti_h._SYNCED`)
+    """
+    # pylint:disable=import-outside-toplevel,cyclic-import
+    from lms.services.h_api import HAPI
+    from lms.services.lti_h import _SYNCED
+
+    # JSON has turned the keys into lists
+    hashes = {tuple(key): value for key, value in synced or []}
+
+    if hashes and all(_SYNCED.get(key) == value for key, value in hashes.items()):
+        # This worker has just sent the same commands to h
+        return
+
+    with app.request_context() as request:  # pylint:disable=no-member
+        request.find_service(HAPI).execute_bulk(
+            commands=[CommandBuilder.from_data(raw) for raw in commands]
+        )
+
+    _SYNCED.update(hashes)
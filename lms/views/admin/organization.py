@@ -1,7 +1,13 @@
+import csv
+from collections.abc import Iterable, Iterator
+from dataclasses import astuple
 from datetime import datetime
+from io import StringIO
+from itertools import chain
 
 from marshmallow import validate
 from pyramid.httpexceptions import HTTPBadRequest, HTTPFound, HTTPNotFound
+from pyramid.response import Response
 from pyramid.view import view_config, view_defaults
 from webargs import fields
 
@@ -10,7 +16,7 @@ from lms.models import Organization
 from lms.models.public_id import InvalidPublicId
 from lms.security import Permissions
 from lms.services import OrganizationService
-from lms.services.organization import InvalidOrganizationParent
+from lms.services.organization import InvalidOrganizationParent, UsageReportRow
 from lms.validation._base import PyramidRequestSchema
 from lms.views.admin import flash_validation
 from lms.views.admin._schemas import EmptyStringInt
@@ -180,7 +186,6 @@ class AdminOrganizationViews:
         match_param="section=usage",
         request_method="POST",
         permission=Permissions.STAFF,
-        renderer="lms:templates/admin/organization/usage.html.jinja2",
     )
     def usage(self):
         org = self._get_org_or_404(self.request.matchdict["id_"])
@@ -206,12 +211,54 @@ class AdminOrganizationViews:
             self.request.session.flash(
                 f"There was a problem generating the report: {exc}", "errors"
             )
-            report = []
+            return HTTPFound(
+                location=self.request.route_url(
+                    "admin.organization.section", id_=org.id, section="usage"
+                )
+            )
 
-        return {"org": org, "since": since, "until": until, "report": report}
+        # Stream the rows as they are read instead of building the whole
+        # report first, large organizations have a lot of them
+        filename = f"usage-{org.public_id}-{since.date()}-{until.date()}.csv"
+        return Response(
+            app_iter=_csv_lines(report),
+            content_type="text/csv",
+            charset="utf-8",
+            content_disposition=f'attachment; filename="{filename}"',
+        )
 
     def _get_org_or_404(self, id_) -> Organization:
         if org := self.organization_service.get_by_id(id_):
             return org
 
         raise HTTPNotFound()
+
+
+USAGE_REPORT_HEADER = (
+    "User",
+    "Email",
+    "User ID",
+    "Course",
+    "Course created",
+    "Course ID",
+)
+
+
+def _csv_lines(report: Iterable[UsageReportRow]) -> Iterator[bytes]:
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+
+    for row in chain([USAGE_REPORT_HEADER], (astuple(row) for row in report)):
+        writer.writerow([_csv_cell(value) for value in row])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _csv_cell(value):
+    # Spreadsheets run cells starting with these as formulas. Names and
+    # course titles come from the LMS so make sure they are only ever text.
+    if isinstance(value, str) and value.startswith(("=", "+", "-", "@", "\t", "\r")):
+        return f"'{value}"
+
+    return value
@@ -1,16 +1,26 @@
 from pyramid.view import view_config
 
 from lms.js_config_types import APIAssignment, APICourse, APIStudentStats
-from lms.models import RoleScope, RoleType
 from lms.security import Permissions
-from lms.services.h_api import HAPI
+from lms.services import DashboardStatsService
 from lms.views.dashboard.base import get_request_assignment
+from lms.views.dashboard.pagination import PaginationSchema, get_page, paginate
+
+
+class StudentStatsSchema(PaginationSchema):
+    ORDER_BY = {
+        "display_name": str,
+        "annotations": int,
+        "replies": int,
+        "last_activity": str,
+    }
+    FIELDS = tuple(ORDER_BY)
 
 
 class AssignmentViews:
     def __init__(self, request) -> None:
         self.request = request
-        self.h_api = request.find_service(HAPI)
+        self.dashboard_stats_service = request.find_service(DashboardStatsService)
         self.assignment_service = request.find_service(name="assignment")
 
     @view_config(
@@ -32,44 +42,25 @@ class AssignmentViews:
         request_method="GET",
         renderer="json",
         permission=Permissions.DASHBOARD_VIEW,
+        schema=StudentStatsSchema,
     )
     def assignment_stats(self) -> list[APIStudentStats]:
         """Fetch the stats for one particular assignment."""
         assignment = get_request_assignment(self.request, self.assignment_service)
-        stats = self.h_api.get_assignment_stats(
-            [g.authority_provided_id for g in assignment.groupings],
-            assignment.resource_link_id,
-        )
-
-        # Organize the H stats by userid for quick access
-        stats_by_user = {s["userid"]: s for s in stats}
-        student_stats: list[APIStudentStats] = []
+        page = get_page(self.request, StudentStatsSchema)
+        rows = self.dashboard_stats_service.get_student_stats(assignment, page)
 
-        # Iterate over all the students we have in the DB
-        for user in self.assignment_service.get_members(
-            assignment, role_scope=RoleScope.COURSE, role_type=RoleType.LEARNER
-        ):
-            if s := stats_by_user.get(user.h_userid):
-                # We seen this student in H, get all the data from there
-                student_stats.append(
-                    {
-                        "display_name": s["display_name"],
-                        "annotations": s["annotations"],
-                        "replies": s["replies"],
-                        "last_activity": s["last_activity"],
-                    }
+        return paginate(
+            self.request,
+            page,
+            rows,
+            [
+                APIStudentStats(
+                    display_name=row.display_name,
+                    annotations=row.annotations,
+                    replies=row.replies,
+                    last_activity=row.last_activity,
                 )
-            else:
-                # We haven't seen this user H,
-                # use LMS DB's data and set 0s for all annotation related fields.
-                student_stats.append(
-                    {
-                        "display_name": user.display_name
-                        or f"Student {user.user_id[:10]}",
-                        "annotations": 0,
-                        "last_activity": None,
-                        "replies": 0,
-                    }
-                )
-
-        return student_stats
+                for row in rows
+            ],
+        )
@@ -0,0 +1,70 @@
+from pyramid.httpexceptions import HTTPNotFound
+from pyramid.view import view_config
+
+from lms.js_config_types import (
+    APICourseStats,
+    APIOrganizationStats,
+    CourseStats,
+    OrganizationStats,
+)
+from lms.models.public_id import InvalidPublicId
+from lms.security import Permissions
+from lms.services import DashboardStatsService, OrganizationService
+
+
+class OrganizationViews:
+    def __init__(self, request) -> None:
+        self.request = request
+        self.organization_service = request.find_service(OrganizationService)
+        self.dashboard_stats_service = request.find_service(DashboardStatsService)
+
+    @view_config(
+        route_name="dashboard.api.organization.stats",
+        request_method="GET",
+        renderer="json",
+        permission=Permissions.STAFF,
+    )
+    def organization_stats(self) -> APIOrganizationStats:
+        """Get the stats of an organization and its children, by course."""
+        try:
+            organization = self.organization_service.get_by_public_id(
+                self.request.matchdict["public_id"]
+            )
+        except InvalidPublicId as err:
+            raise HTTPNotFound() from err
+
+        if not organization:
+            raise HTTPNotFound()
+
+        rows = self.dashboard_stats_service.get_organization_course_stats(
+            self.organization_service.get_hierarchy_ids(organization.id)
+        )
+        courses = [
+            APICourseStats(
+                id=row["id"],
+                title=row["title"],
+                stats=CourseStats(
+                    assignments=row["assignments"],
+                    annotations=row["annotations"],
+                    replies=row["replies"],
+                    last_activity=row["last_activity"],
+                ),
+            )
+            for row in rows
+        ]
+
+        return {
+            "id": organization.public_id,
+            "name": organization.name,
+            "stats": OrganizationStats(
+                courses=len(courses),
+                assignments=sum(row["assignments"] for row in rows),
+                annotations=sum(row["annotations"] for row in rows),
+                replies=sum(row["replies"] for row in rows),
+                last_activity=max(
+                    (row["last_activity"] for row in rows if row["last_activity"]),
+                    default=None,
+                ),
+            ),
+            "courses": courses,
+        }
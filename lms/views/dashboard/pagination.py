@@ -0,0 +1,129 @@
+"""
+Sorting, cursor based pagination and field selection for the dashboard APIs.
+
+Responses are still plain lists of items. When a `limit` is given and there
+might be more items, the URL of the next page is sent in a `Link` header:
+
+    Link: <https://.../stats?limit=100&cursor=...>; rel="next"
+"""
+
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from marshmallow import ValidationError, fields, validate, validates_schema
+from webargs.fields import DelimitedList
+
+from lms.services.dashboard_stats import Page
+from lms.validation import PyramidRequestSchema
+
+MAX_LIMIT = 1000
+"""Maximum number of items in a page."""
+
+
+class _CursorField(fields.Field):
+    """An opaque cursor, with the sort order and key of the last item seen."""
+
+    def _deserialize(self, value, attr, data, **kwargs):
+        try:
+            # Add back the padding removed from the cursor
+            order_by, sort_key, id_ = json.loads(
+                urlsafe_b64decode(value + "=" * (-len(value) % 4))
+            )
+        except (TypeError, ValueError) as err:
+            raise ValidationError("Invalid cursor.") from err
+
+        return order_by, (sort_key, id_)
+
+
+class PaginationSchema(PyramidRequestSchema):
+    """Query parameters of paginated APIs, to subclass with `ORDER_BY`."""
+
+    location = "query"
+
+    ORDER_BY: dict[str, type] = {}
+    """
+    Columns the items can be sorted by, with the type of their sort key.
+
+    The first one is the default.
+    """
+
+    FIELDS: tuple[str, ...] = ()
+    """Fields of the items that can be selected."""
+
+    order_by = fields.Str()
+    """Column to sort by, prefixed by `-` to sort in descending order."""
+
+    limit = fields.Int(validate=validate.Range(min=1, max=MAX_LIMIT))
+    cursor = _CursorField()
+
+    selected_fields = DelimitedList(fields.Str(), data_key="fields")
+    """Comma separated fields to include in the items, all by default."""
+
+    @validates_schema
+    def _validate(self, data, **_kwargs):
+        order_by = data.get("order_by", next(iter(self.ORDER_BY)))
+        if order_by.removeprefix("-") not in self.ORDER_BY:
+            raise ValidationError(
+                f"Must be one of: {', '.join(self.ORDER_BY)}", "order_by"
+            )
+
+        if "cursor" in data:
+            cursor_order_by, (sort_key, id_) = data["cursor"]
+            if cursor_order_by != order_by:
+                raise ValidationError("The cursor is for a different order.", "cursor")
+
+            # The cursor ends up in a query, check it matches the columns
+            if not _is_instance(id_, int) or not _is_instance(
+                sort_key, self.ORDER_BY[order_by.removeprefix("-")]
+            ):
+                raise ValidationError("Invalid cursor.", "cursor")
+
+        if unknown := set(data.get("selected_fields", [])) - set(self.FIELDS):
+            raise ValidationError(
+                f"Unknown fields: {', '.join(sorted(unknown))}", "fields"
+            )
+
+
+def _is_instance(value, type_: type) -> bool:
+    # JSON booleans are ints in Python, but not valid sort keys or IDs
+    return isinstance(value, type_) and not isinstance(value, bool)
+
+
+def get_page(request, schema: type[PaginationSchema]) -> Page:
+    """Get the page requested by the params parsed with `schema`."""
+    params = request.parsed_params
+    order_by = params.get("order_by", next(iter(schema.ORDER_BY)))
+
+    return Page(
+        order_by=order_by.removeprefix("-"),
+        descending=order_by.startswith("-"),
+        after=params["cursor"][1] if "cursor" in params else None,
+        limit=params.get("limit"),
+    )
+
+
+def paginate(request, page: Page, rows, items: list[dict]) -> list[dict]:
+    """
+    Get `items` with only the selected fields, linking to the next page.
+
+    :param request: The request with the params of the page
+    :param page: The page of `rows`
+    :param rows: Rows from the stats service, with `sort_key` and `id`
+    :param items: The response item for each row
+    """
+    if page.limit and len(rows) == page.limit:
+        order_by = f"-{page.order_by}" if page.descending else page.order_by
+        cursor = (
+            urlsafe_b64encode(
+                json.dumps([order_by, rows[-1].sort_key, rows[-1].id]).encode()
+            )
+            .decode()
+            .rstrip("=")
+        )
+        next_url = request.current_route_url(_query={**request.GET, "cursor": cursor})
+        request.response.headers["Link"] = f'<{next_url}>; rel="next"'
+
+    if selected_fields := request.parsed_params.get("selected_fields"):
+        return [{field: item[field] for field in selected_fields} for item in items]
+
+    return items
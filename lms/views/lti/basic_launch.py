@@ -20,7 +20,11 @@ from lms.events import LTIEvent
 from lms.models import Assignment
 from lms.product.plugin.misc import MiscPlugin
 from lms.security import Permissions
-from lms.services import LTIGradingService, VitalSourceService
+from lms.services import (
+    DashboardStatsService,
+    LTIGradingService,
+    VitalSourceService,
+)
 from lms.services.assignment import AssignmentService
 from lms.validation import BasicLTILaunchSchema, ConfigureAssignmentSchema
 
@@ -228,6 +232,9 @@ class BasicLaunchViews:
             "hypothesis", "instructor_dashboard"
         ):
             self.context.js_config.enable_instructor_dashboard_entry_point(assignment)
+            self.request.find_service(DashboardStatsService).prewarm_assignment_stats(
+                assignment
+            )
 
         # If there are any Hypothesis client feature flags that need to be
         # enabled based on the current application instance settings, those
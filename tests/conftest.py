@@ -3,6 +3,16 @@ from unittest import mock
 
 import pytest
 
+from lms.services import (
+    application_instance,
+    dashboard_stats,
+    jwt,
+    lti_h,
+    lti_role_service,
+    organization,
+    rsa_key,
+)
+
 TEST_SETTINGS = {
     "dev": False,
     "via_url": "http://TEST_VIA_SERVER.is/",
@@ -31,6 +41,11 @@ TEST_SETTINGS = {
     "blackboard_api_client_secret": "test_blackboard_api_client_secret",
     "vitalsource_api_key": "test_vs_api_key",
     "disable_key_rotation": False,
+    "async_h_sync": False,
+    "dashboard_stats_prewarm": False,
+    "http_pool_connections": None,
+    "http_pool_maxsize": None,
+    "http_max_retries": None,
     "admin_users": [],
     "email_preferences_secret": "test_email_preferences_secret",
 }
@@ -49,3 +64,29 @@ def autopatcher(request, target, **kwargs):
 @pytest.fixture
 def patch(request):
     return functools.partial(autopatcher, request)
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Empty the app's process-wide caches so they don't leak between tests."""
+    # pylint:disable=protected-access
+    caches = [
+        application_instance._CACHE,
+        dashboard_stats._STATS,
+        dashboard_stats._REFRESHING,
+        jwt._JWKS,
+        jwt._REFRESHING,
+        lti_h._SYNCED,
+        lti_role_service._ROLES,
+        lti_role_service._OVERRIDES,
+        organization._HIERARCHY,
+        rsa_key._KEYS,
+    ]
+
+    for cache in caches:
+        cache.clear()
+
+    yield
+
+    for cache in caches:
+        cache.clear()
@@ -214,6 +214,7 @@ def pyramid_config(pyramid_request, lti_v11_params):
         config.include("lms.models")
         config.include("lms.db")
         config.include("lms.routes")
+        config.include("lms.services.http")
 
         config.add_static_view(name="export", path="lms:static/export")
         config.add_static_view(name="static", path="lms:static")
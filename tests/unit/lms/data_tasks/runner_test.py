@@ -0,0 +1,413 @@
+import json
+import threading
+from contextlib import contextmanager
+from unittest.mock import MagicMock, create_autospec
+
+import pytest
+from data_tasks.python_script import PythonScript
+from data_tasks.sql_query import SQLQuery
+from data_tasks.sql_script import SQLScript
+from data_tasks.timer import Timer
+from h_matchers import Any
+from sqlalchemy import select, text
+from sqlalchemy.engine import Engine
+
+from lms.data_tasks.runner import Runner, Step, load_steps
+from lms.models import TaskDone
+
+
+class TestLoadSteps:
+    def test_it(self, tmp_path):
+        (tmp_path / "01_first.sql").write_text("SELECT 1;")
+        (tmp_path / "02_dir").mkdir()
+        (tmp_path / "02_dir" / "01_second.jinja2.sql").write_text("SELECT {{ one }};")
+        (tmp_path / "02_dir" / "02_third.py").write_text("def main(connection): ...")
+        (tmp_path / "README.md").write_text("Not a script")
+
+        steps = load_steps(tmp_path, template_vars={"one": 1})
+
+        assert [(step.name, step.dependencies) for step in steps] == [
+            ("01_first.sql", set()),
+            ("02_dir/01_second.jinja2.sql", {"01_first.sql"}),
+            ("02_dir/02_third.py", {"02_dir/01_second.jinja2.sql"}),
+        ]
+        assert steps[0].script == Any.instance_of(SQLScript)
+        assert steps[1].script.queries[0].text == "SELECT 1;"
+        assert steps[2].script == Any.instance_of(PythonScript)
+
+    def test_it_reads_declared_dependencies(self, tmp_path):
+        (tmp_path / "01_schema.sql").write_text("SELECT 1;")
+        (tmp_path / "02_entities").mkdir()
+        for name in ("01_users", "02_groups", "03_events"):
+            (tmp_path / "02_entities" / name).mkdir()
+            (tmp_path / "02_entities" / name / "01_create.sql").write_text("SELECT 1;")
+            (tmp_path / "02_entities" / name / "02_fill.sql").write_text("SELECT 1;")
+        (tmp_path / "02_entities" / "dependencies.json").write_text(
+            json.dumps({"01_users": [], "02_groups": [], "03_events": ["01_users"]})
+        )
+        (tmp_path / "03_grants.sql").write_text("SELECT 1;")
+
+        steps = load_steps(tmp_path, template_vars={})
+
+        assert {step.name: step.dependencies for step in steps} == {
+            "01_schema.sql": set(),
+            "02_entities/01_users/01_create.sql": {"01_schema.sql"},
+            "02_entities/01_users/02_fill.sql": {"02_entities/01_users/01_create.sql"},
+            "02_entities/02_groups/01_create.sql": {"01_schema.sql"},
+            "02_entities/02_groups/02_fill.sql": {
+                "02_entities/02_groups/01_create.sql"
+            },
+            "02_entities/03_events/01_create.sql": {"02_entities/01_users/02_fill.sql"},
+            "02_entities/03_events/02_fill.sql": {
+                "02_entities/03_events/01_create.sql"
+            },
+            "03_grants.sql": {
+                "02_entities/02_groups/02_fill.sql",
+                "02_entities/03_events/02_fill.sql",
+            },
+        }
+
+    def test_empty_directories_dont_hold_anything_up(self, tmp_path):
+        (tmp_path / "01_first.sql").write_text("SELECT 1;")
+        (tmp_path / "02_empty").mkdir()
+        (tmp_path / "03_last.sql").write_text("SELECT 1;")
+
+        steps = load_steps(tmp_path, template_vars={})
+
+        assert steps[1].dependencies == {"01_first.sql"}
+
+    def test_it_raises_if_the_task_dir_doesnt_exist(self, tmp_path):
+        with pytest.raises(NotADirectoryError):
+            load_steps(tmp_path / "missing", template_vars={})
+
+    @pytest.mark.parametrize(
+        "dependencies",
+        (
+            {"01_first.sql": []},
+            {"01_first.sql": [], "02_second.sql": [], "03_missing.sql": []},
+            {"01_first.sql": ["02_second.sql"], "02_second.sql": []},
+            {"01_first.sql": ["01_first.sql"], "02_second.sql": []},
+        ),
+    )
+    def test_it_raises_if_the_dependencies_are_invalid(self, tmp_path, dependencies):
+        (tmp_path / "01_first.sql").write_text("SELECT 1;")
+        (tmp_path / "02_second.sql").write_text("SELECT 1;")
+        (tmp_path / "dependencies.json").write_text(json.dumps(dependencies))
+
+        with pytest.raises(ValueError):
+            load_steps(tmp_path, template_vars={})
+
+
+class TestRunner:
+    def test_it(self, runner, make_step, executed, capsys):
+        steps = [make_step("a"), make_step("b", ["a"]), make_step("c", ["b"])]
+
+        runner.run(steps)
+
+        assert executed == ["a", "b", "c"]
+        steps[0].script.dump.assert_called_once_with(indent="    ")
+        output = capsys.readouterr().out
+        assert "a dumped" in output
+        assert "Step timings:" in output
+
+    def test_it_runs_steps_after_their_dependencies(self, engine, make_step, executed):
+        steps = [
+            make_step("a"),
+            make_step("b"),
+            make_step("c", ["a", "b"]),
+            make_step("d", ["a"]),
+        ]
+
+        Runner(engine, "task", jobs=3, commit_steps=True).run(steps)
+
+        assert executed.index("c") > max(executed.index("a"), executed.index("b"))
+        assert executed.index("d") > executed.index("a")
+
+    @pytest.mark.usefixtures("event")
+    def test_it_runs_independent_steps_at_the_same_time(self, make_step, executed):
+        # Both steps have to be running at the same time to get past this.
+        barrier = threading.Barrier(2, timeout=5)
+        steps = [make_step(name, wait_for=barrier) for name in ("a", "b")]
+
+        Runner(MagicMock(spec=Engine), "task", jobs=2, commit_steps=True).run(steps)
+
+        assert sorted(executed) == ["a", "b"]
+
+    def test_it_stops_after_a_failure(self, runner, make_step, executed, capsys):
+        steps = [make_step("a"), make_step("b", ["a"], fail=True), make_step("c")]
+
+        with pytest.raises(RuntimeError):
+            runner.run(steps)
+
+        assert executed == ["a", "b"]
+        output = capsys.readouterr().out
+        assert "Failed: b" in output
+        assert "--resume" in output
+
+    def test_it_runs_the_task_in_one_transaction(
+        self, engine, make_sql_step, done_keys, db_session, capsys
+    ):
+        steps = [
+            make_sql_step("a", "CREATE TABLE one_transaction_test (id INT)"),
+            make_sql_step("b", "SELECT 1/0", dependencies=["a"]),
+        ]
+
+        with pytest.raises(Exception):
+            Runner(engine, "task").run(steps)
+
+        engine.begin.assert_called_once_with()
+        assert not db_session.scalar(text("SELECT to_regclass('one_transaction_test')"))
+        assert not done_keys()
+        assert "--resume" not in capsys.readouterr().out
+
+    def test_it_runs_steps_at_the_same_time_only_with_commit_steps(self, engine):
+        with pytest.raises(ValueError):
+            Runner(engine, "task", jobs=2)
+
+    def test_it_resumes_only_with_commit_steps(self, engine, make_step):
+        with pytest.raises(ValueError):
+            Runner(engine, "task").run([make_step("a")], resume=True)
+
+    def test_it_records_the_finished_steps(self, runner, make_step, done_keys):
+        with pytest.raises(RuntimeError):
+            runner.run([make_step("a"), make_step("b", ["a"], fail=True)])
+
+        assert done_keys() == ["data_task::task::a"]
+
+    def test_it_clears_the_records_when_the_task_finishes(
+        self, runner, make_step, done_keys
+    ):
+        runner.run([make_step("a"), make_step("b", ["a"])])
+
+        assert not done_keys()
+
+    def test_it_resumes_after_the_finished_steps(
+        self, runner, make_step, executed, done_keys
+    ):
+        with pytest.raises(RuntimeError):
+            runner.run([make_step("a"), make_step("b", ["a"], fail=True)])
+        executed.clear()
+
+        runner.run([make_step("a"), make_step("b", ["a"])], resume=True)
+
+        assert executed == ["b"]
+        assert not done_keys()
+
+    def test_without_resume_it_runs_the_finished_steps_again(
+        self, runner, make_step, executed
+    ):
+        with pytest.raises(RuntimeError):
+            runner.run([make_step("a"), make_step("b", ["a"], fail=True)])
+        executed.clear()
+
+        runner.run([make_step("a"), make_step("b", ["a"])])
+
+        assert executed == ["a", "b"]
+
+    def test_dry_run(self, engine, make_step, executed, done_keys, capsys):
+        steps = [make_step("a"), make_step("b", ["a"], fail=True)]
+
+        with pytest.raises(RuntimeError):
+            Runner(engine, "task", dry_run=True, commit_steps=True).run(steps)
+
+        assert executed == ["a", "b"]
+        steps[0].script.execute.assert_called_once_with(Any(), dry_run=True)
+        assert not done_keys()
+        assert "Dry run!" in capsys.readouterr().out
+
+    def test_it_can_skip_python_scripts(self, engine, make_step, executed, capsys):
+        steps = [make_step("a", python=True), make_step("b", ["a"])]
+
+        Runner(engine, "task", no_python=True).run(steps)
+
+        assert executed == ["b"]
+        assert "Skipping:" in capsys.readouterr().out
+
+    def test_it_writes_stats(self, engine, make_sql_step, stats_file, capsys):
+        step = make_sql_step(
+            "a",
+            "CREATE TEMPORARY TABLE stats_test (id INT)",
+            "INSERT INTO stats_test VALUES (1), (2)",
+            "SELECT * FROM stats_test",
+        )
+
+        Runner(engine, "task", stats_file=str(stats_file)).run([step])
+
+        assert read_stats(stats_file) == [
+            {
+                "task": "task",
+                "started_at": Any.string(),
+                "jobs": 1,
+                "resume": False,
+                "explain": False,
+                "failed": False,
+                "steps": [
+                    {
+                        "name": "a",
+                        "started_at": Any.string(),
+                        "duration": Any.instance_of(float),
+                        "queries": [
+                            {"index": 0, "duration": Any(), "rows": None},
+                            {"index": 1, "duration": Any(), "rows": 2},
+                            {"index": 2, "duration": Any(), "rows": 2},
+                        ],
+                    }
+                ],
+            }
+        ]
+        assert "4 rows  a" in capsys.readouterr().out
+
+    def test_it_appends_the_stats_of_each_run(self, engine, make_sql_step, stats_file):
+        runner = Runner(engine, "task", stats_file=str(stats_file))
+
+        runner.run([make_sql_step("a", "SELECT 1")])
+        runner.run([make_sql_step("a", "SELECT 1")])
+
+        assert len(read_stats(stats_file)) == 2
+
+    def test_it_writes_stats_when_a_step_fails(self, engine, make_sql_step, stats_file):
+        steps = [make_sql_step("a", "SELECT 1"), make_sql_step("b", "SELECT 1/0")]
+
+        with pytest.raises(Exception):
+            Runner(engine, "task", stats_file=str(stats_file)).run(steps)
+
+        stats = read_stats(stats_file)[0]
+        assert stats["failed"]
+        assert stats["steps"] == [
+            Any.dict.containing({"name": "a"}),
+            Any.dict.containing({"name": "b", "duration": None, "queries": []}),
+        ]
+
+    def test_explain(self, engine, make_sql_step, stats_file):
+        step = make_sql_step(
+            "a",
+            "CREATE TEMPORARY TABLE stats_test (id INT)",
+            "-- A comment\nINSERT INTO stats_test VALUES (1), (2)",
+            "CREATE TEMPORARY TABLE stats_copy AS SELECT * FROM stats_test",
+            "SELECT * FROM stats_copy WHERE id = 1",
+            "ANALYSE stats_copy",
+        )
+
+        Runner(engine, "task", stats_file=str(stats_file), explain=True).run([step])
+
+        queries = read_stats(stats_file)[0]["steps"][0]["queries"]
+        # The explained statements still run, each query sees the rows of the
+        # previous ones.
+        assert [query["rows"] for query in queries] == [None, 2, 2, 1, None]
+        assert ["plan" in query for query in queries] == [
+            False,
+            True,
+            True,
+            True,
+            False,
+        ]
+        assert queries[1]["buffers"] == Any.dict.containing(
+            {"Local Hit Blocks": Any.int()}
+        )
+
+    def test_stats_ignore_other_statements(self, engine, stats_file):
+        script = create_autospec(SQLScript, instance=True)
+        script.timing = Timer()
+
+        def execute(connection, dry_run=False):
+            with script.timing.time_it():
+                # Helper statements that aren't queries of the script
+                connection.execute(select(1))
+                connection.execute(text("SET LOCAL work_mem = '64MB'"))
+                connection.execute(text("SELECT 1"))
+                query.execute(connection, dry_run=dry_run)
+                yield query
+
+        query = SQLQuery(index=0, text="SELECT * FROM generate_series(1, 3)")
+        script.queries = [query]
+        script.execute.side_effect = execute
+
+        Runner(engine, "task", stats_file=str(stats_file), explain=True).run(
+            [Step("a", script, frozenset())]
+        )
+
+        assert read_stats(stats_file)[0]["steps"][0]["queries"] == [
+            Any.dict.containing({"index": 0, "rows": 3, "plan": Any.dict()})
+        ]
+
+    @pytest.fixture
+    def engine(self, db_session):
+        connection = db_session.connection()
+        lock = threading.Lock()
+
+        @contextmanager
+        def begin():
+            # All the steps share the test's connection, so only let one in at
+            # a time and roll its changes back to a savepoint if it fails.
+            with lock, connection.begin_nested():
+                yield connection
+
+        engine = create_autospec(Engine, instance=True, spec_set=True)
+        engine.begin.side_effect = begin
+        return engine
+
+    @pytest.fixture
+    def runner(self, engine):
+        return Runner(engine, "task", commit_steps=True)
+
+    @pytest.fixture
+    def executed(self):
+        return []
+
+    @pytest.fixture
+    def make_step(self, executed):
+        def make_step(name, dependencies=(), fail=False, python=False, wait_for=None):
+            script = create_autospec(
+                PythonScript if python else SQLScript, instance=True
+            )
+            script.timing = Timer()
+            script.queries = []
+            script.dump.return_value = f"{name} dumped"
+
+            def execute(_connection, dry_run=False):  # pylint:disable=unused-argument
+                with script.timing.time_it():
+                    executed.append(name)
+                    if wait_for:
+                        wait_for.wait()
+                    if fail:
+                        raise RuntimeError(f"{name} failed")
+                yield script
+
+            script.execute.side_effect = execute
+            return Step(name, script, frozenset(dependencies))
+
+        return make_step
+
+    @pytest.fixture
+    def make_sql_step(self):
+        def make_sql_step(name, *queries, dependencies=()):
+            script = SQLScript(
+                path=name,
+                template_vars={},
+                queries=[
+                    SQLQuery(index=index, text=text)
+                    for index, text in enumerate(queries)
+                ],
+            )
+            return Step(name, script, frozenset(dependencies))
+
+        return make_sql_step
+
+    @pytest.fixture
+    def stats_file(self, tmp_path):
+        return tmp_path / "stats.jsonl"
+
+    @pytest.fixture
+    def event(self, patch):
+        return patch("lms.data_tasks.runner.event")
+
+    @pytest.fixture
+    def done_keys(self, db_session):
+        def done_keys():
+            return db_session.scalars(select(TaskDone.key)).all()
+
+        return done_keys
+
+
+def read_stats(stats_file):
+    return [json.loads(line) for line in stats_file.read_text().splitlines()]
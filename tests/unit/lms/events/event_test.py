@@ -20,6 +20,7 @@ class TestBaseEvent:
             assignment_id=sentinel.assignment_id,
             grouping_id=sentinel.grouping_id,
             data=sentinel.data,
+            timestamp=sentinel.timestamp,
         ).serialize() == {
             "type": sentinel.type,
             "user_id": sentinel.user_id,
@@ -29,6 +30,7 @@ class TestBaseEvent:
             "assignment_id": sentinel.assignment_id,
             "grouping_id": sentinel.grouping_id,
             "data": sentinel.data,
+            "timestamp": sentinel.timestamp,
         }
 
 
@@ -1,12 +1,60 @@
 from unittest.mock import sentinel
 
+import pytest
+from transaction import TransactionManager
+
 from lms.events.event import BaseEvent
 from lms.events.subscribers import handle_event
 
 
-def test_handle_event(event_service, pyramid_request):
+def test_handle_event_queues_the_event_after_commit(
+    event_service, queue_event, pyramid_request
+):
     event = BaseEvent(request=pyramid_request, type=sentinel.type)
 
+    with pyramid_request.tm:
+        handle_event(event)
+        queue_event.assert_not_called()
+
+    queue_event.assert_called_once_with(event)
+    event_service.insert_event.assert_not_called()
+
+
+def test_handle_event_doesnt_queue_the_event_if_the_commit_fails(
+    queue_event, pyramid_request
+):
+    event = BaseEvent(request=pyramid_request, type=sentinel.type)
+    transaction = pyramid_request.tm.begin()
     handle_event(event)
 
-    event_service.insert_event.assert_called_once_with(event)
+    hook, _args, _kwargs = next(transaction.getAfterCommitHooks())
+    hook(False)
+
+    queue_event.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "type_",
+    [BaseEvent.Type.AUDIT_TRAIL, BaseEvent.Type.GRADE, BaseEvent.Type.SUBMISSION],
+)
+def test_handle_event_inserts_reliable_events_in_the_request_transaction(
+    event_service, queue_event, pyramid_request, type_
+):
+    event = BaseEvent(request=pyramid_request, type=type_)
+
+    with pyramid_request.tm:
+        handle_event(event)
+        event_service.insert_event.assert_called_once_with(event)
+
+    queue_event.assert_not_called()
+
+
+@pytest.fixture
+def pyramid_request(pyramid_request):
+    pyramid_request.tm = TransactionManager(explicit=True)
+    return pyramid_request
+
+
+@pytest.fixture
+def queue_event(patch):
+    return patch("lms.events.subscribers.EventService.queue_event")
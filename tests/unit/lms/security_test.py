@@ -348,6 +348,19 @@ class TestLTIUserSecurityPolicy:
 
         assert is_allowed == DeniedWithException(validation_error)
 
+    @pytest.mark.parametrize("error", [None, ValidationError(sentinel.message)])
+    def test_it_only_gets_the_lti_user_once_per_request(
+        self, pyramid_request, user_is_learner, policy, get_lti_user, error
+    ):
+        get_lti_user.return_value = user_is_learner
+        get_lti_user.side_effect = error
+
+        policy.permits(pyramid_request, None, Permissions.API)
+        policy.identity(pyramid_request)
+        policy.authenticated_userid(pyramid_request)
+
+        get_lti_user.assert_called_once_with(pyramid_request)
+
     @pytest.mark.parametrize(
         "user_id,application_instance_id,expected_userid",
         [
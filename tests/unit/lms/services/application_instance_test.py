@@ -5,9 +5,11 @@ import pytest
 from factory import Faker, Sequence
 from freezegun import freeze_time
 from h_matchers import Any
+from sqlalchemy import event
 
 from lms.models import LTIParams, ReusedConsumerKey
 from lms.services import ApplicationInstanceNotFound
+from lms.services import application_instance as application_instance_module
 from lms.services.application_instance import (
     AccountDisabled,
     ApplicationInstanceService,
@@ -379,6 +381,161 @@ class TestApplicationInstanceService:
         factories.ApplicationInstance.create_batch(size=3)
 
 
+class TestApplicationInstanceCache:
+    @pytest.mark.parametrize("lookup", ["id", "consumer_key", "deployment_id"])
+    def test_it_caches_lookups(
+        self, service, db_session, lti_v13_application_instance, queries, lookup
+    ):
+        application_instance = lti_v13_application_instance
+        application_instance.consumer_key = "CONSUMER_KEY"
+        application_instance.organization = factories.Organization()
+        db_session.flush()
+        get = {
+            "id": lambda: service.get_by_id(application_instance.id),
+            "consumer_key": lambda: service.get_by_consumer_key("CONSUMER_KEY"),
+            "deployment_id": lambda: service.get_by_deployment_id(
+                application_instance.lti_registration.issuer,
+                application_instance.lti_registration.client_id,
+                application_instance.deployment_id,
+            ),
+        }[lookup]
+        get()
+        expected = (
+            application_instance.id,
+            application_instance.settings,
+            application_instance.organization.public_id,
+            application_instance.lti_registration.issuer,
+        )
+        db_session.expunge_all()
+        queries.clear()
+
+        cached = get()
+
+        assert (
+            cached.id,
+            cached.settings,
+            cached.organization.public_id,
+            cached.lti_registration.issuer,
+        ) == expected
+        assert cached in db_session
+        assert not queries
+
+    def test_it_returns_the_instance_already_in_the_session(
+        self, service, application_instance
+    ):
+        service.get_by_id(application_instance.id)
+        application_instance.name = "NEW NAME"
+
+        assert service.get_by_id(application_instance.id) is application_instance
+        assert application_instance.name == "NEW NAME"
+
+    def test_changes_to_cached_instances_are_saved(
+        self, service, db_session, application_instance
+    ):
+        service.get_by_id(application_instance.id)
+        db_session.expunge_all()
+        cached = service.get_by_id(application_instance.id)
+
+        cached.settings.set("hypothesis", "new_setting", True)
+        db_session.flush()
+        db_session.expire_all()
+
+        assert cached.settings.get("hypothesis", "new_setting")
+
+    @pytest.mark.parametrize(
+        "change",
+        [
+            lambda ai: ai.settings.set("hypothesis", "new_setting", True),
+            lambda ai: setattr(ai.organization, "enabled", False),
+            lambda ai: setattr(ai.lti_registration, "issuer", "NEW ISSUER"),
+        ],
+    )
+    def test_changes_invalidate_the_cache(
+        self, service, db_session, lti_v13_application_instance, queries, change
+    ):
+        lti_v13_application_instance.organization = factories.Organization()
+        db_session.flush()
+        service.get_by_id(lti_v13_application_instance.id)
+
+        change(lti_v13_application_instance)
+        db_session.flush()
+        db_session.expunge_all()
+        queries.clear()
+        service.get_by_id(lti_v13_application_instance.id)
+
+        assert queries
+
+    def test_launches_dont_invalidate_the_cache(
+        self, service, db_session, application_instance, queries
+    ):
+        service.get_by_id(application_instance.id)
+
+        application_instance.last_launched = datetime.now()
+        db_session.flush()
+        db_session.expunge_all()
+        queries.clear()
+        service.get_by_id(application_instance.id)
+
+        assert not queries
+
+    def test_it_doesnt_cache_unflushed_changes(
+        self, service, db_session, application_instance, cache
+    ):
+        application_instance.name = "UNFLUSHED NAME"
+
+        with db_session.no_autoflush:
+            service.get_by_id(application_instance.id)
+
+        assert not cache
+
+    @pytest.mark.parametrize("end_transaction", ["commit", "rollback"])
+    def test_it_clears_the_cache_again_at_the_end_of_the_transaction(
+        self, service, db_session, application_instance, cache, end_transaction
+    ):
+        application_instance.name = "NEW NAME"
+        db_session.flush()
+        # Cache the changed but uncommitted values.
+        service.get_by_id(application_instance.id)
+        assert cache
+
+        getattr(db_session, end_transaction)()
+
+        assert not cache
+
+    def test_transactions_without_changes_dont_clear_the_cache(
+        self, service, db_session, application_instance, cache
+    ):
+        service.get_by_id(application_instance.id)
+
+        db_session.commit()
+
+        assert cache
+
+    @pytest.fixture
+    def cache(self):
+        return application_instance_module._CACHE  # pylint:disable=protected-access
+
+    @pytest.fixture
+    def queries(self, db_session):
+        queries = []
+
+        def before_cursor_execute(_conn, _cursor, statement, *_args):
+            queries.append(statement)
+
+        connection = db_session.connection()
+        event.listen(connection, "before_cursor_execute", before_cursor_execute)
+        yield queries
+        event.remove(connection, "before_cursor_execute", before_cursor_execute)
+
+    @pytest.fixture
+    def service(self, db_session, aes_service, organization_service):
+        return ApplicationInstanceService(
+            db=db_session,
+            aes_service=aes_service,
+            organization_service=organization_service,
+        )
+
+
 class TestFactory:
     def test_it(
         self,
@@ -1,10 +1,21 @@
-from unittest.mock import sentinel
+import asyncio
+import os
+from concurrent.futures import Future
+from unittest.mock import create_autospec, patch, sentinel
 
+import httpretty
 import pytest
-from aiohttp import TooManyRedirects
+from aiohttp import ClientTimeout, TCPConnector, TooManyRedirects, web
+from aiohttp.test_utils import TestServer
 from aioresponses import aioresponses
 
-from lms.services.async_oauth_http import AsyncOAuthHTTPService, factory
+from lms.services.async_oauth_http import (
+    CONNECTION_LIMIT,
+    CONNECTION_LIMIT_PER_HOST,
+    AsyncOAuthHTTPService,
+    _get_event_loop,
+    factory,
+)
 from lms.services.exceptions import ExternalAsyncRequestError
 
 
@@ -26,7 +37,7 @@ class TestAsyncOAuthHTTPService:
         for request in with_successful_responses.requests.values():
             request_kwargs = request[0].kwargs
 
-            assert request_kwargs["timeout"] == 10
+            assert request_kwargs["timeout"] == ClientTimeout(total=None)
             assert (
                 request_kwargs["headers"]["Authorization"]
                 == f"Bearer {oauth2_token_service.get().access_token}"
@@ -37,6 +48,111 @@ class TestAsyncOAuthHTTPService:
         with pytest.raises(ExternalAsyncRequestError):
             svc.request("GET", urls)
 
+    def test_request_with_timeout(self, svc, urls):
+        with aioresponses() as m:
+            for url in urls:
+                m.get(url, exception=asyncio.TimeoutError())
+
+            with pytest.raises(ExternalAsyncRequestError):
+                svc.request("GET", urls)
+
+    @pytest.mark.usefixtures("with_successful_responses")
+    def test_submit(self, svc, urls):
+        response = svc.submit("GET", urls[0]).result()
+
+        assert response.headers["url"] == urls[0]
+        assert response.json() == ["ASYNC RESPONSE"]
+
+    @pytest.mark.usefixtures("with_one_failed_response")
+    def test_submit_with_failure(self, svc, urls):
+        future = svc.submit("GET", urls[-1])
+
+        with pytest.raises(ExternalAsyncRequestError):
+            future.result()
+
+    def test_requests_share_the_event_loop_and_session(self, svc, urls):
+        with aioresponses() as m:
+            for url in urls:
+                m.get(url, repeat=True)
+
+            svc.request("GET", urls)
+            event_loop = _get_event_loop(os.getpid())
+
+            svc.request("GET", urls)
+
+        assert _get_event_loop(os.getpid()) is event_loop
+        assert not event_loop.session.closed
+
+    def test_requests_waiting_for_a_connection_dont_time_out(self, svc, server):
+        # More requests than connections to the host, so the last ones wait
+        # for longer than the timeout before they start.
+        responses = svc.request(
+            "GET",
+            [str(server.make_url("/slow"))] * CONNECTION_LIMIT_PER_HOST * 3,
+            timeout=0.5,
+        )
+
+        assert all(response.status == 200 for response in responses)
+
+    def test_requests_time_out_even_if_data_keeps_coming(self, svc, server):
+        with pytest.raises(ExternalAsyncRequestError):
+            svc.request("GET", [str(server.make_url("/trickle"))], timeout=0.5)
+
+    def test_submitted_requests_time_out_even_if_data_keeps_coming(self, svc, server):
+        future = svc.submit("GET", str(server.make_url("/trickle")), timeout=0.5)
+
+        with pytest.raises(ExternalAsyncRequestError):
+            future.result()
+
+    def test_request_stops_waiting_after_the_timeout_of_every_url(self, svc, urls):
+        with aioresponses() as m:
+            for url in urls:
+                m.get(url)
+            event_loop = _get_event_loop(os.getpid())
+            future = create_autospec(Future, instance=True, spec_set=True)
+            future.result.side_effect = TimeoutError
+
+            with patch.object(event_loop, "submit", return_value=future) as submit:
+                with pytest.raises(ExternalAsyncRequestError):
+                    svc.request("GET", urls, timeout=3)
+
+        # Close the coroutine that was never run
+        submit.call_args.args[0].close()
+        future.result.assert_called_once_with(6)
+        future.cancel.assert_called_once_with()
+
+    def test_session_limits_connections(self):
+        connector = _get_event_loop(os.getpid()).session.connector
+
+        assert isinstance(connector, TCPConnector)
+        assert connector.limit == CONNECTION_LIMIT
+        assert connector.limit_per_host == CONNECTION_LIMIT_PER_HOST
+
+    @pytest.fixture
+    def server(self):
+        async def slow(_request):
+            await asyncio.sleep(0.2)
+            return web.Response(text="[]")
+
+        async def trickle(request):
+            response = web.StreamResponse()
+            await response.prepare(request)
+            # Never stop sending data, but never too slowly either.
+            while True:
+                await response.write(b" ")
+                await asyncio.sleep(0.1)
+
+        # Use a real server to go through the connection pool
+        httpretty.disable()
+        app = web.Application()
+        app.router.add_get("/slow", slow)
+        app.router.add_get("/trickle", trickle)
+        event_loop = _get_event_loop(os.getpid())
+        server = TestServer(app)
+        event_loop.run(server.start_server())
+        yield server
+        event_loop.run(server.close())
+
     @pytest.fixture
     def with_successful_responses(self, urls):
         with aioresponses() as m:
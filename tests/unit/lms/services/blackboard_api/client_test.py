@@ -1,3 +1,4 @@
+from concurrent.futures import Future
 from unittest.mock import MagicMock, Mock, call, create_autospec, sentinel
 
 import pytest
@@ -5,6 +6,7 @@ from h_matchers import Any
 
 from lms.services.blackboard_api._basic import BasicClient
 from lms.services.blackboard_api.client import (
+    CRAWL_CONCURRENCY,
     PAGINATION_MAX_REQUESTS,
     BlackboardAPIClient,
 )
@@ -193,8 +195,6 @@ class TestListAllFiles:
         root_level_files,
         nested_files,
     ):
-        # pylint: disable=protected-access
-
         basic_client.request.side_effect = [
             # Root level first page
             factories.requests.Response(
@@ -205,58 +205,147 @@ class TestListAllFiles:
             ),
             # Root level second page is empty
             factories.requests.Response(json_data={"results": []}),
-            # Subfolder second page is empty
-            factories.requests.Response(json_data={"results": []}),
-        ]
-        async_oauth_http_service.request.side_effect = [
-            [
-                # First subfolder `FIRST PAGE FOLDER ID`
-                factories.requests.Response(
-                    json_data={
-                        "results": nested_files,
-                        "paging": {"nextPage": "SUBFOLDER_PAGE_2_PATH"},
-                    }
-                ),
-            ],
-            # Next level is empty
-            [],
         ]
+        responses = {
+            # First subfolder `FIRST PAGE FOLDER ID`
+            folder_url("FIRST PAGE FOLDER ID"): {
+                "results": nested_files,
+                "paging": {"nextPage": "SUBFOLDER_PAGE_2_PATH"},
+            },
+            # Subfolder second page is empty
+            "https://example.com/SUBFOLDER_PAGE_2_PATH": {"results": []},
+            # Nested folder `FIRST SUBFOLDER FOLDER ID` is empty
+            folder_url("FIRST SUBFOLDER FOLDER ID"): {"results": []},
+        }
+        async_oauth_http_service.submit.side_effect = lambda _method, url: done(
+            factories.requests.Response(json_data=responses[url])
+        )
 
         files = svc.list_all_files("COURSE_ID")
 
         # Get we each page of the root level "folder"
-        basic_client.request.assert_has_calls(
-            [
-                call(
-                    # First call, gete root level elements
-                    "GET",
-                    Any.url.with_path("courses/uuid:COURSE_ID/resources").with_query(
-                        {
-                            "limit": "200",
-                            "fields": "id,name,type,modified,mimeType,size,parentId",
-                        }
-                    ),
+        assert basic_client.request.call_args_list == [
+            call(
+                # First call, gete root level elements
+                "GET",
+                Any.url.with_path("courses/uuid:COURSE_ID/resources").with_query(
+                    {
+                        "limit": "200",
+                        "fields": "id,name,type,modified,mimeType,size,parentId",
+                    }
                 ),
-                # Get second page of the top level listing
-                call("GET", "PAGE_2_PATH"),
-            ]
+            ),
+            # Get second page of the top level listing
+            call("GET", "PAGE_2_PATH"),
+        ]
+        # Then each folder and their following pages
+        assert async_oauth_http_service.submit.call_args_list == [
+            call("GET", url) for url in responses
+        ]
+        assert files == root_level_files + nested_files
+        # Files are stored in the DB as we find them
+        assert file_service.upsert.call_count == 4
+
+    def test_it_keeps_requests_in_flight(
+        self, svc, basic_client, async_oauth_http_service, root_level_files
+    ):
+        folders = [
+            dict(root_level_files[1], id=f"FOLDER_{i}")
+            for i in range(CRAWL_CONCURRENCY + 2)
+        ]
+        basic_client.request.return_value = factories.requests.Response(
+            json_data={"results": folders}
         )
-        basic_client._api_url.assert_any_call(
-            "courses/uuid:COURSE_ID/resources/FIRST PAGE FOLDER ID/children?limit=200&fields=id%2Cname%2Ctype%2Cmodified%2CmimeType%2Csize%2CparentId"
+        empty_folder = factories.requests.Response(json_data={"results": []})
+        slow_request = Future()
+
+        def submit(_method, url):
+            if url == folder_url("FOLDER_0"):
+                return slow_request
+
+            if url == folder_url(f"FOLDER_{CRAWL_CONCURRENCY + 1}"):
+                # The last request started while the first one was running
+                slow_request.set_result(empty_folder)
+
+            return done(empty_folder)
+
+        async_oauth_http_service.submit.side_effect = submit
+
+        svc.list_all_files("COURSE_ID")
+
+        assert async_oauth_http_service.submit.call_args_list == [
+            call("GET", folder_url(folder["id"])) for folder in folders
+        ]
+
+    def test_it_cancels_the_requests_in_flight_if_one_fails(
+        self, svc, basic_client, async_oauth_http_service, root_level_files
+    ):
+        folders = [dict(root_level_files[1], id=f"FOLDER_{i}") for i in range(2)]
+        basic_client.request.return_value = factories.requests.Response(
+            json_data={"results": folders}
         )
+        failed_request, running_request = Future(), Future()
+        failed_request.set_exception(ExternalAsyncRequestError())
+        async_oauth_http_service.submit.side_effect = [failed_request, running_request]
+
+        with pytest.raises(ExternalAsyncRequestError):
+            svc.list_all_files("COURSE_ID")
+
+        assert running_request.cancelled()
 
-        async_oauth_http_service.request.assert_called_with(
-            "GET", [basic_client._api_url.return_value]
+    def test_it_limits_the_depth(
+        self, svc, basic_client, async_oauth_http_service, root_level_files
+    ):
+        basic_client.request.return_value = factories.requests.Response(
+            json_data={"results": root_level_files}
         )
-        # Get the pages of the subfolder
-        basic_client.request.assert_called_with("GET", "SUBFOLDER_PAGE_2_PATH")
-        basic_client._api_url.assert_called_with(
-            "courses/uuid:COURSE_ID/resources/FIRST SUBFOLDER FOLDER ID/children?limit=200&fields=id%2Cname%2Ctype%2Cmodified%2CmimeType%2Csize%2CparentId"
+        async_oauth_http_service.submit.side_effect = lambda *_args: done(
+            factories.requests.Response(json_data={"results": root_level_files})
         )
 
-        assert files == root_level_files + nested_files
-        # Files are stored in the DB
-        file_service.upsert.assert_called_once()
+        files = svc.list_all_files("COURSE_ID", max_depth=3)
+
+        assert async_oauth_http_service.submit.call_count == 3
+        assert files == root_level_files * 4
+
+    def test_it_limits_the_number_of_items(
+        self, svc, basic_client, async_oauth_http_service, root_level_files, caplog
+    ):
+        basic_client.request.return_value = factories.requests.Response(
+            json_data={"results": root_level_files}
+        )
+        async_oauth_http_service.submit.side_effect = lambda *_args: done(
+            factories.requests.Response(json_data={"results": root_level_files})
+        )
+
+        files = svc.list_all_files("COURSE_ID", max_items=5)
+
+        assert async_oauth_http_service.submit.call_count == 2
+        assert files == root_level_files * 2 + root_level_files[:1]
+        assert "stopped after 3 items" in caplog.text
+
+    def test_it_limits_the_number_of_pages_per_folder(
+        self, svc, basic_client, async_oauth_http_service, nested_files
+    ):
+        folder = nested_files[1]
+        basic_client.request.return_value = factories.requests.Response(
+            json_data={"results": [folder]}
+        )
+        async_oauth_http_service.submit.side_effect = lambda *_args: done(
+            factories.requests.Response(
+                json_data={"results": [], "paging": {"nextPage": "NEXT_PAGE"}}
+            )
+        )
+
+        svc.list_all_files("COURSE_ID")
+
+        assert async_oauth_http_service.submit.call_count == PAGINATION_MAX_REQUESTS
+
+    @pytest.fixture(autouse=True)
+    def basic_client(self, basic_client):
+        # pylint: disable=protected-access
+        basic_client._api_url.side_effect = lambda path: f"https://example.com/{path}"
+        return basic_client
 
     @pytest.fixture
     def root_level_files(self):
@@ -529,3 +618,16 @@ def blackboard_list_groups(BlackboardListGroups):
 @pytest.fixture(autouse=True)
 def BlackboardListGroups(patch):
     return patch("lms.services.blackboard_api.client.BlackboardListGroups")
+
+
+def folder_url(folder_id):
+    return (
+        f"https://example.com/courses/uuid:COURSE_ID/resources/{folder_id}/children"
+        "?limit=200&fields=id%2Cname%2Ctype%2Cmodified%2CmimeType%2Csize%2CparentId"
+    )
+
+
+def done(response):
+    future = Future()
+    future.set_result(response)
+    return future
@@ -1,4 +1,5 @@
-from unittest.mock import call, create_autospec, sentinel
+from unittest.mock import Mock, call, create_autospec, sentinel
+from urllib.parse import parse_qs, urlparse
 
 import pytest
 import requests
@@ -172,6 +173,70 @@ class TestBasicClient:
 
         assert result == ["item_0", "item_1"]
 
+    def test_send_follows_pagination_links_without_last_link(
+        self, basic_client, PaginatedSchema, http_session
+    ):
+        http_session.send.side_effect = [
+            factories.requests.Response(
+                status_code=200,
+                headers={"Link": '<http://example.com/next/0>; rel="next"'},
+            ),
+            factories.requests.Response(status_code=200),
+        ]
+
+        result = basic_client.send(
+            "METHOD", "path/", schema=PaginatedSchema, timeout=sentinel.timeout
+        )
+
+        assert result == ["item_0", "item_1"]
+
+    @pytest.mark.usefixtures("with_numbered_pages")
+    def test_send_fetches_numbered_pages_concurrently(
+        self, basic_client, NumberedPagesSchema, http_session, Session
+    ):
+        result = basic_client.send(
+            "METHOD", "path/", schema=NumberedPagesSchema, timeout=sentinel.timeout
+        )
+
+        assert result == ["item_1", "item_2", "item_3", "item_4"]
+        http_session.send.assert_called_once_with(
+            Any.request(url=Any.url.with_host("canvas_host")),
+            timeout=sentinel.timeout,
+        )
+        # Each worker thread has its own session...
+        assert 1 <= Session.call_count <= basic_client.PAGINATION_CONCURRENCY
+        worker_session = Session.return_value
+        assert worker_session.send.call_args_list == Any.list.containing(
+            [
+                call(
+                    Any.request(url=f"https://example.com/items?per_page=10&page={i}"),
+                    timeout=sentinel.timeout,
+                )
+                for i in range(2, 5)
+            ]
+        )
+        # ...which shares the connection pools of the client's session.
+        assert (
+            worker_session.mount.call_args_list
+            == [
+                call("https://", http_session.get_adapter.return_value),
+                call("http://", http_session.get_adapter.return_value),
+            ]
+            * Session.call_count
+        )
+
+    @pytest.mark.usefixtures("with_numbered_pages")
+    def test_send_only_fetches_numbered_pages_up_to_the_max_value(
+        self, basic_client, NumberedPagesSchema
+    ):
+        basic_client.PAGINATION_MAXIMUM_REQUESTS = 2
+
+        result = basic_client.send(
+            "METHOD", "path/", schema=NumberedPagesSchema, timeout=sentinel.timeout
+        )
+
+        assert result == ["item_1", "item_2"]
+
     @pytest.mark.usefixtures("with_paginated_results")
     def test_send_raises_CanvasAPIError_for_pagination_with_non_many_schema(
         self, basic_client, Schema, http_session, paginated_responses
@@ -212,6 +277,39 @@ class TestBasicClient:
 
         return Schema
 
+    @pytest.fixture
+    def NumberedPagesSchema(self, Schema):
+        Schema.many = True
+        Schema.side_effect = lambda response: Mock(parse=response.json)
+
+        return Schema
+
+    @pytest.fixture
+    def with_numbered_pages(self, http_session, Session):
+        page_url = "https://example.com/items?per_page=10&page={}"
+
+        def send(request, **_kwargs):
+            page = parse_qs(urlparse(request.url).query).get("page", ["1"])[0]
+            headers = {}
+            if page == "1":
+                headers["Link"] = ", ".join(
+                    [
+                        f'<{page_url.format(2)}>; rel="next"',
+                        f'<{page_url.format(4)}>; rel="last"',
+                    ]
+                )
+
+            return factories.requests.Response(
+                status_code=200, headers=headers, json_data=[f"item_{page}"]
+            )
+
+        http_session.send.side_effect = send
+        Session.return_value.send.side_effect = send
+
+    @pytest.fixture
+    def Session(self, patch):
+        return patch("lms.services.canvas_api._basic.Session")
+
     @pytest.fixture
     def paginated_responses(self):
         next_url = "http://example.com/next/"
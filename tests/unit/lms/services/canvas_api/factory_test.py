@@ -5,7 +5,10 @@ import pytest
 from lms.services.canvas_api.factory import canvas_api_client_factory
 
 pytestmark = pytest.mark.usefixtures(
-    "application_instance_service", "oauth2_token_service", "file_service"
+    "application_instance_service",
+    "oauth2_token_service",
+    "file_service",
+    "http_service",
 )
 
 
@@ -22,12 +25,15 @@ class TestCanvasAPIClientFactory:
         file_service,
         folders_enabled,
         application_instance,
+        http_service,
     ):
         application_instance.settings.set("canvas", "folders_enabled", folders_enabled)
 
         canvas_api = canvas_api_client_factory(sentinel.context, pyramid_request)
 
-        BasicClient.assert_called_once_with(application_instance.lms_host())
+        BasicClient.assert_called_once_with(
+            application_instance.lms_host(), session=http_service.session
+        )
         CanvasPagesClient.assert_called_once_with(
             AuthenticatedClient.return_value, file_service
         )
@@ -0,0 +1,512 @@
+import os
+from unittest.mock import create_autospec, sentinel
+
+import pytest
+from freezegun import freeze_time
+from h_matchers import Any
+
+from lms.models import RoleScope, RoleType
+from lms.services import HAPI
+from lms.services.dashboard_stats import (
+    DashboardStatsService,
+    Page,
+    _get_executor,
+    _make_background_h_api,
+    factory,
+)
+from tests import factories
+
+
+class TestDashboardStatsService:
+    def test_get_assignment_stats(self, svc, h_api, assignment, groups):
+        stats = svc.get_assignment_stats(assignment)
+
+        h_api.get_assignment_stats.assert_called_once_with(
+            groups, assignment.resource_link_id
+        )
+        assert stats == h_api.get_assignment_stats.return_value
+
+    def test_get_course_stats(self, svc, h_api):
+        course = factories.Course()
+        section = factories.CanvasSection(parent=course)
+
+        stats = svc.get_course_stats(course)
+
+        h_api.get_course_stats.assert_called_once_with(
+            [course.authority_provided_id, section.authority_provided_id]
+        )
+        assert stats == h_api.get_course_stats.return_value
+
+    def test_it_caches_the_stats(self, svc, h_api, assignment):
+        stats = svc.get_assignment_stats(assignment)
+        h_api.get_assignment_stats.reset_mock()
+
+        assert svc.get_assignment_stats(assignment) == stats
+        h_api.get_assignment_stats.assert_not_called()
+
+    def test_it_caches_the_stats_of_each_request_separately(
+        self, svc, h_api, assignment
+    ):
+        svc.get_assignment_stats(assignment)
+        other_assignment = factories.Assignment()
+        factories.AssignmentGrouping(
+            assignment=other_assignment, grouping=assignment.groupings[0]
+        )
+        h_api.get_assignment_stats.reset_mock()
+
+        svc.get_assignment_stats(other_assignment)
+
+        h_api.get_assignment_stats.assert_called_once()
+
+    def test_it_refreshes_stale_stats_in_the_background(
+        self, svc, h_api, background_h_api, assignment, executor, groups
+    ):
+        with freeze_time("2024-01-01 00:00:00"):
+            stale_stats = svc.get_assignment_stats(assignment)
+        h_api.get_assignment_stats.reset_mock()
+        background_h_api.get_assignment_stats.return_value = sentinel.new_stats
+
+        with freeze_time("2024-01-01 00:01:00"):
+            # The stale stats are returned while they are refreshed
+            assert svc.get_assignment_stats(assignment) == stale_stats
+            executor.submit.assert_called_once()
+            executor.run_submitted()
+
+            assert svc.get_assignment_stats(assignment) == sentinel.new_stats
+            executor.submit.assert_called_once()
+        # The refresh doesn't use the request's h API client
+        h_api.get_assignment_stats.assert_not_called()
+        background_h_api.get_assignment_stats.assert_called_once_with(
+            groups, assignment.resource_link_id
+        )
+
+    def test_it_refreshes_stale_stats_only_once_at_a_time(
+        self, svc, assignment, executor
+    ):
+        with freeze_time("2024-01-01 00:00:00"):
+            svc.get_assignment_stats(assignment)
+
+        with freeze_time("2024-01-01 00:01:00"):
+            svc.get_assignment_stats(assignment)
+            svc.get_assignment_stats(assignment)
+
+        executor.submit.assert_called_once()
+
+    def test_it_keeps_the_stale_stats_if_refreshing_fails(
+        self, svc, background_h_api, assignment, executor
+    ):
+        with freeze_time("2024-01-01 00:00:00"):
+            stale_stats = svc.get_assignment_stats(assignment)
+        background_h_api.get_assignment_stats.side_effect = ValueError
+
+        with freeze_time("2024-01-01 00:01:00"):
+            svc.get_assignment_stats(assignment)
+            executor.run_submitted()
+
+            assert svc.get_assignment_stats(assignment) == stale_stats
+            # It tries again on the next request
+            assert executor.submit.call_count == 2
+
+    @pytest.mark.parametrize("prewarm", [True, False])
+    def test_prewarm_assignment_stats(
+        self, svc, h_api, background_h_api, assignment, executor, prewarm, groups
+    ):
+        svc._prewarm = prewarm  # pylint:disable=protected-access
+
+        svc.prewarm_assignment_stats(assignment)
+        executor.run_submitted()
+
+        if prewarm:
+            background_h_api.get_assignment_stats.assert_called_once_with(
+                groups, assignment.resource_link_id
+            )
+            # The prewarmed stats are cached
+            svc.get_assignment_stats(assignment)
+            h_api.get_assignment_stats.assert_not_called()
+        else:
+            executor.submit.assert_not_called()
+
+    def test_prewarm_assignment_stats_with_fresh_stats(self, svc, assignment, executor):
+        svc._prewarm = True  # pylint:disable=protected-access
+        svc.get_assignment_stats(assignment)
+
+        svc.prewarm_assignment_stats(assignment)
+
+        executor.submit.assert_not_called()
+
+    def test_get_student_stats(self, svc, h_api, assignment, db_session):
+        learner = factories.LTIRole(type=RoleType.LEARNER, scope=RoleScope.COURSE)
+        student = factories.User(display_name="LMS NAME")
+        student_no_annos = factories.User(display_name="Homer")
+        student_no_annos_no_name = factories.User(display_name=None)
+        for user in [student, student_no_annos, student_no_annos_no_name]:
+            factories.AssignmentMembership(
+                assignment=assignment, user=user, lti_role=learner
+            )
+        # With another learner role
+        factories.AssignmentMembership(
+            assignment=assignment,
+            user=student,
+            lti_role=factories.LTIRole(type=RoleType.LEARNER, scope=RoleScope.COURSE),
+        )
+        # Not a student
+        factories.AssignmentMembership(
+            assignment=assignment,
+            user=factories.User(),
+            lti_role=factories.LTIRole(
+                type=RoleType.INSTRUCTOR, scope=RoleScope.COURSE
+            ),
+        )
+        db_session.flush()
+        h_api.get_assignment_stats.return_value = [
+            {
+                "userid": student.h_userid,
+                "display_name": "H NAME",
+                "annotations": 2,
+                "replies": 1,
+                "last_activity": "2024-01-01T00:00:00+00:00",
+            },
+            {
+                "userid": "acct:teacher@lms.hypothes.is",
+                "display_name": "TEACHER",
+                "annotations": 10,
+                "replies": 10,
+                "last_activity": "2024-01-01T00:00:00+00:00",
+            },
+        ]
+
+        rows = svc.get_student_stats(assignment, Page(order_by="display_name"))
+
+        assert [row._asdict() for row in rows] == [
+            {
+                "id": student.id,
+                "sort_key": "H NAME",
+                "display_name": "H NAME",
+                "annotations": 2,
+                "replies": 1,
+                "last_activity": "2024-01-01T00:00:00+00:00",
+            },
+            {
+                "id": student_no_annos.id,
+                "sort_key": "Homer",
+                "display_name": "Homer",
+                "annotations": 0,
+                "replies": 0,
+                "last_activity": None,
+            },
+            {
+                "id": student_no_annos_no_name.id,
+                "sort_key": f"Student {student_no_annos_no_name.user_id[:10]}",
+                "display_name": f"Student {student_no_annos_no_name.user_id[:10]}",
+                "annotations": 0,
+                "replies": 0,
+                "last_activity": None,
+            },
+        ]
+
+    def test_get_course_assignment_stats(self, svc, h_api, db_session):
+        course = factories.Course()
+        assignment = factories.Assignment(title="ASSIGNMENT")
+        assignment_with_no_annos = factories.Assignment(title=None)
+        for course_assignment in [assignment, assignment_with_no_annos]:
+            factories.AssignmentGrouping(assignment=course_assignment, grouping=course)
+        # Assignment of another course
+        factories.AssignmentGrouping(
+            assignment=factories.Assignment(), grouping=factories.Course()
+        )
+        db_session.flush()
+        h_api.get_course_stats.return_value = [
+            {
+                "assignment_id": assignment.resource_link_id,
+                "annotations": 2,
+                "replies": 1,
+                "last_activity": "2024-01-01T00:00:00+00:00",
+            }
+        ]
+
+        rows = svc.get_course_assignment_stats(
+            course, Page(order_by="annotations", descending=True)
+        )
+
+        assert [row._asdict() for row in rows] == [
+            {
+                "id": assignment.id,
+                "sort_key": 2,
+                "title": "ASSIGNMENT",
+                "annotations": 2,
+                "replies": 1,
+                "last_activity": "2024-01-01T00:00:00+00:00",
+            },
+            {
+                "id": assignment_with_no_annos.id,
+                "sort_key": 0,
+                "title": "",
+                "annotations": 0,
+                "replies": 0,
+                "last_activity": None,
+            },
+        ]
+
+    @pytest.mark.parametrize(
+        "page,expected",
+        [
+            (Page(order_by="annotations"), [2, 3, 0, 1]),
+            (Page(order_by="annotations", descending=True), [1, 0, 3, 2]),
+            (Page(order_by="last_activity"), [2, 3, 1, 0]),
+            (Page(order_by="last_activity", descending=True), [0, 1, 3, 2]),
+            (Page(order_by="annotations", limit=2), [2, 3]),
+            (Page(order_by="annotations", after=(0, 3), limit=2), [0, 1]),
+            (
+                Page(order_by="annotations", descending=True, after=(1, 0)),
+                [3, 2],
+            ),
+            (
+                Page(order_by="last_activity", after=("", 3)),
+                [1, 0],
+            ),
+        ],
+    )
+    def test_pages(self, svc, h_api, db_session, page, expected):
+        course = factories.Course()
+        assignments = factories.Assignment.create_batch(4)
+        for assignment in assignments:
+            factories.AssignmentGrouping(assignment=assignment, grouping=course)
+        db_session.flush()
+        # Sort the assignments by id to refer to them by index
+        assignments.sort(key=lambda assignment: assignment.id)
+        h_api.get_course_stats.return_value = [
+            {
+                "assignment_id": assignments[0].resource_link_id,
+                "annotations": 1,
+                "last_activity": "2024-01-02T00:00:00+00:00",
+            },
+            {
+                "assignment_id": assignments[1].resource_link_id,
+                "annotations": 2,
+                "last_activity": "2024-01-01T00:00:00+00:00",
+            },
+        ]
+        if page.after:
+            page = Page(
+                order_by=page.order_by,
+                descending=page.descending,
+                after=(page.after[0], assignments[page.after[1]].id),
+                limit=page.limit,
+            )
+
+        rows = svc.get_course_assignment_stats(course, page)
+
+        assert [row.id for row in rows] == [assignments[i].id for i in expected]
+
+    def test_get_organization_course_stats(self, svc, h_api, db_session):
+        organization = factories.Organization()
+        course, other_course, course_without_assignments = (
+            factories.Course.create_batch(
+                3, application_instance__organization=organization
+            )
+        )
+        section = factories.CanvasSection(parent=course)
+        assignments = factories.Assignment.create_batch(3)
+        for assignment, grouping in zip(
+            assignments, [course, course, other_course], strict=True
+        ):
+            factories.AssignmentGrouping(assignment=assignment, grouping=grouping)
+        # A course of another organization
+        factories.AssignmentGrouping(
+            assignment=factories.Assignment(), grouping=factories.Course()
+        )
+        db_session.flush()
+        h_api.get_course_stats.return_value = [
+            {
+                "assignment_id": assignments[0].resource_link_id,
+                "annotations": 2,
+                "replies": 1,
+                "last_activity": "2024-01-01T00:00:00+00:00",
+            },
+            {
+                "assignment_id": assignments[1].resource_link_id,
+                "annotations": 1,
+                "replies": 0,
+                "last_activity": "2024-01-02T00:00:00+00:00",
+            },
+            # An assignment we don't know about
+            {"assignment_id": "UNKNOWN", "annotations": 5},
+        ]
+
+        stats = svc.get_organization_course_stats([organization.id])
+
+        h_api.get_course_stats.assert_called_once()
+        assert sorted(h_api.get_course_stats.call_args.args[0]) == sorted(
+            [
+                course.authority_provided_id,
+                section.authority_provided_id,
+                other_course.authority_provided_id,
+            ]
+        )
+        assert stats == [
+            {
+                "id": course.id,
+                "title": course.lms_name,
+                "assignments": 2,
+                "annotations": 3,
+                "replies": 1,
+                "last_activity": "2024-01-02T00:00:00+00:00",
+            },
+            {
+                "id": other_course.id,
+                "title": other_course.lms_name,
+                "assignments": 1,
+                "annotations": 0,
+                "replies": 0,
+                "last_activity": None,
+            },
+            {
+                "id": course_without_assignments.id,
+                "title": course_without_assignments.lms_name,
+                "assignments": 0,
+                "annotations": 0,
+                "replies": 0,
+                "last_activity": None,
+            },
+        ]
+
+    def test_get_organization_course_stats_without_courses(self, svc, h_api):
+        assert not svc.get_organization_course_stats([factories.Organization().id])
+        h_api.get_course_stats.assert_not_called()
+
+    def test_get_organization_course_stats_in_chunks(
+        self, svc, h_api, db_session, monkeypatch
+    ):
+        monkeypatch.setattr("lms.services.dashboard_stats.MAX_GROUPS_PER_REQUEST", 2)
+        organization = factories.Organization()
+        courses = factories.Course.create_batch(
+            4, application_instance__organization=organization
+        )
+        # Too many groups to request with the course before it
+        factories.CanvasSection(parent=courses[1])
+        assignment = factories.Assignment()
+        # The same assignment in two courses which fit in the same request
+        for grouping in [courses[2], courses[3]]:
+            factories.AssignmentGrouping(assignment=assignment, grouping=grouping)
+        for grouping in courses[:2]:
+            factories.AssignmentGrouping(
+                assignment=factories.Assignment(), grouping=grouping
+            )
+        db_session.flush()
+        h_api.get_course_stats.return_value = []
+
+        svc.get_organization_course_stats([organization.id])
+
+        assert [
+            len(call.args[0]) for call in h_api.get_course_stats.call_args_list
+        ] == [1, 2, 1, 1]
+
+    @pytest.fixture
+    def assignment(self):
+        assignment = factories.Assignment()
+        for course in factories.Course.create_batch(2):
+            factories.AssignmentGrouping(assignment=assignment, grouping=course)
+        return assignment
+
+    @pytest.fixture
+    def groups(self, assignment):
+        return [grouping.authority_provided_id for grouping in assignment.groupings]
+
+    @pytest.fixture
+    def h_api(self, h_api):
+        h_api.get_assignment_stats.return_value = [{"userid": "acct:user@lms"}]
+        return h_api
+
+    @pytest.fixture
+    def executor(self, patch):
+        executor = patch("lms.services.dashboard_stats._get_executor").return_value
+        submitted = []
+        executor.submit.side_effect = lambda *args: submitted.append(args)
+
+        def run_submitted():
+            while submitted:
+                function, *args = submitted.pop(0)
+                function(*args)
+
+        executor.run_submitted = run_submitted
+        return executor
+
+    @pytest.fixture
+    def background_h_api(self):
+        return create_autospec(HAPI, instance=True, spec_set=True)
+
+    @pytest.fixture
+    def svc(self, db_session, h_api, background_h_api):
+        return DashboardStatsService(
+            db=db_session,
+            h_api=h_api,
+            make_background_h_api=lambda: background_h_api,
+            prewarm=False,
+        )
+
+
+class TestGetExecutor:
+    def test_it_returns_the_same_executor_for_each_process(self):
+        assert _get_executor(os.getpid()) is _get_executor(os.getpid())
+
+
+class TestMakeBackgroundHAPI:
+    def test_it(self, pyramid_request, HAPI, HTTPService):
+        pyramid_request.registry.settings.update(
+            {
+                "h_authority": sentinel.h_authority,
+                "h_client_id": sentinel.h_client_id,
+                "h_client_secret": sentinel.h_client_secret,
+                "h_api_url_private": sentinel.h_api_url_private,
+            }
+        )
+
+        h_api = _make_background_h_api(pyramid_request.registry)
+
+        HTTPService.assert_called_once_with(
+            adapter=pyramid_request.registry["http.adapter"]
+        )
+        HAPI.assert_called_once_with(
+            authority=sentinel.h_authority,
+            client_id=sentinel.h_client_id,
+            client_secret=sentinel.h_client_secret,
+            h_private_url=sentinel.h_api_url_private,
+            http_service=HTTPService.return_value,
+        )
+        assert h_api == HAPI.return_value
+
+    @pytest.fixture
+    def HAPI(self, patch):
+        return patch("lms.services.dashboard_stats.HAPI")
+
+    @pytest.fixture
+    def HTTPService(self, patch):
+        return patch("lms.services.dashboard_stats.HTTPService")
+
+
+class TestFactory:
+    def test_it(
+        self, pyramid_request, h_api, DashboardStatsService, make_background_h_api
+    ):
+        svc = factory(sentinel.context, pyramid_request)
+
+        DashboardStatsService.assert_called_once_with(
+            db=pyramid_request.db,
+            h_api=h_api,
+            make_background_h_api=Any.callable(),
+            prewarm=False,
+        )
+        assert svc == DashboardStatsService.return_value
+        assert (
+            DashboardStatsService.call_args.kwargs["make_background_h_api"]()
+            == make_background_h_api.return_value
+        )
+        make_background_h_api.assert_called_once_with(pyramid_request.registry)
+
+    @pytest.fixture
+    def DashboardStatsService(self, patch):
+        return patch("lms.services.dashboard_stats.DashboardStatsService")
+
+    @pytest.fixture
+    def make_background_h_api(self, patch):
+        return patch("lms.services.dashboard_stats._make_background_h_api")
@@ -1,4 +1,5 @@
-from dataclasses import asdict
+from collections.abc import Iterator
+from dataclasses import asdict, replace
 from datetime import datetime
 from unittest.mock import sentinel
 
@@ -6,6 +7,7 @@ import factory
 import pytest
 from freezegun import freeze_time
 from h_matchers import Any
+from sqlalchemy import event
 
 from lms.services.digest import (
     Annotation,
@@ -45,8 +47,9 @@ class TestDigestService:
             sentinel.h_userid, sentinel.created_after, created_before
         )
         DigestContext.assert_called_once_with(
-            db_session,
-            sentinel.h_userid,
+            db_session, sentinel.h_userid, Any.instance_of(Iterator)
+        )
+        assert list(DigestContext.call_args[0][2]) == (
             [
                 Annotation(
                     userid=annotation_dict["author"]["userid"],
@@ -59,7 +62,7 @@ class TestDigestService:
                     ],
                 )
                 for annotation_dict in h_api.get_annotations.return_value
-            ],
+            ]
         )
         context.instructor_digest.assert_called_once_with(context.user_info.h_userid)
         email_preferences_service.preferences_url.assert_called_once_with(
@@ -157,7 +160,7 @@ class TestDigestService:
             [sentinel.h_userid], sentinel.created_after, created_before
         )
 
-        assert DigestContext.call_args[0][2] == [
+        assert list(DigestContext.call_args[0][2]) == [
             Annotation(
                 userid=annotation_dict["author"]["userid"],
                 authority_provided_id=annotation_dict["group"]["authority_provided_id"],
@@ -322,6 +325,52 @@ class TestDigestContext:
 
         assert digest == {"total_annotations": 0, "annotators": [], "courses": []}
 
+    @pytest.mark.parametrize("num_courses", [1, 5])
+    def test_instructor_digests_dont_query_per_course_or_per_instructor(
+        self, db_session, make_instructor, queries, num_courses
+    ):
+        courses = factories.Course.create_batch(num_courses)
+        instructors = factories.User.create_batch(3)
+        learner = factories.User()
+        annotations = []
+        for course in courses:
+            for instructor in instructors:
+                make_instructor(instructor, course)
+            for assignment in factories.Assignment.create_batch(2):
+                factories.AssignmentGrouping(assignment=assignment, grouping=course)
+                annotations.append(
+                    AnnotationFactory(
+                        authority_provided_id=course.authority_provided_id,
+                        guid=assignment.tool_consumer_instance_guid,
+                        resource_link_id=assignment.resource_link_id,
+                        userid=learner.h_userid,
+                    )
+                )
+        db_session.flush()
+        queries.clear()
+        context = DigestContext(db_session, instructors[0].h_userid, annotations)
+
+        digests = [
+            context.instructor_digest(instructor.h_userid) for instructor in instructors
+        ]
+
+        assert len(queries) == 2
+        for digest in digests:
+            assert digest["total_annotations"] == len(annotations)
+            assert len(digest["courses"]) == num_courses
+            assert all(len(course["assignments"]) == 2 for course in digest["courses"])
+
+    def test_annotations_are_counted(self):
+        annotation, other_annotation = AnnotationFactory.create_batch(2)
+
+        context = DigestContext(
+            sentinel.db,
+            sentinel.h_userid,
+            (a for a in [annotation, other_annotation, replace(annotation)]),
+        )
+
+        assert context.annotations == {annotation: 2, other_annotation: 1}
+
     def test_assignment_infos(self, db_session):
         annotations = AnnotationFactory.create_batch(size=2)
         assignments = [
@@ -350,6 +399,7 @@ class TestDigestContext:
                 for assignment, course in zip(assignments, courses)
             ]
         )
+        assert context.assignment_infos is assignment_infos
 
     def test_assignment_infos_when_an_annotation_has_no_matching_assignment(
         self, db_session
@@ -768,6 +818,19 @@ def learner_role():
     return factories.LTIRole(value="Learner")
 
 
+@pytest.fixture
+def queries(db_session):
+    queries = []
+
+    def before_cursor_execute(_conn, _cursor, statement, *_args):
+        queries.append(statement)
+
+    connection = db_session.connection()
+    event.listen(connection, "before_cursor_execute", before_cursor_execute)
+    yield queries
+    event.remove(connection, "before_cursor_execute", before_cursor_execute)
+
+
 @pytest.fixture
 def make_instructor(db_session, instructor_role):
     def make_instructor(user, course):
@@ -1,11 +1,15 @@
+from datetime import date, datetime
 from unittest.mock import sentinel
 
 import pytest
 from celery.exceptions import OperationalError
+from freezegun import freeze_time
+from h_matchers import Any
+from sqlalchemy import text
 
 from lms.events import BaseEvent
 from lms.models import Event, EventData, EventType, EventUser
-from lms.services.event import EventService, factory
+from lms.services.event import EventService, _EventBuffer, factory
 from tests import factories
 
 
@@ -78,19 +82,204 @@ class TestEventService:
         # The type is the same as the first insert
         assert event_type == type_query.one()
 
-    def test_queue_event(self, svc, insert_event, base_event):
-        svc.queue_event(base_event)
+    def test_insert_events(self, svc, db_session):
+        user = factories.User()
+        roles = factories.LTIRole.create_batch(2)
+        db_session.flush()
+        timestamp = datetime(2024, 1, 1)
+
+        svc.insert_events(
+            [
+                BaseEvent(
+                    request=sentinel.request,
+                    type=EventType.Type.CONFIGURED_LAUNCH,
+                    user_id=user.id,
+                    role_ids=[role.id for role in roles],
+                    timestamp=timestamp,
+                ),
+                BaseEvent(
+                    request=sentinel.request,
+                    type=EventType.Type.DEEP_LINKING,
+                    data={"some": "data"},
+                ),
+            ]
+        )
+
+        launch, deep_linking = db_session.query(Event).order_by(Event.id).all()
+        assert launch.type.type == EventType.Type.CONFIGURED_LAUNCH
+        assert launch.timestamp == timestamp
+        assert deep_linking.type.type == EventType.Type.DEEP_LINKING
+        assert {
+            (event_user.event_id, event_user.lti_role_id)
+            for event_user in db_session.query(EventUser)
+        } == {(launch.id, role.id) for role in roles}
+        event_data = db_session.query(EventData).one()
+        assert (event_data.event_id, event_data.data) == (
+            deep_linking.id,
+            {"some": "data"},
+        )
+
+    def test_insert_events_skips_the_events_that_cant_be_inserted(
+        self, svc, db_session, caplog
+    ):
+        user = factories.User()
+        db_session.flush()
+
+        svc.insert_events(
+            [
+                BaseEvent(
+                    request=sentinel.request,
+                    type=EventType.Type.CONFIGURED_LAUNCH,
+                    user_id=user.id,
+                ),
+                BaseEvent(
+                    request=sentinel.request,
+                    type=EventType.Type.DEEP_LINKING,
+                    # A user that doesn't exist
+                    user_id=user.id + 1,
+                ),
+                BaseEvent(
+                    request=sentinel.request,
+                    type=EventType.Type.EDITED_ASSIGNMENT,
+                    data={"some": "data"},
+                ),
+            ]
+        )
+
+        assert [
+            event.type.type for event in db_session.query(Event)
+        ] == Any.list.containing(
+            [EventType.Type.CONFIGURED_LAUNCH, EventType.Type.EDITED_ASSIGNMENT]
+        ).only()
+        assert db_session.query(EventUser).one().user_id == user.id
+        assert db_session.query(EventData).one().data == {"some": "data"}
+        assert "Error while inserting event" in caplog.text
+        assert "deep_linking" in caplog.text
 
-        insert_event.apply_async.assert_called_once_with(
-            (base_event.serialize(),), retry=False
+    def test_insert_events_with_no_events(self, svc, db_session):
+        svc.insert_events([])
+
+        assert not db_session.query(Event).all()
+
+    @freeze_time("2024-11-15")
+    def test_create_partitions(self, svc, db_session):
+        svc.create_partitions(months_ahead=2)
+
+        for month in ["y2024m11", "y2024m12", "y2025m01"]:
+            for table in ["event", "event_user", "event_data"]:
+                assert self.partition_bounds(db_session, f"{table}_{month}")
+        assert self.partition_bounds(db_session, "event_y2025m01") == (
+            "FOR VALUES FROM ('2025-01-01 00:00:00') TO ('2025-02-01 00:00:00')"
+        )
+        assert not self.partition_bounds(db_session, "event_y2025m02")
+
+    def test_create_partitions_when_they_already_exist(self, svc, db_session):
+        svc.create_partitions(months_ahead=0)
+
+        svc.create_partitions(months_ahead=0)
+
+        assert self.partition_bounds(
+            db_session, f"event_y{date.today():%Y}m{date.today():%m}"
         )
 
-    def test_queue_event_with_OperationalError_doest_raise(
-        self, svc, insert_event, base_event
+    @freeze_time("2024-11-15")
+    def test_create_partitions_moves_rows_out_of_the_default_partitions(
+        self, svc, db_session
     ):
-        insert_event.apply_async.side_effect = OperationalError
+        user = factories.User()
+        db_session.flush()
+        svc.insert_events(
+            [
+                BaseEvent(
+                    request=sentinel.request,
+                    type=EventType.Type.CONFIGURED_LAUNCH,
+                    user_id=user.id,
+                    data={"some": "data"},
+                    timestamp=datetime(2024, 11, 20),
+                )
+            ]
+        )
+
+        svc.create_partitions(months_ahead=0)
+
+        for table in ["event", "event_user", "event_data"]:
+            assert self.partition_bounds(db_session, f"{table}_y2024m11")
+            assert self.count_rows(db_session, f"{table}_y2024m11") == 1
+            assert not self.count_rows(db_session, f"{table}_default")
+        assert db_session.query(EventUser).one().user_id == user.id
 
-        assert not svc.queue_event(base_event)
+    @freeze_time("2024-11-15")
+    def test_create_partitions_skips_the_months_that_fail(
+        self, svc, db_session, caplog
+    ):
+        db_session.execute(
+            text(
+                "CREATE TABLE event_overlap PARTITION OF event "
+                "FOR VALUES FROM ('2024-12-15') TO ('2025-01-15')"
+            )
+        )
+
+        svc.create_partitions(months_ahead=2)
+
+        assert self.partition_bounds(db_session, "event_y2024m11")
+        assert not self.partition_bounds(db_session, "event_y2024m12")
+        assert not self.partition_bounds(db_session, "event_y2025m01")
+        assert "Error while creating the partitions for 2024-12-01" in caplog.text
+
+    def test_archive_partitions(self, svc, db_session):
+        user = factories.User()
+        db_session.flush()
+        with freeze_time("2024-01-15"):
+            svc.create_partitions(months_ahead=2)
+        svc.insert_events(
+            [
+                BaseEvent(
+                    request=sentinel.request,
+                    type=EventType.Type.CONFIGURED_LAUNCH,
+                    user_id=user.id,
+                    data={"month": month},
+                    timestamp=datetime(2024, month, 20),
+                )
+                for month in [1, 2, 3]
+            ]
+        )
+
+        with freeze_time("2024-05-02"):
+            archived = svc.archive_partitions(retention_months=3)
+
+        assert archived == [
+            "event_data_y2024m01",
+            "event_user_y2024m01",
+            "event_y2024m01",
+        ]
+        assert [event.timestamp.month for event in db_session.query(Event)] == [2, 3]
+        assert db_session.execute(
+            text("SELECT extra FROM event_archive.event_data_y2024m01")
+        ).all() == [({"month": 1},)]
+        assert not self.partition_bounds(db_session, "event_y2024m01")
+
+    def partition_bounds(self, db_session, name):
+        return db_session.scalar(
+            text(
+                """
+                SELECT pg_get_expr(relpartbound, oid) FROM pg_class
+                WHERE relname = :name AND relispartition
+                """
+            ),
+            {"name": name},
+        )
+
+    def count_rows(self, db_session, name):
+        return db_session.scalar(text(f"SELECT count(*) FROM {name}"))
+
+    def test_queue_event(self, svc, _BUFFER, base_event):
+        svc.queue_event(base_event)
+
+        _BUFFER.add.assert_called_once_with(base_event.serialize())
+
+    @pytest.fixture
+    def _BUFFER(self, patch):
+        return patch("lms.services.event._BUFFER")
 
     @pytest.fixture
     def svc(self, db_session):
@@ -102,9 +291,49 @@ class TestEventService:
             request=sentinel.request, type=EventType.Type.CONFIGURED_LAUNCH
         )
 
+
+class TestEventBuffer:
+    def test_it_sends_events_once_there_are_enough_of_them(self, insert_events):
+        buffer = _EventBuffer(max_size=2, max_age=60)
+
+        buffer.add(sentinel.event_1)
+        insert_events.apply_async.assert_not_called()
+        buffer.add(sentinel.event_2)
+
+        insert_events.apply_async.assert_called_once_with(
+            ([sentinel.event_1, sentinel.event_2],)
+        )
+
+    def test_it_sends_events_after_max_age(self, insert_events):
+        buffer = _EventBuffer(max_size=100, max_age=0.01)
+
+        buffer.add(sentinel.event_1)
+        buffer.add(sentinel.event_2)
+        buffer._timer.join()  # pylint:disable=protected-access
+
+        insert_events.apply_async.assert_called_once_with(
+            ([sentinel.event_1, sentinel.event_2],)
+        )
+
+    def test_it_sends_each_event_once(self, insert_events):
+        buffer = _EventBuffer(max_size=1, max_age=0.01)
+
+        buffer.add(sentinel.event)
+        buffer.flush()
+
+        insert_events.apply_async.assert_called_once()
+
+    def test_it_doesnt_raise_OperationalError(self, insert_events, caplog):
+        insert_events.apply_async.side_effect = OperationalError
+        buffer = _EventBuffer(max_size=1, max_age=60)
+
+        buffer.add(sentinel.event)
+
+        assert "Error while queueing events" in caplog.text
+
     @pytest.fixture(autouse=True)
-    def insert_event(self, patch):
-        return patch("lms.services.event.insert_event")
+    def insert_events(self, patch):
+        return patch("lms.services.event.insert_events")
 
 
 class TestFactory:
@@ -5,7 +5,7 @@ import requests
 from requests import RequestException
 
 from lms.services.exceptions import ExternalRequestError
-from lms.services.http import HTTPService, factory
+from lms.services.http import HTTPService, create_adapter, factory, includeme
 
 
 class TestHTTPService:
@@ -56,6 +56,14 @@ class TestHTTPService:
         assert exc_info.value.request == sentinel.err_request
         assert exc_info.value.response == response
 
+    def test_it_mounts_the_adapter(self):
+        adapter = create_adapter(pool_connections=1, pool_maxsize=1, max_retries=1)
+
+        svc = HTTPService(adapter=adapter)
+
+        assert svc.session.get_adapter("https://example.com") == adapter
+        assert svc.session.get_adapter("http://example.com") == adapter
+
     @pytest.fixture()
     def passed_args(self):
         return {
@@ -74,11 +82,59 @@ class TestHTTPService:
         return svc
 
 
+class TestCreateAdapter:
+    def test_it(self):
+        adapter = create_adapter(pool_connections=5, pool_maxsize=3, max_retries=2)
+
+        # pylint:disable=protected-access
+        assert adapter._pool_connections == 5
+        assert adapter._pool_maxsize == 3
+        assert adapter.max_retries.total == 2
+        assert not adapter.max_retries.read
+
+
+class TestIncludeMe:
+    @pytest.mark.parametrize(
+        "settings,expected",
+        (
+            (
+                {
+                    "http_pool_connections": None,
+                    "http_pool_maxsize": None,
+                    "http_max_retries": None,
+                },
+                {"pool_connections": 100, "pool_maxsize": 10, "max_retries": 0},
+            ),
+            (
+                {
+                    "http_pool_connections": "1",
+                    "http_pool_maxsize": "2",
+                    "http_max_retries": "3",
+                },
+                {"pool_connections": 1, "pool_maxsize": 2, "max_retries": 3},
+            ),
+        ),
+    )
+    def test_it(self, pyramid_config, create_adapter, settings, expected):
+        pyramid_config.registry.settings.update(settings)
+
+        includeme(pyramid_config)
+
+        create_adapter.assert_called_once_with(**expected)
+        assert pyramid_config.registry["http.adapter"] == create_adapter.return_value
+
+    @pytest.fixture
+    def create_adapter(self, patch):
+        return patch("lms.services.http.create_adapter")
+
+
 class TestFactory:
     def test_it(self, pyramid_request, HTTPService):
         svc = factory(sentinel.context, pyramid_request)
 
-        HTTPService.assert_called_once_with()
+        HTTPService.assert_called_once_with(
+            adapter=pyramid_request.registry["http.adapter"]
+        )
         assert svc == HTTPService.return_value
 
     @pytest.fixture
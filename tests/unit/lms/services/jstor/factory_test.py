@@ -30,6 +30,7 @@ class TestServiceFactory:
                 "Tracking-User-ID": pyramid_request.lti_user.h_user.username,
                 "Tracking-User-Agent": user_agent,
             },
+            adapter=pyramid_request.registry["http.adapter"],
         )
         assert svc == JSTORService.return_value
 
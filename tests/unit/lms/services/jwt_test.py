@@ -1,20 +1,23 @@
 import copy
 import datetime
 import json
-from unittest.mock import create_autospec, sentinel
+import os
+from unittest.mock import Mock, create_autospec, sentinel
 
 import httpretty
 import jwt
 import pytest
 from freezegun import freeze_time
-from jwt.exceptions import InvalidTokenError
+from jwt.exceptions import InvalidTokenError, PyJWKClientError
 from pyramid.config import Configurator
 from pytest import param
 
 from lms.services.exceptions import ExpiredJWTError, InvalidJWTError
 from lms.services.jwt import (
     JWTService,
+    _get_executor,
     _get_lti_jwt,
+    _get_signing_key,
     _RequestsPyJWKClient,
     factory,
     includeme,
@@ -75,17 +78,17 @@ class TestJWTService:
 
         encoded_jwt = svc.encode_with_private_key(payload)
 
-        rsa_key_service.get_random_key.assert_called_once_with()
+        rsa_key_service.get_signing_key.assert_called_once_with()
         jwt.encode.assert_called_once_with(
             payload,
-            rsa_key_service.private_key.return_value,
+            rsa_key_service.get_signing_key.return_value.private_key,
             algorithm="RS256",
-            headers={"kid": rsa_key_service.get_random_key.return_value.kid},
+            headers={"kid": rsa_key_service.get_signing_key.return_value.kid},
         )
         assert encoded_jwt == jwt.encode.return_value
 
     def test_decode_lti_token(
-        self, svc, jwt, _RequestsPyJWKClient, lti_registration_service
+        self, svc, jwt, _get_signing_key, lti_registration_service
     ):
         registration = factories.LTIRegistration(key_set_url="http://jwk.com")
         lti_registration_service.get.return_value = registration
@@ -95,18 +98,36 @@ class TestJWTService:
 
         jwt.get_unverified_header.assert_called_once_with(sentinel.id_token)
         lti_registration_service.get.assert_called_once_with("ISS", "AUD")
-        _RequestsPyJWKClient.assert_called_once_with(
-            lti_registration_service.get.return_value.key_set_url, cache_keys=True
-        )
+        _get_signing_key.assert_called_once_with("http://jwk.com", "KID")
         jwt.decode.assert_called_with(
             sentinel.id_token,
-            key=_RequestsPyJWKClient.return_value.get_signing_key_from_jwt.return_value.key,
+            key=_get_signing_key.return_value.key,
             audience="AUD",
             algorithms=["RS256"],
             leeway=JWTService.LEEWAY,
         )
         assert payload == {"aud": "AUD", "iss": "ISS"}
 
+    def test_decode_lti_token_prefetches_the_key_sets(
+        self, svc, jwt, _get_signing_key, lti_registration_service, executor
+    ):
+        lti_registration_service.get.return_value = factories.LTIRegistration(
+            key_set_url="http://jwk.com"
+        )
+        lti_registration_service.get_key_set_urls.return_value = [
+            "http://jwk.com",
+            "http://other.jwk.com",
+        ]
+        jwt.decode.return_value = {"aud": "AUD", "iss": "ISS"}
+
+        svc.decode_lti_token(sentinel.id_token)
+        svc.decode_lti_token(sentinel.id_token)
+
+        # Only the other key sets, the one of the launch is fetched right away
+        lti_registration_service.get_key_set_urls.assert_called_once_with()
+        executor.submit.assert_called_once()
+        assert executor.submit.call_args.args[1] == "http://other.jwk.com"
+
     def test_decode_lti_token_with_empty_token(self, svc):
         assert not svc.decode_lti_token("")
 
@@ -137,6 +158,7 @@ class TestJWTService:
 
         assert "jwt" in exc_info.value.messages
 
+    @pytest.mark.usefixtures("_get_signing_key")
     def test_decode_lti_token_with_invalid_jwt(self, svc, jwt):
         jwt.decode.side_effect = [{"aud": "AUD", "iss": "ISS"}, InvalidTokenError()]
 
@@ -169,18 +191,131 @@ class TestJWTService:
 
     @pytest.fixture()
     def jwt(self, patch):
-        return patch("lms.services.jwt.jwt")
+        jwt = patch("lms.services.jwt.jwt")
+        jwt.get_unverified_header.return_value = {"kid": "KID"}
+        return jwt
 
     @pytest.fixture()
+    def _get_signing_key(self, patch):
+        return patch("lms.services.jwt._get_signing_key")
+
+    @pytest.fixture
+    def lti_registration_service(self, lti_registration_service):
+        lti_registration_service.get_key_set_urls.return_value = []
+        return lti_registration_service
+
+    @pytest.fixture
+    def svc(self, lti_registration_service, rsa_key_service):
+        return JWTService(lti_registration_service, rsa_key_service)
+
+
+class Test_GetSigningKey:
+    def test_it_fetches_the_key_set(self, _RequestsPyJWKClient, key):
+        assert _get_signing_key(sentinel.url, "KID") == key
+        _RequestsPyJWKClient.assert_called_once_with(sentinel.url, cache_jwk_set=False)
+
+    def test_it_caches_the_key_set(self, _RequestsPyJWKClient, key, executor):
+        _get_signing_key(sentinel.url, "KID")
+        _RequestsPyJWKClient.reset_mock()
+
+        assert _get_signing_key(sentinel.url, "KID") == key
+        _RequestsPyJWKClient.assert_not_called()
+        executor.submit.assert_not_called()
+
+    def test_it_refreshes_old_key_sets_in_the_background(
+        self, _RequestsPyJWKClient, key, executor
+    ):
+        with freeze_time("2024-01-01 00:00:00"):
+            _get_signing_key(sentinel.url, "KID")
+        new_key = Mock(key_id="KID")
+        _RequestsPyJWKClient.return_value.get_signing_keys.return_value = [new_key]
+
+        with freeze_time("2024-01-01 00:06:00"):
+            # The old key is used while the key set is refreshed
+            assert _get_signing_key(sentinel.url, "KID") == key
+            _get_signing_key(sentinel.url, "KID")
+            executor.submit.assert_called_once()
+            executor.run_submitted()
+
+            assert _get_signing_key(sentinel.url, "KID") == new_key
+
+    def test_it_keeps_the_key_set_if_refreshing_fails(
+        self, _RequestsPyJWKClient, key, executor
+    ):
+        with freeze_time("2024-01-01 00:00:00"):
+            _get_signing_key(sentinel.url, "KID")
+        _RequestsPyJWKClient.return_value.get_signing_keys.side_effect = (
+            PyJWKClientError
+        )
+
+        with freeze_time("2024-01-01 00:06:00"):
+            _get_signing_key(sentinel.url, "KID")
+            executor.run_submitted()
+
+            assert _get_signing_key(sentinel.url, "KID") == key
+            # It tries again on the next launch
+            assert executor.submit.call_count == 2
+
+    def test_it_fetches_the_key_set_again_for_unknown_keys(
+        self, _RequestsPyJWKClient, key
+    ):
+        with freeze_time("2024-01-01 00:00:00"):
+            _get_signing_key(sentinel.url, "KID")
+        new_key = Mock(key_id="NEW_KID")
+        _RequestsPyJWKClient.return_value.get_signing_keys.return_value = [
+            key,
+            new_key,
+        ]
+
+        with freeze_time("2024-01-01 00:01:00"):
+            assert _get_signing_key(sentinel.url, "NEW_KID") == new_key
+
+    @pytest.mark.usefixtures("key")
+    def test_it_doesnt_fetch_the_key_set_again_too_often(self, _RequestsPyJWKClient):
+        with freeze_time("2024-01-01 00:00:00"):
+            _get_signing_key(sentinel.url, "KID")
+            _RequestsPyJWKClient.reset_mock()
+
+            with pytest.raises(PyJWKClientError):
+                _get_signing_key(sentinel.url, "UNKNOWN")
+
+        _RequestsPyJWKClient.assert_not_called()
+
+    def test_it_raises_for_unknown_keys(self, _RequestsPyJWKClient):
+        with pytest.raises(PyJWKClientError):
+            _get_signing_key(sentinel.url, "UNKNOWN")
+
+        _RequestsPyJWKClient.assert_called_once()
+
+    @pytest.fixture
     def _RequestsPyJWKClient(self, patch):
         return patch("lms.services.jwt._RequestsPyJWKClient")
 
     @pytest.fixture
-    def svc(self, lti_registration_service, rsa_key_service):
-        svc = JWTService(lti_registration_service, rsa_key_service)
-        # Clear the lru_cache to make tests independent
-        svc._get_jwk_client.cache_clear()  # pylint: disable=protected-access
-        return svc
+    def key(self, _RequestsPyJWKClient):
+        key = Mock(key_id="KID")
+        _RequestsPyJWKClient.return_value.get_signing_keys.return_value = [key]
+        return key
+
+
+class TestGetExecutor:
+    def test_it_returns_the_same_executor_for_each_process(self):
+        assert _get_executor(os.getpid()) is _get_executor(os.getpid())
+
+
+@pytest.fixture
+def executor(patch):
+    executor = patch("lms.services.jwt._get_executor").return_value
+    submitted = []
+    executor.submit.side_effect = lambda *args: submitted.append(args)
+
+    def run_submitted():
+        while submitted:
+            function, *args = submitted.pop(0)
+            function(*args)
+
+    executor.run_submitted = run_submitted
+    return executor
 
 
 class Test_RequestsPyJWKClient:
@@ -1,9 +1,10 @@
-from unittest.mock import create_autospec, sentinel
+from unittest.mock import sentinel
 
 import pytest
+from celery.exceptions import OperationalError
 from h_api.bulk_api import CommandBuilder
+from h_matchers import Any
 
-from lms.models import Grouping
 from lms.services import HAPIError
 from lms.services.lti_h import LTIHService
 from tests import factories
@@ -70,6 +71,110 @@ class TestSync:
             grouping=grouping, params=sentinel.params
         )
 
+    def test_sync_skips_recently_synced_commands(
+        self, h_api, lti_h_svc, group_info_service
+    ):
+        courses = factories.Course.create_batch(2)
+        lti_h_svc.sync(courses, sentinel.params)
+
+        lti_h_svc.sync(courses, sentinel.params)
+
+        h_api.execute_bulk.assert_called_once()
+        assert group_info_service.upsert_group_info.call_count == 4
+
+    def test_sync_only_sends_new_groups(self, h_api, h_user, lti_h_svc):
+        course, new_course = factories.Course.create_batch(2)
+        lti_h_svc.sync([course], sentinel.params)
+
+        lti_h_svc.sync([course, new_course], sentinel.params)
+
+        _, kwargs = h_api.execute_bulk.call_args
+        # pylint: disable=protected-access
+        assert [command.raw for command in kwargs["commands"]] == [
+            lti_h_svc._user_upsert(h_user).raw,
+            lti_h_svc._group_upsert(new_course, "group_0").raw,
+            CommandBuilder.group_membership.create("user_0", "group_0").raw,
+        ]
+
+    def test_sync_only_sends_the_user_if_it_changed(self, h_api, h_user, lti_h_svc):
+        course = factories.Course()
+        lti_h_svc.sync([course], sentinel.params)
+
+        # pylint: disable=protected-access
+        lti_h_svc._h_user = h_user._replace(display_name="NEW DISPLAY NAME")
+        lti_h_svc.sync([course], sentinel.params)
+
+        _, kwargs = h_api.execute_bulk.call_args
+        assert [command.raw for command in kwargs["commands"]] == [
+            lti_h_svc._user_upsert(lti_h_svc._h_user).raw
+        ]
+
+    def test_sync_doesnt_skip_commands_that_failed(self, h_api, lti_h_svc, grouping):
+        h_api.execute_bulk.side_effect = HAPIError
+        with pytest.raises(HAPIError):
+            lti_h_svc.sync([grouping], sentinel.params)
+
+        with pytest.raises(HAPIError):
+            lti_h_svc.sync([grouping], sentinel.params)
+
+        assert h_api.execute_bulk.call_count == 2
+
+    def test_sync_doesnt_skip_changed_commands(self, h_api, lti_h_svc):
+        course = factories.Course()
+        lti_h_svc.sync([course], sentinel.params)
+
+        course.lms_name = "NEW NAME"
+        lti_h_svc.sync([course], sentinel.params)
+
+        assert h_api.execute_bulk.call_count == 2
+
+    def test_sync_in_async_mode(self, h_api, lti_h_svc, grouping, execute_bulk):
+        lti_h_svc._async = True  # pylint:disable=protected-access
+
+        lti_h_svc.sync([grouping], sentinel.params)
+
+        h_api.execute_bulk.assert_not_called()
+        execute_bulk.apply_async.assert_called_once_with(
+            (),
+            {
+                "commands": [
+                    command.raw
+                    # pylint:disable=protected-access
+                    for command in lti_h_svc._yield_commands([grouping])
+                ],
+                "synced": [
+                    # pylint:disable=protected-access
+                    (lti_h_svc._user_key(), Any.string()),
+                    (lti_h_svc._group_key(grouping), Any.string()),
+                ],
+            },
+        )
+
+    def test_sync_in_async_mode_leaves_recording_the_sync_to_the_task(
+        self, lti_h_svc, grouping, execute_bulk
+    ):
+        lti_h_svc._async = True  # pylint:disable=protected-access
+
+        lti_h_svc.sync([grouping], sentinel.params)
+        lti_h_svc.sync([grouping], sentinel.params)
+
+        assert execute_bulk.apply_async.call_count == 2
+
+    def test_sync_in_async_mode_falls_back_to_sync_on_queue_errors(
+        self, h_api, lti_h_svc, grouping, execute_bulk
+    ):
+        lti_h_svc._async = True  # pylint:disable=protected-access
+        execute_bulk.apply_async.side_effect = OperationalError
+
+        lti_h_svc.sync([grouping], sentinel.params)
+        lti_h_svc.sync([grouping], sentinel.params)
+
+        h_api.execute_bulk.assert_called_once()
+
+    @pytest.fixture
+    def execute_bulk(self, patch):
+        return patch("lms.services.lti_h.execute_bulk")
+
     @pytest.fixture
     def lti_h_svc(self, pyramid_request):
         return LTIHService(None, pyramid_request)
@@ -80,4 +185,4 @@ class TestSync:
 
     @pytest.fixture
     def grouping(self):
-        return create_autospec(Grouping, instance=True, spec_set=True)
+        return factories.Course()
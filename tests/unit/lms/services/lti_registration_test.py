@@ -59,6 +59,17 @@ class TestLTIRegistrationService:
         assert by_both[0].issuer == "issuer"
         assert by_both[0].client_id == "client_id"
 
+    def test_get_key_set_urls(self, svc):
+        factories.LTIRegistration(key_set_url="https://b.example.com/jwks")
+        factories.LTIRegistration.create_batch(
+            2, key_set_url="https://a.example.com/jwks"
+        )
+
+        assert svc.get_key_set_urls() == [
+            "https://a.example.com/jwks",
+            "https://b.example.com/jwks",
+        ]
+
     @pytest.fixture
     def registration(self):
         factories.LTIRegistration.create_batch(4)
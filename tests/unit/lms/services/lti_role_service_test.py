@@ -1,5 +1,5 @@
 import random
-from unittest.mock import sentinel
+from unittest.mock import patch, sentinel
 
 import pytest
 from h_matchers import Any
@@ -48,6 +48,29 @@ class TestLTIRoleService:
         assert roles[0].type == RoleType.INSTRUCTOR
         assert roles[0].scope == RoleScope.COURSE
 
+    def test_get_roles_caches_roles(self, svc, existing_roles, db_session):
+        db_session.flush()
+        role_description = ", ".join(role.value for role in existing_roles)
+        svc.get_roles(role_description)
+        db_session.expunge_all()
+
+        with patch.object(db_session, "query") as query:
+            roles = svc.get_roles(role_description)
+
+        query.assert_not_called()
+        assert [(role.id, role.value, role.type, role.scope) for role in roles] == [
+            (role.id, role.value, role.type, role.scope) for role in existing_roles
+        ]
+        assert all(role in db_session for role in roles)
+
+    def test_get_roles_doesnt_cache_new_roles(self, svc, db_session):
+        svc.get_roles("Instructor")
+        db_session.flush()
+
+        roles = svc.get_roles("Instructor")
+
+        assert roles[0].id
+
     def test_get_roles_for_application_instance_no_overrides(
         self, svc, existing_roles, application_instance
     ):
@@ -83,6 +106,83 @@ class TestLTIRoleService:
             for role in existing_roles[1:]
         ]
 
+    def test_get_roles_for_application_instance_ignores_other_instances_overrides(
+        self, svc, existing_roles, application_instance
+    ):
+        factories.LTIRoleOverride(
+            lti_role=existing_roles[0],
+            application_instance=factories.ApplicationInstance(),
+            scope=self.random_enum_excluding(RoleScope, existing_roles[0].scope),
+            type=self.random_enum_excluding(RoleType, existing_roles[0].type),
+        )
+
+        roles = svc.get_roles_for_application_instance(
+            application_instance, existing_roles
+        )
+
+        assert roles == [
+            Role(scope=role.scope, type=role.type, value=role.value)
+            for role in existing_roles
+        ]
+
+    def test_get_roles_for_application_instance_caches_overrides(
+        self, svc, existing_roles, application_instance, db_session
+    ):
+        svc.get_roles_for_application_instance(application_instance, existing_roles)
+        db_session.add(
+            LTIRoleOverride(
+                lti_role=existing_roles[0],
+                application_instance=application_instance,
+                scope=self.random_enum_excluding(RoleScope, existing_roles[0].scope),
+                type=self.random_enum_excluding(RoleType, existing_roles[0].type),
+            )
+        )
+        db_session.flush()
+
+        roles = svc.get_roles_for_application_instance(
+            application_instance, existing_roles
+        )
+
+        assert roles[0].type == existing_roles[0].type
+
+    @pytest.mark.parametrize("action", ["new", "update", "delete"])
+    def test_editing_overrides_clears_the_cache(
+        self, svc, existing_roles, application_instance, db_session, action
+    ):
+        override = factories.LTIRoleOverride(
+            lti_role=existing_roles[0],
+            application_instance=application_instance,
+            scope=existing_roles[0].scope,
+            type=self.random_enum_excluding(RoleType, existing_roles[0].type),
+        )
+        db_session.flush()
+        svc.get_roles_for_application_instance(application_instance, existing_roles)
+
+        if action == "new":
+            svc.new_role_override(
+                application_instance,
+                existing_roles[1],
+                type_=RoleType.NONE,
+                scope=RoleScope.SYSTEM,
+            )
+            expected = (RoleType.NONE, existing_roles[1])
+        elif action == "update":
+            svc.update_override(override, scope=RoleScope.SYSTEM, type_=RoleType.NONE)
+            expected = (RoleType.NONE, existing_roles[0])
+        else:
+            svc.delete_override(override)
+            expected = (existing_roles[0].type, existing_roles[0])
+        db_session.flush()
+
+        roles = svc.get_roles_for_application_instance(
+            application_instance, existing_roles
+        )
+
+        expected_type, expected_role = expected
+        assert [role.type for role in roles if role.value == expected_role.value] == [
+            expected_type
+        ]
+
     def test_search(self, existing_roles, svc):
         results = svc.search()
 
@@ -2,9 +2,12 @@ from datetime import datetime, timedelta
 from unittest.mock import sentinel
 
 import pytest
+import sqlalchemy as sa
 from h_matchers import Any
+from sqlalchemy import event
 
 from lms.models import Organization
+from lms.services import organization as organization_module
 from lms.services.h_api import HAPI
 from lms.services.organization import (
     InvalidOrganizationParent,
@@ -288,7 +291,33 @@ class TestOrganizationService:
                 authority_provided_id=course_root.authority_provided_id,
             ),
         ]
-        assert report == Any.list.containing(expected)
+        assert list(report) == Any.list.containing(expected)
+
+    def test_usage_report_checks_courses_with_h_in_batches(
+        self, svc, org_with_parent, h_api
+    ):
+        since = datetime(2023, 1, 1)
+        until = datetime(2023, 12, 31)
+        ai = factories.ApplicationInstance(organization=org_with_parent)
+        courses = factories.Course.create_batch(
+            3, application_instance=ai, created=since + timedelta(days=1)
+        )
+        h_api.get_groups.return_value = [
+            HAPI.HAPIGroup(authority_provided_id=courses[0].authority_provided_id)
+        ]
+
+        svc.usage_report(org_with_parent, since, until, batch_size=2)
+
+        assert h_api.get_groups.call_count == 2
+        checked = [
+            group for call in h_api.get_groups.call_args_list for group in call.args[0]
+        ]
+        assert (
+            checked
+            == Any.list.containing(
+                [course.authority_provided_id for course in courses]
+            ).only()
+        )
 
     def test_usage_report_with_no_courses(self, svc, org_with_parent):
         since = datetime(2023, 1, 1)
@@ -341,6 +370,128 @@ class TestOrganizationService:
         )
 
 
+class TestGetHierarchyIds:
+    def test_it(self, svc, hierarchy):
+        _, child, grandchild, _ = hierarchy
+
+        assert (
+            svc.get_hierarchy_ids(child.id)
+            == Any.list.containing([child.id, grandchild.id]).only()
+        )
+        assert svc.get_hierarchy_ids(grandchild.id) == [grandchild.id]
+
+    def test_it_with_include_parents(self, svc, hierarchy):
+        assert (
+            svc.get_hierarchy_ids(hierarchy[2].id, include_parents=True)
+            == Any.list.containing([org.id for org in hierarchy]).only()
+        )
+
+    def test_it_with_an_unknown_organization(self, svc):
+        assert not svc.get_hierarchy_ids(-1)
+
+    @pytest.mark.usefixtures("hierarchy")
+    def test_it_caches_the_hierarchy(self, svc, cache):
+        svc.get_hierarchy_ids(-1)
+
+        assert cache
+
+    def test_it_doesnt_query_cached_organizations(self, svc, hierarchy, queries):
+        root_id, child_id = hierarchy[0].id, hierarchy[1].id
+        svc.get_hierarchy_ids(root_id)
+        queries.clear()
+
+        svc.get_hierarchy_ids(child_id)
+
+        assert not queries
+
+    def test_it_reloads_the_hierarchy_for_new_organizations(
+        self, svc, hierarchy, db_session
+    ):
+        svc.get_hierarchy_ids(hierarchy[0].id)
+        # Create the organization somewhere else, without invalidating the cache
+        new_id = db_session.execute(
+            sa.insert(Organization)
+            .values(public_id="us.lms.org.NEW", parent_id=hierarchy[0].id)
+            .returning(Organization.id)
+        ).scalar_one()
+
+        assert new_id in svc.get_hierarchy_ids(new_id, include_parents=True)
+
+    def test_moving_an_organization_invalidates_the_cache(
+        self, svc, hierarchy, db_session, cache
+    ):
+        root, child, _, sibling = hierarchy
+        svc.get_hierarchy_ids(root.id)
+
+        svc.update_organization(sibling, parent_public_id=child.public_id)
+        db_session.flush()
+
+        assert not cache
+        assert sibling.id in svc.get_hierarchy_ids(child.id)
+
+    def test_it_doesnt_cache_uncommitted_changes(self, svc, hierarchy, cache):
+        hierarchy[3].parent = None
+
+        svc.get_hierarchy_ids(hierarchy[0].id)
+
+        assert not cache
+
+    @pytest.mark.parametrize("end_transaction", ["commit", "rollback"])
+    def test_it_clears_the_cache_again_at_the_end_of_the_transaction(
+        self, svc, hierarchy, db_session, cache, end_transaction
+    ):
+        factories.Organization()
+        db_session.flush()
+        svc.get_hierarchy_ids(hierarchy[0].id)
+        # A concurrent request caches the old hierarchy
+        cache["hierarchy"] = sentinel.old_hierarchy
+
+        getattr(db_session, end_transaction)()
+
+        assert not cache
+
+    def test_transactions_without_changes_dont_clear_the_cache(
+        self, svc, hierarchy, db_session, cache
+    ):
+        svc.get_hierarchy_ids(hierarchy[0].id)
+
+        db_session.commit()
+
+        assert cache
+
+    @pytest.fixture
+    def hierarchy(self, db_session):
+        root = factories.Organization()
+        child = factories.Organization(parent=root)
+        grandchild = factories.Organization(parent=child)
+        sibling = factories.Organization(parent=root)
+        # Unrelated
+        factories.Organization(parent=factories.Organization())
+        # Commit so the hierarchy can be cached
+        db_session.commit()
+        return root, child, grandchild, sibling
+
+    @pytest.fixture
+    def cache(self):
+        return organization_module._HIERARCHY  # pylint:disable=protected-access
+
+    @pytest.fixture
+    def queries(self, db_session):
+        queries = []
+
+        def before_cursor_execute(_conn, _cursor, statement, *_args):
+            queries.append(statement)
+
+        connection = db_session.connection()
+        event.listen(connection, "before_cursor_execute", before_cursor_execute)
+        yield queries
+        event.remove(connection, "before_cursor_execute", before_cursor_execute)
+
+    @pytest.fixture
+    def svc(self, db_session, h_api):
+        return OrganizationService(db_session=db_session, h_api=h_api)
+
+
 class TestServiceFactory:
     def test_it(self, pyramid_request, OrganizationService, h_api):
         svc = service_factory(sentinel.context, pyramid_request)
@@ -34,7 +34,9 @@ class TestServiceFactory:
         svc = service_factory(sentinel.context, pyramid_request)
 
         if customer_api_key:
-            VitalSourceClient.assert_called_once_with(customer_api_key)
+            VitalSourceClient.assert_called_once_with(
+                customer_api_key, adapter=pyramid_request.registry["http.adapter"]
+            )
         else:
             VitalSourceClient.assert_not_called()
 
@@ -59,7 +61,9 @@ class TestServiceFactory:
         service_factory(sentinel.context, pyramid_request)
 
         if global_api_key:
-            VitalSourceClient.assert_called_once_with(global_api_key)
+            VitalSourceClient.assert_called_once_with(
+                global_api_key, adapter=pyramid_request.registry["http.adapter"]
+            )
         else:
             VitalSourceClient.assert_not_called()
 
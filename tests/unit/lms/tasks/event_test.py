@@ -1,8 +1,9 @@
 from contextlib import contextmanager
+from unittest import mock
 
 import pytest
 
-from lms.tasks.event import insert_event
+from lms.tasks.event import insert_event, insert_events, maintain_partitions
 
 
 def test_insert_event(event_service, BaseEvent, pyramid_request):
@@ -12,6 +13,25 @@ def test_insert_event(event_service, BaseEvent, pyramid_request):
     event_service.insert_event.assert_called_once_with(BaseEvent.return_value)
 
 
+def test_insert_events(event_service, BaseEvent, pyramid_request):
+    insert_events([{"type": "value_1"}, {"type": "value_2"}])
+
+    assert BaseEvent.call_args_list == [
+        mock.call(request=pyramid_request, type="value_1"),
+        mock.call(request=pyramid_request, type="value_2"),
+    ]
+    event_service.insert_events.assert_called_once_with(
+        [BaseEvent.return_value, BaseEvent.return_value]
+    )
+
+
+def test_maintain_partitions(event_service):
+    maintain_partitions()
+
+    event_service.create_partitions.assert_called_once_with(months_ahead=3)
+    event_service.archive_partitions.assert_called_once_with(retention_months=24)
+
+
 @pytest.fixture(autouse=True)
 def BaseEvent(patch):
     return patch("lms.tasks.event.BaseEvent")
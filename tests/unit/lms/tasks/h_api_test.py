@@ -0,0 +1,68 @@
+from contextlib import contextmanager
+
+import pytest
+from h_api.bulk_api import CommandBuilder
+
+from lms.services import HAPIError
+from lms.services.lti_h import _SYNCED
+from lms.tasks.h_api import execute_bulk
+
+
+def test_execute_bulk(h_api, commands):
+    execute_bulk(commands=[command.raw for command in commands])
+
+    _, kwargs = h_api.execute_bulk.call_args
+    assert [command.raw for command in kwargs["commands"]] == [
+        command.raw for command in commands
+    ]
+
+
+def test_execute_bulk_records_the_sync(h_api, commands, synced):
+    execute_bulk(commands=[command.raw for command in commands], synced=synced)
+
+    assert _SYNCED == {("user", "username"): "hash"}
+    h_api.execute_bulk.assert_called_once()
+
+
+def test_execute_bulk_skips_commands_it_has_just_sent(h_api, commands, synced):
+    _SYNCED[("user", "username")] = "hash"
+
+    execute_bulk(commands=[command.raw for command in commands], synced=synced)
+
+    h_api.execute_bulk.assert_not_called()
+
+
+def test_execute_bulk_doesnt_record_failed_syncs(h_api, commands, synced):
+    h_api.execute_bulk.side_effect = HAPIError
+
+    with pytest.raises(HAPIError):
+        execute_bulk(commands=[command.raw for command in commands], synced=synced)
+
+    assert not _SYNCED
+
+
+@pytest.fixture
+def synced():
+    """Return a `synced` argument as it arrives at the task, after JSON."""
+    return [[["user", "username"], "hash"]]
+
+
+@pytest.fixture
+def commands():
+    return [
+        CommandBuilder.group_membership.create("user_0", "group_0"),
+        CommandBuilder.group_membership.create("user_0", "group_1"),
+    ]
+
+
+@pytest.fixture(autouse=True)
+def app(patch, pyramid_request):
+    app = patch("lms.tasks.h_api.app")
+
+    @contextmanager
+    def request_context():
+        yield pyramid_request
+
+    app.request_context = request_context
+
+    return app
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime
 from unittest.mock import sentinel
 
 import pytest
@@ -6,7 +6,7 @@ from h_matchers import Any
 from pyramid.httpexceptions import HTTPBadRequest, HTTPFound, HTTPNotFound
 
 from lms.models.public_id import InvalidPublicId
-from lms.services.organization import InvalidOrganizationParent
+from lms.services.organization import InvalidOrganizationParent, UsageReportRow
 from lms.views.admin.organization import AdminOrganizationViews
 from tests import factories
 from tests.matchers import temporary_redirect_to
@@ -237,37 +237,88 @@ class TestAdminOrganizationViews:
         organization_service.usage_report.assert_not_called()
 
     @pytest.mark.usefixtures("with_valid_params_for_usage")
-    def test_usage_flashes_if_service_raises(self, views, organization_service):
-        organization_service.usage_report.side_effect = ValueError
-        since = datetime(2023, 1, 1)
-        until = datetime(2023, 12, 31)
+    def test_usage_flashes_if_service_raises(
+        self, views, organization_service, pyramid_request
+    ):
+        organization_service.usage_report.side_effect = ValueError("NO COURSES")
 
-        result = views.usage()
+        response = views.usage()
 
         org = organization_service.get_by_id.return_value
-        assert result == {
-            "org": org,
-            "since": since,
-            "until": until,
-            "report": [],
-        }
+        assert pyramid_request.session.peek_flash("errors") == [
+            "There was a problem generating the report: NO COURSES"
+        ]
+        assert response == temporary_redirect_to(
+            pyramid_request.route_url(
+                "admin.organization.section", id_=org.id, section="usage"
+            )
+        )
 
     @pytest.mark.usefixtures("with_valid_params_for_usage")
     def test_usage(self, organization_service, views):
         since = datetime(2023, 1, 1)
         until = datetime(2023, 12, 31)
+        organization_service.usage_report.return_value = iter(
+            [
+                UsageReportRow(
+                    name="NAME",
+                    email="EMAIL",
+                    h_userid="acct:user@lms.hypothes.is",
+                    course_name="COURSE, WITH COMMA",
+                    course_created=date(2023, 2, 1),
+                    authority_provided_id="COURSE_ID",
+                )
+            ]
+        )
 
-        result = views.usage()
+        response = views.usage()
 
         organization_service.get_by_id.assert_called_once_with(sentinel.id_)
         org = organization_service.get_by_id.return_value
         organization_service.usage_report.assert_called_once_with(org, since, until)
-        assert result == {
-            "org": org,
-            "since": since,
-            "until": until,
-            "report": organization_service.usage_report.return_value,
-        }
+        assert response.content_type == "text/csv"
+        assert response.content_disposition == (
+            f'attachment; filename="usage-{org.public_id}-2023-01-01-2023-12-31.csv"'
+        )
+        assert list(response.app_iter) == [
+            b"User,Email,User ID,Course,Course created,Course ID\r\n",
+            b'NAME,EMAIL,acct:user@lms.hypothes.is,"COURSE, WITH COMMA",2023-02-01,COURSE_ID\r\n',
+        ]
+
+    @pytest.mark.usefixtures("with_valid_params_for_usage")
+    @pytest.mark.parametrize(
+        "value,expected",
+        [
+            ("=1+1", b"'=1+1"),
+            ("+1", b"'+1"),
+            ("-1", b"'-1"),
+            ("@SUM(A1)", b"'@SUM(A1)"),
+            ("\t=1", b"'\t=1"),
+            ("\r=1", b'"\'\r=1"'),
+            ("A-1", b"A-1"),
+        ],
+    )
+    def test_usage_neutralises_formulas(
+        self, organization_service, views, value, expected
+    ):
+        organization_service.usage_report.return_value = iter(
+            [
+                UsageReportRow(
+                    name=value,
+                    email=None,
+                    h_userid="acct:user@lms.hypothes.is",
+                    course_name="COURSE",
+                    course_created=date(2023, 2, 1),
+                    authority_provided_id="COURSE_ID",
+                )
+            ]
+        )
+
+        response = views.usage()
+
+        assert list(response.app_iter)[1] == (
+            expected + b",,acct:user@lms.hypothes.is,COURSE,2023-02-01,COURSE_ID\r\n"
+        )
 
     @pytest.fixture
     def with_valid_params_for_usage(self, pyramid_request):
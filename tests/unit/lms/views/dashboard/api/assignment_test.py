@@ -1,11 +1,14 @@
+from collections import namedtuple
 from unittest.mock import sentinel
 
 import pytest
 
-from lms.views.dashboard.api.assignment import AssignmentViews
+from lms.views.dashboard.api.assignment import AssignmentViews, StudentStatsSchema
 from tests import factories
 
-pytestmark = pytest.mark.usefixtures("h_api", "assignment_service")
+pytestmark = pytest.mark.usefixtures("dashboard_stats_service", "assignment_service")
+
+Row = namedtuple("Row", ["display_name", "annotations", "replies", "last_activity"])
 
 
 class TestAssignmentViews:
@@ -26,68 +29,57 @@ class TestAssignmentViews:
             "course": {"id": course.id, "title": course.lms_name},
         }
 
-    def test_assignment_stats(self, views, pyramid_request, assignment_service, h_api):
-        # User returned by the stats endpoint
-        student = factories.User()
-        # User with no annotations
-        student_no_annos = factories.User(display_name="Homer")
-        # User with no annotations and no name
-        student_no_annos_no_name = factories.User(display_name=None)
-
+    def test_assignment_stats(
+        self,
+        views,
+        pyramid_request,
+        assignment_service,
+        dashboard_stats_service,
+        get_page,
+        paginate,
+    ):
         pyramid_request.matchdict["assignment_id"] = sentinel.id
         assignment = factories.Assignment()
-        assignment_service.get_members.return_value = [
-            student,
-            student_no_annos,
-            student_no_annos_no_name,
-        ]
         assignment_service.get_by_id.return_value = assignment
-        stats = [
-            {
-                "display_name": student.display_name,
-                "annotations": sentinel.annotations,
-                "replies": sentinel.replies,
-                "userid": student.h_userid,
-                "last_activity": sentinel.last_activity,
-            },
-            {
-                "display_name": sentinel.display_name,
-                "annotations": sentinel.annotations,
-                "replies": sentinel.replies,
-                "userid": "TEACHER",
-                "last_activity": sentinel.last_activity,
-            },
+        rows = [
+            Row(
+                display_name="NAME",
+                annotations=2,
+                replies=1,
+                last_activity="2024-01-01T00:00:00+00:00",
+            )
         ]
-
-        h_api.get_assignment_stats.return_value = stats
+        dashboard_stats_service.get_student_stats.return_value = rows
 
         response = views.assignment_stats()
 
         assignment_service.get_by_id.assert_called_once_with(sentinel.id)
-        h_api.get_assignment_stats.assert_called_once_with(
-            [g.authority_provided_id for g in assignment.groupings],
-            assignment.resource_link_id,
+        get_page.assert_called_once_with(pyramid_request, StudentStatsSchema)
+        dashboard_stats_service.get_student_stats.assert_called_once_with(
+            assignment, get_page.return_value
         )
-        assert response == [
-            {
-                "display_name": student.display_name,
-                "annotations": sentinel.annotations,
-                "replies": sentinel.replies,
-                "last_activity": sentinel.last_activity,
-            },
-            {
-                "display_name": student_no_annos.display_name,
-                "annotations": 0,
-                "replies": 0,
-                "last_activity": None,
-            },
-            {
-                "display_name": f"Student {student_no_annos_no_name.user_id[:10]}",
-                "annotations": 0,
-                "replies": 0,
-                "last_activity": None,
-            },
-        ]
+        paginate.assert_called_once_with(
+            pyramid_request,
+            get_page.return_value,
+            rows,
+            [
+                {
+                    "display_name": "NAME",
+                    "annotations": 2,
+                    "replies": 1,
+                    "last_activity": "2024-01-01T00:00:00+00:00",
+                }
+            ],
+        )
+        assert response == paginate.return_value
+
+    @pytest.fixture
+    def get_page(self, patch):
+        return patch("lms.views.dashboard.api.assignment.get_page")
+
+    @pytest.fixture
+    def paginate(self, patch):
+        return patch("lms.views.dashboard.api.assignment.paginate")
 
     @pytest.fixture
     def views(self, pyramid_request):
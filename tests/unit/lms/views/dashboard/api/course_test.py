@@ -1,11 +1,14 @@
+from collections import namedtuple
 from unittest.mock import sentinel
 
 import pytest
 
-from lms.views.dashboard.api.course import CourseViews
+from lms.views.dashboard.api.course import AssignmentStatsSchema, CourseViews
 from tests import factories
 
-pytestmark = pytest.mark.usefixtures("course_service", "h_api")
+pytestmark = pytest.mark.usefixtures("course_service", "dashboard_stats_service")
+
+Row = namedtuple("Row", ["id", "title", "annotations", "replies", "last_activity"])
 
 
 class TestCourseViews:
@@ -24,67 +27,60 @@ class TestCourseViews:
         }
 
     def test_course_stats(
-        self, views, pyramid_request, course_service, h_api, db_session
+        self,
+        views,
+        pyramid_request,
+        course_service,
+        dashboard_stats_service,
+        get_page,
+        paginate,
     ):
         pyramid_request.matchdict["course_id"] = sentinel.id
         course = factories.Course()
-        section = factories.CanvasSection(parent=course)
         course_service.get_by_id.return_value = course
-
-        assignment = factories.Assignment()
-        assignment_with_no_annos = factories.Assignment()
-
-        factories.AssignmentGrouping(assignment=assignment, grouping=course)
-        factories.AssignmentGrouping(
-            assignment=assignment_with_no_annos, grouping=course
-        )
-        db_session.flush()
-
-        stats = [
-            {
-                "assignment_id": assignment.resource_link_id,
-                "annotations": sentinel.annotations,
-                "replies": sentinel.replies,
-                "userid": "TEACHER",
-                "last_activity": sentinel.last_activity,
-            },
+        rows = [
+            Row(
+                id=1,
+                title="TITLE",
+                annotations=2,
+                replies=1,
+                last_activity="2024-01-01T00:00:00+00:00",
+            )
         ]
-
-        h_api.get_course_stats.return_value = stats
+        dashboard_stats_service.get_course_assignment_stats.return_value = rows
 
         response = views.course_stats()
 
-        h_api.get_course_stats.assert_called_once_with(
-            [course.authority_provided_id, section.authority_provided_id]
+        get_page.assert_called_once_with(pyramid_request, AssignmentStatsSchema)
+        dashboard_stats_service.get_course_assignment_stats.assert_called_once_with(
+            course, get_page.return_value
         )
-        assert response == [
-            {
-                "id": assignment.id,
-                "title": assignment.title,
-                "course": {
-                    "id": course.id,
-                    "title": course.lms_name,
-                },
-                "stats": {
-                    "annotations": sentinel.annotations,
-                    "replies": sentinel.replies,
-                    "last_activity": sentinel.last_activity,
-                },
-            },
-            {
-                "id": assignment_with_no_annos.id,
-                "title": assignment_with_no_annos.title,
-                "course": {
-                    "id": course.id,
-                    "title": course.lms_name,
-                },
-                "stats": {
-                    "annotations": 0,
-                    "replies": 0,
-                    "last_activity": None,
-                },
-            },
-        ]
+        paginate.assert_called_once_with(
+            pyramid_request,
+            get_page.return_value,
+            rows,
+            [
+                {
+                    "id": 1,
+                    "title": "TITLE",
+                    "course": {"id": course.id, "title": course.lms_name},
+                    "stats": {
+                        "annotations": 2,
+                        "replies": 1,
+                        "last_activity": "2024-01-01T00:00:00+00:00",
+                    },
+                }
+            ],
+        )
+        assert response == paginate.return_value
+
+    @pytest.fixture
+    def get_page(self, patch):
+        return patch("lms.views.dashboard.api.course.get_page")
+
+    @pytest.fixture
+    def paginate(self, patch):
+        return patch("lms.views.dashboard.api.course.paginate")
 
     @pytest.fixture
     def views(self, pyramid_request):
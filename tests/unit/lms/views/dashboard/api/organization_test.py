@@ -0,0 +1,133 @@
+from unittest.mock import sentinel
+
+import pytest
+from pyramid.httpexceptions import HTTPNotFound
+
+from lms.models.public_id import InvalidPublicId
+from lms.views.dashboard.api.organization import OrganizationViews
+from tests import factories
+
+pytestmark = pytest.mark.usefixtures("organization_service", "dashboard_stats_service")
+
+
+class TestOrganizationViews:
+    def test_organization_stats(
+        self, views, organization, organization_service, dashboard_stats_service
+    ):
+        dashboard_stats_service.get_organization_course_stats.return_value = [
+            {
+                "id": 1,
+                "title": "COURSE",
+                "assignments": 2,
+                "annotations": 3,
+                "replies": 1,
+                "last_activity": "2024-01-01T00:00:00+00:00",
+            },
+            {
+                "id": 2,
+                "title": "OTHER COURSE",
+                "assignments": 1,
+                "annotations": 1,
+                "replies": 0,
+                "last_activity": "2024-01-02T00:00:00+00:00",
+            },
+            {
+                "id": 3,
+                "title": "NO ACTIVITY",
+                "assignments": 0,
+                "annotations": 0,
+                "replies": 0,
+                "last_activity": None,
+            },
+        ]
+
+        response = views.organization_stats()
+
+        organization_service.get_by_public_id.assert_called_once_with(
+            sentinel.public_id
+        )
+        organization_service.get_hierarchy_ids.assert_called_once_with(organization.id)
+        dashboard_stats_service.get_organization_course_stats.assert_called_once_with(
+            organization_service.get_hierarchy_ids.return_value
+        )
+        assert response == {
+            "id": organization.public_id,
+            "name": organization.name,
+            "stats": {
+                "courses": 3,
+                "assignments": 3,
+                "annotations": 4,
+                "replies": 1,
+                "last_activity": "2024-01-02T00:00:00+00:00",
+            },
+            "courses": [
+                {
+                    "id": 1,
+                    "title": "COURSE",
+                    "stats": {
+                        "assignments": 2,
+                        "annotations": 3,
+                        "replies": 1,
+                        "last_activity": "2024-01-01T00:00:00+00:00",
+                    },
+                },
+                {
+                    "id": 2,
+                    "title": "OTHER COURSE",
+                    "stats": {
+                        "assignments": 1,
+                        "annotations": 1,
+                        "replies": 0,
+                        "last_activity": "2024-01-02T00:00:00+00:00",
+                    },
+                },
+                {
+                    "id": 3,
+                    "title": "NO ACTIVITY",
+                    "stats": {
+                        "assignments": 0,
+                        "annotations": 0,
+                        "replies": 0,
+                        "last_activity": None,
+                    },
+                },
+            ],
+        }
+
+    def test_organization_stats_without_courses(
+        self, views, organization, dashboard_stats_service
+    ):
+        dashboard_stats_service.get_organization_course_stats.return_value = []
+
+        response = views.organization_stats()
+
+        assert response["stats"] == {
+            "courses": 0,
+            "assignments": 0,
+            "annotations": 0,
+            "replies": 0,
+            "last_activity": None,
+        }
+        assert response["id"] == organization.public_id
+
+    @pytest.mark.parametrize("side_effect", [None, InvalidPublicId])
+    def test_organization_stats_not_found(
+        self, views, organization_service, side_effect
+    ):
+        organization_service.get_by_public_id.return_value = None
+        organization_service.get_by_public_id.side_effect = side_effect
+
+        with pytest.raises(HTTPNotFound):
+            views.organization_stats()
+
+    @pytest.fixture
+    def organization(self, organization_service, db_session):
+        organization = factories.Organization()
+        db_session.flush()
+        organization_service.get_by_public_id.return_value = organization
+        return organization
+
+    @pytest.fixture
+    def views(self, pyramid_request):
+        pyramid_request.matchdict["public_id"] = sentinel.public_id
+        return OrganizationViews(pyramid_request)
@@ -0,0 +1,137 @@
+import json
+from base64 import urlsafe_b64encode
+from collections import namedtuple
+from unittest.mock import Mock
+
+import pytest
+
+from lms.services.dashboard_stats import Page
+from lms.validation import ValidationError
+from lms.views.dashboard.pagination import PaginationSchema, get_page, paginate
+
+Row = namedtuple("Row", ["id", "sort_key"])
+
+
+def encode(cursor):
+    return urlsafe_b64encode(json.dumps(cursor).encode()).decode().rstrip("=")
+
+
+class ExampleSchema(PaginationSchema):
+    ORDER_BY = {"name": str, "count": int}
+    FIELDS = ("name", "count", "other")
+
+
+class TestPaginationSchema:
+    def test_it(self, pyramid_request):
+        cursor = encode(["-count", 5, 10])
+        pyramid_request.GET.update(
+            {
+                "order_by": "-count",
+                "limit": "10",
+                "cursor": cursor,
+                "fields": "name,count",
+            }
+        )
+
+        assert ExampleSchema(pyramid_request).parse() == {
+            "order_by": "-count",
+            "limit": 10,
+            "cursor": ("-count", (5, 10)),
+            "selected_fields": ["name", "count"],
+        }
+
+    def test_it_with_no_params(self, pyramid_request):
+        assert not ExampleSchema(pyramid_request).parse()
+
+    @pytest.mark.parametrize(
+        "params,field",
+        [
+            ({"order_by": "unknown"}, "order_by"),
+            ({"limit": "0"}, "limit"),
+            ({"limit": "1001"}, "limit"),
+            ({"cursor": "not a cursor"}, "cursor"),
+            ({"cursor": encode(["name", "a"])}, "cursor"),
+            # Sort keys and IDs of the wrong type
+            ({"cursor": encode(["name", 1, 1])}, "cursor"),
+            ({"cursor": encode(["count", "1", 1]), "order_by": "count"}, "cursor"),
+            ({"cursor": encode(["count", True, 1]), "order_by": "count"}, "cursor"),
+            ({"cursor": encode(["name", "a", "1"])}, "cursor"),
+            ({"cursor": encode(["name", "a", 1.5])}, "cursor"),
+            ({"cursor": encode(["name", "a", None])}, "cursor"),
+            # A cursor for the default order of a request with another order
+            ({"cursor": encode(["name", "a", 1]), "order_by": "count"}, "cursor"),
+            ({"fields": "name,unknown"}, "fields"),
+        ],
+    )
+    def test_it_raises_with_invalid_params(self, pyramid_request, params, field):
+        pyramid_request.GET.update(params)
+
+        with pytest.raises(ValidationError) as error:
+            ExampleSchema(pyramid_request).parse()
+
+        assert field in error.value.messages["query"]
+
+
+class TestGetPage:
+    def test_it(self, pyramid_request):
+        pyramid_request.parsed_params = {
+            "order_by": "-count",
+            "cursor": ("-count", (5, 10)),
+            "limit": 10,
+        }
+
+        assert get_page(pyramid_request, ExampleSchema) == Page(
+            order_by="count", descending=True, after=(5, 10), limit=10
+        )
+
+    def test_it_defaults_to_the_first_order(self, pyramid_request):
+        pyramid_request.parsed_params = {}
+
+        assert get_page(pyramid_request, ExampleSchema) == Page(order_by="name")
+
+
+class TestPaginate:
+    def test_it_links_to_the_next_page(self, pyramid_request):
+        pyramid_request.GET.update({"limit": "2", "order_by": "-count"})
+        page = Page(order_by="count", descending=True, limit=2)
+        rows = [Row(id=1, sort_key=5), Row(id=2, sort_key=3)]
+
+        items = paginate(pyramid_request, page, rows, [{"count": 5}, {"count": 3}])
+
+        assert items == [{"count": 5}, {"count": 3}]
+        assert pyramid_request.response.headers["Link"] == (
+            "<http://example.com/dashboard/api/assignment/1/stats"
+            f"?limit=2&order_by=-count&cursor={encode(['-count', 3, 2])}>"
+            '; rel="next"'
+        )
+
+    @pytest.mark.parametrize("limit", [None, 3])
+    def test_it_doesnt_link_to_the_next_page_after_the_last_one(
+        self, pyramid_request, limit
+    ):
+        page = Page(order_by="name", limit=limit)
+
+        paginate(pyramid_request, page, [Row(id=1, sort_key="a")], [{}])
+
+        assert "Link" not in pyramid_request.response.headers
+
+    def test_it_selects_fields(self, pyramid_request):
+        pyramid_request.parsed_params = {"selected_fields": ["name"]}
+
+        items = paginate(
+            pyramid_request,
+            Page(order_by="name"),
+            [Row(id=1, sort_key="a")],
+            [{"name": "a", "count": 1}],
+        )
+
+        assert items == [{"name": "a"}]
+
+    @pytest.fixture
+    def pyramid_request(self, pyramid_request):
+        pyramid_request.GET.clear()
+        pyramid_request.parsed_params = {}
+        pyramid_request.matched_route = Mock()
+        pyramid_request.matched_route.name = "dashboard.api.assignment.stats"
+        pyramid_request.matchdict["assignment_id"] = 1
+        return pyramid_request
@@ -15,6 +15,7 @@ from tests import factories
     "assignment_service",
     "course_service",
     "application_instance_service",
+    "dashboard_stats_service",
     "grading_info_service",
     "lti_h_service",
     "lti_role_service",
@@ -262,7 +263,7 @@ class TestBasicLaunchViews:
     @pytest.mark.parametrize("instructor_dashboard_enabled", [True, False])
     @pytest.mark.parametrize("is_gradable", [True, False])
     @pytest.mark.parametrize("is_instructor", [True, False])
-    def test__show_document_configures_toolbar(
+    def test__show_document_configures_toolbar(  # pylint:disable=too-many-locals
         self,
         svc,
         request,
@@ -276,6 +277,7 @@ class TestBasicLaunchViews:
         is_instructor,
         grading_info_service,
         lti_grading_service,
+        dashboard_stats_service,
     ):
         assignment = factories.Assignment(is_gradable=is_gradable)
         if is_instructor:
@@ -297,8 +299,12 @@ class TestBasicLaunchViews:
 
         if instructor_dashboard_enabled and is_instructor:
             context.js_config.enable_instructor_dashboard_entry_point.assert_called_once()
+            dashboard_stats_service.prewarm_assignment_stats.assert_called_once_with(
+                assignment
+            )
         else:
             context.js_config.enable_instructor_dashboard_entry_point.assert_not_called()
+            dashboard_stats_service.prewarm_assignment_stats.assert_not_called()
 
         if use_toolbar_grading and is_gradable:
             if is_instructor:
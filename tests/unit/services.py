@@ -19,6 +19,7 @@ from lms.services.canvas_api import CanvasAPIClient
 from lms.services.canvas_studio import CanvasStudioService
 from lms.services.course import CourseService
 from lms.services.d2l_api import D2LAPIClient
+from lms.services.dashboard_stats import DashboardStatsService
 from lms.services.digest import DigestService
 from lms.services.email_preferences import EmailPreferencesService
 from lms.services.event import EventService
@@ -64,6 +65,7 @@ __all__ = (
     "canvas_studio_service",
     "course_service",
     "d2l_api_client",
+    "dashboard_stats_service",
     "digest_service",
     "event_service",
     "file_service",
@@ -189,6 +191,11 @@ def moodle_api_client(mock_service):
     return mock_service(MoodleAPIClient)
 
 
+@pytest.fixture
+def dashboard_stats_service(mock_service):
+    return mock_service(DashboardStatsService)
+
+
 @pytest.fixture
 def digest_service(mock_service):
     return mock_service(DigestService)